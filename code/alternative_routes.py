@@ -0,0 +1,146 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module finds a few sensible alternatives to the shortest route between two places, with
+the plateau method. One shortest-path tree is built from the departure and one from the
+destination; then every vertex v gives the route that follows the first tree to v and the
+second tree from v, whose length is the sum of the two distances of v. A stretch of road that
+lies on both trees (a plateau) gives the same route for all of its vertices, so each route is
+only built once. The routes are tried from the shortest, and a route is kept only if it has no
+loop and does not share too much of its length with a route that was kept before.
+
+Unlike Yen's algorithm, which runs a new search for every deviation of every route found, the
+two trees are all the searches that are needed, and both can come from a ShortestPathTreeCache.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Optional, Union
+from dijkstra import NoShortestPathError, SearchStats, ShortestPathTreeCache, shortest_path_tree
+from map_graph import MapGraph
+from csr_graph import CSRGraph
+
+# The default largest share of a route's length that it may have in common with a shorter
+# route that was kept
+MAX_SIMILARITY = 0.7
+
+# The default largest ratio of the length of an alternative to the length of the shortest route
+MAX_STRETCH = 1.5
+
+
+def alternative_routes(start: Any, end: Any, graph: Union[MapGraph, CSRGraph], k: int = 3,
+                       max_similarity: float = MAX_SIMILARITY, max_stretch: float = MAX_STRETCH,
+                       cache: Optional[ShortestPathTreeCache] = None,
+                       stats: Optional[SearchStats] = None) -> list[dict]:
+    """Return at most k loopless routes from start to end, from the shortest to the longest.
+    Each route is a dictionary with its path, as a list of vertex names, and its distance.
+
+    The first route is the shortest path. Every other route is at most max_stretch times as
+    long as it, and no route has more than max_similarity of its length in common with a
+    shorter route in the list. Fewer than k routes are returned when there are not enough
+    such routes.
+
+    If cache is given, the two shortest-path trees are taken from it. If stats is given, the
+    work of the searches that are run is added to it.
+    Raise NoShortestPathError if end cannot be reached from start.
+
+    Preconditions:
+        - start in graph.get_all_vertices() and end in graph.get_all_vertices()
+        - k >= 1
+        - 0 <= max_similarity <= 1 and max_stretch >= 1
+
+    >>> g = MapGraph()
+    >>> for name in ['Hall', '1', '2', '3', '4', 'Library']:
+    ...     g.add_vertex(name, (0, 0), 'corner')
+    >>> for name1, name2, dist in [('Hall', '1', 180), ('1', 'Library', 20), ('Hall', '2', 120),
+    ...                            ('2', 'Library', 110), ('1', '3', 11), ('3', 'Library', 11),
+    ...                            ('Hall', '4', 400), ('4', 'Library', 400)]:
+    ...     g.add_edge(name1, name2, dist)
+    >>> [(r['path'], r['distance']) for r in alternative_routes('Hall', 'Library', g)]
+    [(['Hall', '1', 'Library'], 200), (['Hall', '2', 'Library'], 230)]
+    >>> len(alternative_routes('Hall', 'Library', g, max_stretch=5))
+    3
+    >>> len(alternative_routes('Hall', 'Library', g, k=4, max_similarity=1))
+    3
+    """
+    if cache is not None:
+        d_start, via_start = cache.get_tree(graph, start, stats)
+        d_end, via_end = cache.get_tree(graph, end, stats)
+    else:
+        d_start, via_start = shortest_path_tree(graph, start, stats)
+        d_end, via_end = shortest_path_tree(graph, end, stats)
+    shortest = d_start[end]
+    if shortest == math.inf:
+        raise NoShortestPathError
+
+    # The vertices through which a route is short enough, from the shortest route
+    candidates = sorted((d_start[v] + d_end[v], v) for v in d_start
+                        if d_start[v] + d_end[v] <= max_stretch * shortest)
+    routes = []
+    kept_edges = []  # the edges of each kept route, mapped to their lengths
+    covered = set()  # the vertices whose route has been tried already
+    for length, v in candidates:
+        if len(routes) == k:
+            break
+        if v in covered:
+            continue
+        path = _via_path(v, via_start, via_end)
+        # Every vertex of the route on the plateau of v gives this same route
+        covered.update(u for u in path
+                       if math.isclose(d_start[u] + d_end[u], length, rel_tol=1e-12))
+        if len(set(path)) < len(path):
+            continue
+        edges = {}
+        for i in range(1, len(path)):
+            edges[frozenset((path[i - 1], path[i]))] = graph.get_distance(path[i - 1], path[i])
+        if all(_shared_length(edges, kept) <= max_similarity * length for kept in kept_edges):
+            routes.append({'path': path, 'distance': length})
+            kept_edges.append(edges)
+    return routes
+
+
+def _via_path(v: Any, via_start: dict, via_end: dict) -> list:
+    """Return the route that follows the tree of via_start from its root to v, and then the
+    tree of via_end from v to its root.
+    """
+    path = [v]
+    while via_start[path[-1]] is not None:
+        path.append(via_start[path[-1]])
+    path.reverse()
+    while via_end[path[-1]] is not None:
+        path.append(via_end[path[-1]])
+    return path
+
+
+def _shared_length(edges: dict, kept: dict) -> float:
+    """Return the total length of the edges of edges that are also in kept."""
+    return sum(length for edge, length in edges.items() if edge in kept)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'dijkstra', 'map_graph',
+                          'csr_graph'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,167 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the batch_routes function, which answers many (departure, destination)
+queries at once. The queries are grouped by departure, and one shortest-path tree is built for
+each distinct departure and then used for every destination in its group, instead of one search
+per query. The groups are spread over a pool of worker processes. The graph is sent to each
+worker once, when the worker starts, rather than with every group. The results are yielded in
+the order of the queries as soon as all the earlier ones are ready.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import math
+import os
+from typing import Any, Iterable, Iterator, Optional
+from dijkstra import shortest_path_tree
+from building_matrix import matrix_for
+from vehicle_return_time import MODES, vehicle_mode_time
+
+# The graph used by the worker processes of batch_routes
+_worker_graph = None
+
+
+def batch_routes(pairs: Iterable[tuple[Any, Any]], graph: Any, processes: Optional[int] = None,
+                 paths: bool = True) -> Iterator[dict]:
+    """Yield the route of each (start, end) pair of pairs, in the same order as pairs.
+
+    Each route is a dictionary with the start and end, the path as a list of vertex names
+    (or None if paths is False), the distance in metres, and the number of seconds the trip
+    takes in each of MODES as computed by vehicle_mode_time. Every mode takes the shortest
+    path: access rules set by MapGraph.set_edge_modes are not applied (multimodal_routes
+    applies them, one pair at a time). When there is no path between
+    start and end, the path is None and the distance and times are math.inf.
+
+    The pairs are grouped by start, and one shortest-path tree is built per distinct start.
+    The groups are spread over processes worker processes (all CPU cores by default), but
+    never over more processes than there are groups; when that leaves a single process, they
+    are handled in this process. Pairs of buildings that are both in the
+    BuildingMatrix attached to graph are read from the matrix without any search.
+
+    Preconditions:
+        - every start and end is in graph.get_all_vertices()
+
+    >>> from map_graph import MapGraph
+    >>> g = MapGraph()
+    >>> for name in ['Hall', 'Library', '1', 'Gym']:
+    ...     g.add_vertex(name, (0, 0), 'building' if name != '1' else 'corner')
+    >>> g.add_edge('Hall', '1', 8)
+    >>> g.add_edge('1', 'Library', 100)
+    >>> routes = list(batch_routes([('Hall', 'Library'), ('Library', 'Hall'), ('Hall', 'Gym')],
+    ...                            g, processes=1))
+    >>> [(r['end'], r['distance']) for r in routes]
+    [('Library', 108.0), ('Hall', 108.0), ('Gym', inf)]
+    >>> routes[0]['path'], routes[0]['times']['walking']
+    (['Hall', '1', 'Library'], 108.0)
+    """
+    pairs = list(pairs)
+    matrix = matrix_for(graph)
+    groups = {}  # maps each start to the (position, end) of its pairs, in order of first use
+    ready = {}  # maps the position of each finished pair to its route
+    for position, (start, end) in enumerate(pairs):
+        if matrix is not None and start in matrix and end in matrix:
+            path = matrix.path(start, end) if paths and matrix.distance(start, end) < math.inf \
+                else None
+            ready[position] = _route(start, end, path, matrix.distance(start, end))
+        else:
+            groups.setdefault(start, []).append((position, end))
+
+    next_position = 0
+    for finished in _run_groups(list(groups.items()), graph, processes, paths):
+        ready.update(finished)
+        # Yield every route whose earlier routes have all been yielded
+        while next_position in ready:
+            yield ready.pop(next_position)
+            next_position += 1
+    while next_position < len(pairs):
+        yield ready.pop(next_position)
+        next_position += 1
+
+
+def _run_groups(groups: list, graph: Any, processes: Optional[int],
+                paths: bool) -> Iterator[dict]:
+    """Yield, for each (start, [(position, end), ...]) group of groups, a dictionary mapping
+    the positions of the group to their routes. The groups are finished in the order given.
+    """
+    # Each group is a single task, so more processes than groups would only sit idle
+    processes = min(processes or os.cpu_count() or 1, len(groups))
+    if processes <= 1:
+        for start, targets in groups:
+            yield _group_routes(graph, start, targets, paths)
+        return
+
+    # Imported here so that batches answered in this process do not import multiprocessing
+    from multiprocessing import Pool
+
+    # The graph is sent to each worker once, when the worker starts
+    with Pool(processes, _init_worker, (graph,)) as pool:
+        tasks = ((start, targets, paths) for start, targets in groups)
+        yield from pool.imap(_worker_group, tasks)
+
+
+def _group_routes(graph: Any, start: Any, targets: list, paths: bool) -> dict:
+    """Return the routes of the (position, end) pairs in targets, which all start at start,
+    from a single shortest-path tree.
+    """
+    d, path_via = shortest_path_tree(graph, start)
+    routes = {}
+    for position, end in targets:
+        path = None
+        if paths and d[end] < math.inf:
+            path = [end]
+            while path_via[path[-1]] is not None:
+                path.append(path_via[path[-1]])
+            path.reverse()
+        routes[position] = _route(start, end, path, d[end])
+    return routes
+
+
+def _route(start: Any, end: Any, path: Optional[list], distance: float) -> dict:
+    """Return the route dictionary yielded by batch_routes."""
+    return {'start': start,
+            'end': end,
+            'path': path,
+            'distance': float(distance),
+            'times': {mode: vehicle_mode_time(distance, mode) for mode in MODES}}
+
+
+def _init_worker(graph: Any) -> None:
+    """Store the graph in a worker process of batch_routes."""
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _worker_group(task: tuple) -> dict:
+    """Return the routes of one group in a worker process of batch_routes."""
+    start, targets, paths = task
+    return _group_routes(_worker_graph, start, targets, paths)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'os', 'dijkstra',
+                          'building_matrix',
+                          'vehicle_return_time', 'multiprocessing'],
+        'disable': ['E1136', 'W0221', 'W0603', 'C0415']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
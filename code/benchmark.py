@@ -0,0 +1,351 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains a benchmark harness for the map. Each case times one kind of operation on
+the same data files: loading the graph, finding routes with each engine, finding the closest
+corners of a building, searching building names and generating the HTML of a route page. The
+queries of every case are drawn from a random generator with a fixed seed, so two runs on the
+same files time exactly the same work. For each case the harness reports the median, 95th and
+99th percentile latency, the throughput and the peak memory allocated, as a table and as JSON:
+
+    python benchmark.py --json results.json
+    python benchmark.py --cases route_ch route_astar --compare results.json
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+from load_weighted_graph import load_weighted_graph, load_weighted_graph_fast
+from graph_snapshot import load_graph
+from map_graph import MapGraph
+from csr_graph import CSRGraph
+from dijkstra import shortest_path
+from contraction_hierarchy import hierarchy_for
+from buildings_list import buildings_list
+from name_search import NameIndex
+from visualize_map import plan_route, route_script, save_page
+from isochrone import isochrone
+from cli import BUILDING_FILE, CORNER_FILE
+
+# The engines timed by the route cases, each on the MapGraph; 'dijkstra' is also timed on
+# the CSRGraph
+ROUTE_ENGINES = ('dijkstra', 'point_to_point', 'bidirectional', 'astar', 'ch')
+
+# The default seed of the random queries
+SEED = 111
+
+# The number of operations of a case run again while tracing memory, which is much slower
+TRACED_OPERATIONS = 20
+
+# The time budget of the isochrone cases, in seconds: a ten-minute walk
+ISOCHRONE_SECONDS = 600
+
+
+class Workload:
+    """The data shared by the benchmark cases, loaded the first time a case needs it.
+
+    Instance Attributes:
+        - building_file: the building JSON file the graph is loaded from
+        - corner_file: the corner JSON file the graph is loaded from
+        - seed: the seed of the random queries
+        - queries: the number of queries timed by each query case
+    """
+    building_file: str
+    corner_file: str
+    seed: int
+    queries: int
+
+    # Private Instance Attributes:
+    #   - _loaded: the values already loaded, by name
+    _loaded: dict[str, Any]
+
+    def __init__(self, building_file: str, corner_file: str, seed: int = SEED,
+                 queries: int = 200) -> None:
+        """Initialize a workload on the given files. Nothing is loaded yet."""
+        self.building_file = building_file
+        self.corner_file = corner_file
+        self.seed = seed
+        self.queries = queries
+        self._loaded = {}
+
+    def get(self, name: str) -> Any:
+        """Return the value called name, loading it the first time.
+
+        Preconditions:
+            - name in {'graph', 'csr', 'buildings', 'snapshot'}
+        """
+        if name not in self._loaded:
+            if name == 'graph':
+                self._loaded[name] = load_weighted_graph_fast(self.building_file,
+                                                              self.corner_file)
+            elif name == 'csr':
+                self._loaded[name] = CSRGraph.from_map_graph(self.get('graph'))
+            elif name == 'buildings':
+                self._loaded[name] = sorted(self.get('graph').get_all_vertices('building'))
+            else:
+                # A snapshot in a temporary directory, so the one next to the data is untouched
+                self._loaded[name] = os.path.join(tempfile.mkdtemp(), 'benchmark.snapshot')
+                load_graph(self.building_file, self.corner_file, self._loaded[name])
+        return self._loaded[name]
+
+    def rng(self, case: str) -> random.Random:
+        """Return a random generator for case, seeded from the seed and the name of case so
+        that each case draws the same queries whichever cases are run.
+        """
+        return random.Random('{seed}:{case}'.format(seed=self.seed, case=case))
+
+    def pairs(self, case: str) -> list[tuple[str, str]]:
+        """Return the random (departure, destination) building pairs of case."""
+        rng = self.rng(case)
+        buildings = self.get('buildings')
+        return [(rng.choice(buildings), rng.choice(buildings)) for _ in range(self.queries)]
+
+
+def load_cases(workload: Workload) -> dict[str, Callable[[], list[Callable]]]:
+    """Return the cases of the harness for workload, by name. Each case returns the list of
+    operations it times, each one a function of no arguments; any setup is done before the
+    list is returned and is not timed.
+    """
+    w = workload
+    cases = {
+        'load': lambda: [lambda: load_weighted_graph(w.building_file, w.corner_file)],
+        'load_fast': lambda: [lambda: load_weighted_graph_fast(w.building_file, w.corner_file)],
+        'load_snapshot': lambda: _snapshot_case(w),
+        'closest_vertex': lambda: _closest_vertex_case(w),
+        'search': lambda: _search_case(w),
+        'render': lambda: _render_case(w),
+        'route_csr_dijkstra': lambda: _route_case(w, 'dijkstra', w.get('csr')),
+        'isochrone': lambda: _isochrone_case(w, w.get('graph')),
+        'isochrone_csr': lambda: _isochrone_case(w, w.get('csr'))
+    }
+    for engine in ROUTE_ENGINES:
+        cases['route_' + engine] = (lambda e=engine: _route_case(w, e, w.get('graph')))
+    return cases
+
+
+def run_case(operations: list[Callable], repeat: int = 1) -> dict:
+    """Run each of operations repeat times and return their timings: the latency percentiles
+    in milliseconds, the operations per second, and the peak memory in kilobytes allocated
+    while running the first TRACED_OPERATIONS operations once.
+
+    The peak memory is measured in a separate pass, since tracing allocations slows down the
+    operations being timed.
+
+    >>> result = run_case([lambda: sum(range(1000))] * 10)
+    >>> result['operations'], result['p50_ms'] <= result['p99_ms']
+    (10, True)
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for operation in operations:
+            before = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - before)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        for operation in operations[:TRACED_OPERATIONS]:
+            operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {'operations': len(latencies),
+            'mean_ms': 1e3 * sum(latencies) / len(latencies),
+            'p50_ms': 1e3 * percentile(latencies, 50),
+            'p95_ms': 1e3 * percentile(latencies, 95),
+            'p99_ms': 1e3 * percentile(latencies, 99),
+            'max_ms': 1e3 * latencies[-1],
+            'throughput_per_s': len(latencies) / total if total > 0 else math.inf,
+            'peak_memory_kb': peak / 1024}
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Return the p-th percentile of the sorted list values, by the nearest-rank method.
+
+    Preconditions:
+        - values != [] and values == sorted(values)
+        - 0 < p <= 100
+
+    >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95)
+    10
+    >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50)
+    5
+    """
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def run_benchmarks(workload: Workload, names: Optional[list[str]] = None,
+                   repeat: int = 1) -> dict:
+    """Run the cases called names (every case by default) on workload and return the report:
+    the settings of the run under 'meta' and the result of each case under 'results'.
+
+    Raise a ValueError if a name is not a case of the harness.
+    """
+    cases = load_cases(workload)
+    names = list(cases) if names is None else names
+    if any(name not in cases for name in names):
+        raise ValueError
+    report = {'meta': {'seed': workload.seed,
+                       'queries': workload.queries,
+                       'repeat': repeat,
+                       'building_file': os.path.basename(workload.building_file),
+                       'corner_file': os.path.basename(workload.corner_file),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': {}}
+    for name in names:
+        report['results'][name] = run_case(cases[name](), repeat)
+    return report
+
+
+def format_report(report: dict, baseline: Optional[dict] = None) -> str:
+    """Return the results of report as a table. If baseline is another report, each case
+    that is in both also shows the ratio of its median latency to the baseline.
+    """
+    header = '{:<22}{:>8}{:>11}{:>11}{:>11}{:>12}{:>11}'.format(
+        'case', 'ops', 'p50 ms', 'p95 ms', 'p99 ms', 'ops/s', 'peak KB')
+    if baseline is not None:
+        header += '{:>10}'.format('vs base')
+    lines = [header]
+    for name, r in report['results'].items():
+        line = '{:<22}{:>8}{:>11.3f}{:>11.3f}{:>11.3f}{:>12.1f}{:>11.1f}'.format(
+            name, r['operations'], r['p50_ms'], r['p95_ms'], r['p99_ms'],
+            r['throughput_per_s'], r['peak_memory_kb'])
+        if baseline is not None and name in baseline['results']:
+            line += '{:>9.2f}x'.format(r['p50_ms'] / baseline['results'][name]['p50_ms'])
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def _route_case(workload: Workload, engine: str, graph: Any) -> list[Callable]:
+    """Return the operations of the route case of engine on graph."""
+    case = 'route_' + engine if isinstance(graph, MapGraph) else 'route_csr_' + engine
+    if engine == 'ch':
+        # The hierarchy is built before timing, as main.py does at startup
+        hierarchy_for(graph)
+    return [(lambda s=s, e=e: shortest_path(s, e, graph, engine))
+            for s, e in workload.pairs(case)]
+
+
+def _snapshot_case(workload: Workload) -> list[Callable]:
+    """Return the operation of the load_snapshot case, once the snapshot has been saved."""
+    path = workload.get('snapshot')
+    return [lambda: load_graph(workload.building_file, workload.corner_file, path)]
+
+
+def _isochrone_case(workload: Workload, graph: Any) -> list[Callable]:
+    """Return the operations of an isochrone case: everything within ISOCHRONE_SECONDS of a
+    walk from random buildings.
+    """
+    rng = workload.rng('isochrone')
+    buildings = [rng.choice(workload.get('buildings')) for _ in range(workload.queries)]
+    return [(lambda b=b: isochrone(graph, b, 'walking', ISOCHRONE_SECONDS)) for b in buildings]
+
+
+def _closest_vertex_case(workload: Workload) -> list[Callable]:
+    """Return the operations of the closest_vertex case on random buildings."""
+    graph = workload.get('graph')
+    rng = workload.rng('closest_vertex')
+    buildings = [rng.choice(workload.get('buildings')) for _ in range(workload.queries)]
+    return [(lambda b=b: graph.find_closest_vertex(b)) for b in buildings]
+
+
+def _search_case(workload: Workload) -> list[Callable]:
+    """Return the operations of the search case: prefixes, substrings and misspellings of
+    building names, searched in a NameIndex of buildings_list.
+    """
+    names = buildings_list(workload.building_file)
+    index = NameIndex(names)
+    rng = workload.rng('search')
+    queries = []
+    for _ in range(workload.queries):
+        name = rng.choice(names)
+        start = rng.randrange(max(1, len(name) - 3))
+        query = name[start:start + rng.randint(3, 8)]
+        if rng.random() < 0.3 and len(query) > 3:
+            # Drop one letter, as a typo
+            k = rng.randrange(len(query))
+            query = query[:k] + query[k + 1:]
+        queries.append(query)
+    return [(lambda q=q: index.search(q)) for q in queries]
+
+
+def _render_case(workload: Workload) -> list[Callable]:
+    """Return the operations of the render case: the route, its script and the saved page
+    of random pairs. The page is made from the cached folium template when folium is
+    installed, and from the route script alone otherwise.
+    """
+    graph = workload.get('graph')
+    directory = tempfile.mkdtemp()
+    try:
+        from visualize_map import _template_page
+        import folium  # noqa: F401, checked only to decide how to make the page
+
+        def make_page(route: dict) -> str:
+            return _template_page(route)
+    except ImportError:
+        def make_page(route: dict) -> str:
+            return route_script(route, 'map')
+
+    return [(lambda s=s, e=e: save_page(make_page(plan_route(s, e, graph)), directory))
+            for s, e in workload.pairs('render')]
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Run the benchmarks given by argv (sys.argv[1:] by default)."""
+    parser = argparse.ArgumentParser(description='Time loading, routing, search and rendering.')
+    parser.add_argument('--buildings', default=BUILDING_FILE, help='the building JSON file')
+    parser.add_argument('--corners', default=CORNER_FILE, help='the corner JSON file')
+    parser.add_argument('--cases', nargs='+', default=None, help='the cases to run (all)')
+    parser.add_argument('--seed', type=int, default=SEED, help='the seed of the queries')
+    parser.add_argument('--queries', type=int, default=200, help='the queries per case')
+    parser.add_argument('--repeat', type=int, default=3, help='the runs of each operation')
+    parser.add_argument('--json', default=None, help="write the report to this file, or '-'")
+    parser.add_argument('--compare', default=None, help='a report to compare against')
+    args = parser.parse_args(argv)
+
+    workload = Workload(args.buildings, args.corners, args.seed, args.queries)
+    report = run_benchmarks(workload, args.cases, args.repeat)
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(report, baseline))
+        if args.json is not None:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
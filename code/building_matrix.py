@@ -0,0 +1,303 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This python module contains the BuildingMatrix class, a precomputed table of the shortest
+distances between every pair of buildings together with the predecessor of every vertex in the
+shortest-path tree of each building. The table is built with one search per building, spread
+over the CPU cores, and saved to a compact binary file. Once it is loaded and attached to a graph,
+a distance is a single array lookup and a path only walks the stored predecessors, so routing
+between buildings does no graph search at all.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+from map_graph import MapGraph
+from dijkstra import shortest_path_tree, NoShortestPathError
+
+# The first bytes of every matrix file, followed by the format version and the header length
+MAGIC = b'TRTM'
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<4sII')
+
+# Matrices attached by attach_matrix(), mapping each graph to its version and matrix
+_MATRICES = WeakKeyDictionary()
+
+# The graph and row layout used by the worker processes of BuildingMatrix.build
+_worker_state = None
+
+
+class BuildingMatrix:
+    """A table of the shortest paths between every pair of buildings of a graph.
+
+    Instance Attributes:
+        - fingerprint: the graph_fingerprint of the graph the table was built from
+        - vertices: the names of all vertices of that graph, in index order
+        - buildings: the names of the buildings, in the order of the rows of the table
+
+    Representation Invariants:
+        - len(self._dist) == len(self.buildings) ** 2
+        - len(self._pred) == len(self.buildings) * len(self.vertices)
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (0, 0), 'building')
+    >>> g.add_vertex('Library', (0, 0), 'building')
+    >>> g.add_vertex('1', (0, 0), 'corner')
+    >>> g.add_vertex('2', (0, 0), 'corner')
+    >>> g.add_edge('Hall', '1', 3)
+    >>> g.add_edge('1', '2', 4)
+    >>> g.add_edge('2', 'Library', 5)
+    >>> matrix = BuildingMatrix.build(g, processes=1)
+    >>> matrix.distance('Hall', 'Library')
+    12.0
+    >>> matrix.path('Library', 'Hall')
+    ['Library', '2', '1', 'Hall']
+    """
+    fingerprint: str
+    vertices: list[Any]
+    buildings: list[Any]
+
+    # Private Instance Attributes:
+    #   - _vertex_index: maps each vertex name to its index in self.vertices
+    #   - _building_index: maps each building name to its row in the table
+    #   - _dist: the distances between buildings, row by row
+    #   - _pred: for each building row, the index of the predecessor of every vertex in the
+    #       shortest-path tree of that building, or -1 for the building and unreachable vertices
+    _vertex_index: dict[Any, int]
+    _building_index: dict[Any, int]
+    _dist: array
+    _pred: array
+
+    def __init__(self, fingerprint: str, vertices: list, buildings: list,
+                 dist: array, pred: array) -> None:
+        """Initialize a matrix from its rows. Use build or load to create one."""
+        self.fingerprint = fingerprint
+        self.vertices = vertices
+        self.buildings = buildings
+        self._vertex_index = {name: i for i, name in enumerate(vertices)}
+        self._building_index = {name: i for i, name in enumerate(buildings)}
+        self._dist = dist
+        self._pred = pred
+
+    @classmethod
+    def build(cls, map_graph: MapGraph, processes: Optional[int] = None) -> BuildingMatrix:
+        """Return the matrix of map_graph, running one shortest-path search per building.
+
+        The searches are spread over processes worker processes (all CPU cores by default);
+        with processes=1 they run in this process.
+        """
+        vertices = sorted(map_graph.get_all_vertices())
+        buildings = sorted(map_graph.get_all_vertices('building'))
+        vertex_index = {name: i for i, name in enumerate(vertices)}
+        # Predecessors are vertex indices, so small graphs fit in 2 bytes per entry
+        typecode = 'h' if len(vertices) < 2 ** 15 else 'i'
+        dist, pred = array('d'), array(typecode)
+
+        if processes == 1:
+            rows = (_tree_row(map_graph, b, vertices, buildings, vertex_index, typecode)
+                    for b in buildings)
+            for dist_row, pred_row in rows:
+                dist.extend(dist_row)
+                pred.extend(pred_row)
+        else:
+            # Imported here so that loading a saved matrix does not import multiprocessing
+            from multiprocessing import Pool
+
+            # The graph is sent to each worker once, when the worker starts
+            initargs = (map_graph, vertices, buildings, typecode)
+            with Pool(processes, _init_worker, initargs) as pool:
+                for dist_row, pred_row in pool.imap(_worker_row, buildings, chunksize=8):
+                    dist.extend(dist_row)
+                    pred.extend(pred_row)
+
+        return cls(graph_fingerprint(map_graph), vertices, buildings, dist, pred)
+
+    @classmethod
+    def load(cls, path: str) -> BuildingMatrix:
+        """Return the matrix saved in the file at path.
+
+        Raise a ValueError if the file is not a matrix file of the current format version.
+        """
+        with open(path, 'rb') as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            n, v = len(header['buildings']), len(header['vertices'])
+            dist, pred = array('d'), array(header['typecode'])
+            dist.fromfile(f, n * n)
+            pred.fromfile(f, n * v)
+
+        if header['byteorder'] != sys.byteorder:
+            dist.byteswap()
+            pred.byteswap()
+        return cls(header['fingerprint'], header['vertices'], header['buildings'], dist, pred)
+
+    def save(self, path: str) -> None:
+        """Write this matrix to the file at path."""
+        header = json.dumps({'fingerprint': self.fingerprint,
+                             'vertices': self.vertices,
+                             'buildings': self.buildings,
+                             'typecode': self._pred.typecode,
+                             'byteorder': sys.byteorder}).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            self._dist.tofile(f)
+            self._pred.tofile(f)
+
+    def __contains__(self, name: Any) -> bool:
+        """Return whether name is one of the buildings of this matrix."""
+        return name in self._building_index
+
+    def distance(self, start: Any, end: Any) -> float:
+        """Return the length of the shortest path between the buildings start and end,
+        or math.inf if there is none.
+
+        Preconditions:
+            - start in self and end in self
+        """
+        return self._dist[self._building_index[start] * len(self.buildings)
+                          + self._building_index[end]]
+
+    def path(self, start: Any, end: Any) -> list:
+        """Return the shortest path from the building start to the building end as a list of
+        vertex names.
+
+        Raise NoShortestPathError when there is no possible shortest path between them.
+
+        Preconditions:
+            - start in self and end in self
+        """
+        if self.distance(start, end) == math.inf:
+            raise NoShortestPathError
+        offset = self._building_index[start] * len(self.vertices)
+        i = self._vertex_index[end]
+        path = [end]
+        while self._pred[offset + i] != -1:
+            i = self._pred[offset + i]
+            path.append(self.vertices[i])
+        path.reverse()
+        return path
+
+    def is_valid_for(self, map_graph: MapGraph) -> bool:
+        """Return whether this matrix was built from a graph identical to map_graph."""
+        return self.fingerprint == graph_fingerprint(map_graph)
+
+
+def graph_fingerprint(map_graph: MapGraph) -> str:
+    """Return a hash of the vertices, locations and edge weights of map_graph.
+
+    Two graphs with the same vertices and edges have the same fingerprint, regardless of
+    the order in which they were built or whether they are a MapGraph or a CSRGraph.
+    """
+    h = hashlib.sha256()
+    buildings = map_graph.get_all_vertices('building')
+    for name in sorted(map_graph.get_all_vertices()):
+        kind = 'building' if name in buildings else 'corner'
+        location = tuple(float(x) for x in map_graph.get_location(name))
+        h.update(repr((name, kind, location)).encode('utf-8'))
+        for u, weight in sorted(map_graph.weighted_neighbours(name)):
+            h.update(repr((u, float(weight))).encode('utf-8'))
+    return h.hexdigest()
+
+
+def attach_matrix(map_graph: MapGraph, matrix: BuildingMatrix) -> bool:
+    """Attach matrix to map_graph so that matrix_for returns it, and return True.
+
+    Return False and attach nothing if matrix was not built from this graph.
+    """
+    if not matrix.is_valid_for(map_graph):
+        return False
+    _MATRICES[map_graph] = (map_graph.get_version(), matrix)
+    return True
+
+
+def matrix_for(map_graph: MapGraph) -> Optional[BuildingMatrix]:
+    """Return the matrix attached to map_graph, or None if there is none or if the weight of
+    an edge of the graph, or anything else but its access rules, has changed since it was
+    attached.
+    """
+    if map_graph in _MATRICES:
+        version, matrix = _MATRICES[map_graph]
+        if version == map_graph.get_version() or map_graph.changes_since(version) == []:
+            return matrix
+    return None
+
+
+def load_building_matrix(path: str, map_graph: MapGraph) -> Optional[BuildingMatrix]:
+    """Load the matrix saved at path and attach it to map_graph.
+
+    Return None if the file does not exist, cannot be read, or was built from a different
+    graph; shortest_path then keeps searching the graph as usual.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        matrix = BuildingMatrix.load(path)
+    except (ValueError, KeyError, EOFError, struct.error):
+        return None
+    if attach_matrix(map_graph, matrix):
+        return matrix
+    return None
+
+
+def _tree_row(map_graph: MapGraph, building: Any, vertices: list, buildings: list,
+              vertex_index: dict, typecode: str) -> tuple[array, array]:
+    """Return the distance row and predecessor row of the given building."""
+    d, path_via = shortest_path_tree(map_graph, building)
+    dist_row = array('d', (d[b] for b in buildings))
+    pred_row = array(typecode, (-1 if path_via[v] is None else vertex_index[path_via[v]]
+                                for v in vertices))
+    return dist_row, pred_row
+
+
+def _init_worker(map_graph: MapGraph, vertices: list, buildings: list, typecode: str) -> None:
+    """Store the graph and row layout in a worker process of BuildingMatrix.build."""
+    global _worker_state
+    vertex_index = {name: i for i, name in enumerate(vertices)}
+    _worker_state = (map_graph, vertices, buildings, vertex_index, typecode)
+
+
+def _worker_row(building: Any) -> tuple[array, array]:
+    """Return the rows of one building in a worker process of BuildingMatrix.build."""
+    map_graph, vertices, buildings, vertex_index, typecode = _worker_state
+    return _tree_row(map_graph, building, vertices, buildings, vertex_index, typecode)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'map_graph', 'dijkstra',
+                          'hashlib', 'json', 'os', 'struct', 'sys', 'array', 'multiprocessing',
+                          'weakref'],
+        'allowed-io': ['BuildingMatrix.load', 'BuildingMatrix.save'],
+        'disable': ['R1705', 'C0200', 'W0603', 'C0415']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
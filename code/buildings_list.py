@@ -3,7 +3,8 @@
 Module Description
 ==================
 This module contains the building_list() function. This function takes the directory for the
-UofTMap.json file and returns a list of the names of the buildings in the JSON file.
+UofTMap.json file and returns a list of the names of the buildings in the JSON file. When the
+file has already been read into a CampusDataset, use CampusDataset.building_names instead.
 
 Copyright and Usage Information
 ===============================
@@ -16,7 +17,7 @@ please consult our Course Syllabus.
 
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
-import json
+from dataset import CampusDataset
 
 
 def buildings_list(building_file: str) -> list:
@@ -24,24 +25,19 @@ def buildings_list(building_file: str) -> list:
     Precondition:
         - building_file is the path to a JSON file containing the data on the coordinates
           of the buildings.
+    >>> names = buildings_list('Data/UofTMap.json')
+    >>> len(names) == len(set(names)) == 450
+    True
     """
-    buildings_so_far = []
-    with open(building_file) as json_file:
-        data = json.load(json_file)
-        for p in data:
-            # Append only if it does not already exist in the list.
-            if p['name'] not in buildings_so_far:
-                buildings_so_far.append(p['name'])
-
-    return buildings_so_far
+    # CampusDataset streams the file and skips repeated names with a set
+    return CampusDataset(building_file).building_names()
 
 
 if __name__ == "__main__":
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['json'],
-        'allowed-io': ['buildings_list'],
+        'extra-imports': ['dataset'],
         'max-line-length': 100,
         'disable': ['E1136']
     })
@@ -0,0 +1,340 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the headless command-line interface of the map. It finds routes between
+buildings and prints the path, the distance and the travel time by car, bicycle and on foot,
+without opening a window or a browser:
+
+    python cli.py route "Bahen Centre for Information Technology" "Robarts Library"
+    python cli.py --rules Data/access_rules.json route "Sidney Smith Hall" "Robarts Library"
+    python cli.py batch pairs.txt --json --processes 4
+    python cli.py build-matrix
+    python cli.py import-time
+
+Only the modules needed to load the graph and search it are imported, so tkinter, folium and
+webbrowser are never loaded, and NumPy and multiprocessing only when a command needs them.
+import-time reports how long a fresh interpreter takes to import this module.
+
+When the file of access rules (see multimodal.py) exists, the graph is searched as a MapGraph
+with those rules, and route finds the fastest route of each mode. batch does not apply them:
+its times are those of the shortest path for every mode.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from typing import Any, Iterator, Optional, TextIO
+from dijkstra import ENGINES, NoShortestPathError
+from vehicle_return_time import MODES, min_sec
+from graph_snapshot import load_graph
+from building_matrix import BuildingMatrix, load_building_matrix
+from name_search import NameIndex
+from batch_routes import batch_routes
+from multimodal import multimodal_routes, with_access_rules
+
+# The subcommands of main
+COMMANDS = ('route', 'batch', 'build-matrix', 'import-time')
+
+# The modules that the headless commands must never import
+HEAVY_MODULES = ('tkinter', 'folium', 'webbrowser', 'numpy', 'multiprocessing')
+
+# The data files, found next to this module whatever the working directory is
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data')
+BUILDING_FILE = os.path.join(DATA_DIR, 'UofTMap.json')
+CORNER_FILE = os.path.join(DATA_DIR, 'full_corner.json')
+MATRIX_FILE = os.path.join(DATA_DIR, 'building_matrix.bin')
+RULE_FILE = os.path.join(DATA_DIR, 'access_rules.json')
+
+
+class UnknownBuildingError(Exception):
+    """Exception raised when a building name given on the command line is not in the map.
+
+    Instance Attributes:
+        - name: the name that was given
+        - suggestions: the closest building names, best first
+    """
+    name: str
+    suggestions: list[str]
+
+    def __init__(self, name: str, suggestions: list[str]) -> None:
+        """Initialize the error for the given name and suggestions."""
+        Exception.__init__(self, name)
+        self.name = name
+        self.suggestions = suggestions
+
+    def __str__(self) -> str:
+        """Return a message naming the unknown building and the closest names."""
+        message = 'unknown building: {name}'.format(name=self.name)
+        if self.suggestions:
+            message += ' (did you mean: {names}?)'.format(names='; '.join(self.suggestions))
+        return message
+
+
+def route_info(start: str, end: str, graph: Any, engine: str = 'auto') -> dict:
+    """Return the route from the building start to the building end as a dictionary with
+    the path, its length in metres and the (minutes, seconds) it takes in each of MODES.
+
+    The modes take the routes found by multimodal_routes, so they follow the access rules of
+    graph, if it has any. The path and distance are those of the walking route, or of the
+    first mode of MODES that can reach end; a mode that cannot has None as its time.
+
+    Raise NoShortestPathError when no mode can reach end from start.
+
+    >>> from map_graph import MapGraph
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (43.66, -79.39), 'building')
+    >>> g.add_vertex('1', (43.66, -79.39), 'corner')
+    >>> g.add_vertex('Library', (43.661, -79.39), 'building')
+    >>> g.add_edge('Hall', '1', 8)
+    >>> g.add_edge('1', 'Library', 100)
+    >>> info = route_info('Hall', 'Library', g)
+    >>> info['path'], info['distance'], info['times']['walking']
+    (['Hall', '1', 'Library'], 108.0, (1, 48))
+    """
+    routes = multimodal_routes(graph, start, end, MODES, engine)
+    reachable = [mode for mode in MODES if routes[mode]['path'] is not None]
+    if not reachable:
+        raise NoShortestPathError
+    main_mode = 'walking' if 'walking' in reachable else reachable[0]
+    return {'start': start,
+            'end': end,
+            'path': routes[main_mode]['path'],
+            'distance': routes[main_mode]['distance'],
+            'times': {mode: min_sec(routes[mode]['seconds']) if mode in reachable else None
+                      for mode in MODES}}
+
+
+def format_route(info: dict) -> str:
+    """Return the route returned by route_info as lines of text.
+
+    >>> info = {'start': 'Hall', 'end': 'Library', 'path': ['Hall', 'Library'],
+    ...         'distance': 108.0, 'times': {'car': (0, 7), 'bicycle': (0, 19),
+    ...                                      'walking': (1, 48)}}
+    >>> print(format_route(info))
+    Departure: Hall
+    Destination: Library
+    Path: Hall -> Library
+    Distance: 108.0 m
+    Car: 0 m 7 s
+    Bicycle: 0 m 19 s
+    Walking: 1 m 48 s
+    """
+    lines = ['Departure: {start}'.format(start=info['start']),
+             'Destination: {end}'.format(end=info['end']),
+             'Path: {path}'.format(path=' -> '.join(str(v) for v in info['path'])),
+             'Distance: {dist:.1f} m'.format(dist=info['distance'])]
+    for mode in MODES:
+        if info['times'][mode] is None:
+            lines.append('{mode}: no route'.format(mode=mode.capitalize()))
+        else:
+            minutes, seconds = info['times'][mode]
+            lines.append('{mode}: {m} m {s} s'.format(mode=mode.capitalize(), m=minutes,
+                                                      s=seconds))
+    return '\n'.join(lines)
+
+
+def read_pairs(file: TextIO) -> Iterator[tuple[str, str]]:
+    """Yield the (departure, destination) pairs of file, one pair per line with the two names
+    separated by a tab. Blank lines and lines starting with # are skipped.
+
+    Raise a ValueError naming the line if a line does not hold exactly two names.
+
+    >>> import io
+    >>> list(read_pairs(io.StringIO('# pairs\\nHall\\tLibrary\\n\\nA\\tB\\n')))
+    [('Hall', 'Library'), ('A', 'B')]
+    >>> list(read_pairs(io.StringIO('Hall\\tLibrary\\nA B\\n')))
+    Traceback (most recent call last):
+    ValueError: line 2: expected two tab-separated names
+    """
+    for number, line in enumerate(file, 1):
+        line = line.strip('\r\n')
+        if line.strip() == '' or line.startswith('#'):
+            continue
+        names = [name.strip() for name in line.split('\t')]
+        if len(names) != 2:
+            raise ValueError('line {number}: expected two tab-separated names'.format(
+                number=number))
+        yield (names[0], names[1])
+
+
+def check_building(name: str, buildings: set, index: NameIndex) -> None:
+    """Raise UnknownBuildingError if name is not one of buildings, suggesting the closest
+    names from the NameIndex index.
+    """
+    if name not in buildings:
+        raise UnknownBuildingError(name, index.search(name, 3))
+
+
+def load(building_file: str, corner_file: str, matrix_file: Optional[str],
+         rule_file: Optional[str] = None) -> Any:
+    """Return the graph of the given data files, attaching the building matrix saved at
+    matrix_file if there is one that matches the graph.
+
+    If rule_file is given and exists, the graph is a MapGraph with its access rules (see
+    multimodal.with_access_rules), and a CSRGraph otherwise.
+    """
+    graph = load_graph(building_file, corner_file)
+    if rule_file is not None:
+        graph = with_access_rules(graph, rule_file)
+    if matrix_file is not None:
+        load_building_matrix(matrix_file, graph)
+    return graph
+
+
+def measure_import_time(module: str = 'cli', top: int = 10) -> dict:
+    """Return how long a fresh Python interpreter takes to import module, measured with
+    python -X importtime from the directory of this file.
+
+    The result has the total number of seconds under 'total', the (seconds, name) of the top
+    modules that took the longest by themselves under 'slowest', and which of HEAVY_MODULES
+    were imported under 'heavy'.
+
+    >>> measure_import_time('cli')['heavy']
+    []
+    """
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    total = 0.0
+    own_times = []
+    imported = set()
+    for line in result.stderr.splitlines():
+        # Each line is "import time: <self us> | <cumulative us> | <indented name>"
+        fields = line.split('|')
+        if not line.startswith('import time:') or not fields[0].split(':')[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        imported.add(name.split('.')[0])
+        own_times.append((int(fields[0].split(':')[1]) / 1e6, name))
+        if name == module:
+            total = int(fields[1]) / 1e6
+    own_times.sort(reverse=True)
+    return {'total': total,
+            'slowest': own_times[:top],
+            'heavy': [name for name in HEAVY_MODULES if name in imported]}
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Run the command given by argv (sys.argv[1:] by default) and return the exit status."""
+    parser = argparse.ArgumentParser(prog='cli.py',
+                                     description='Find routes between UofT buildings.')
+    parser.add_argument('--buildings', default=BUILDING_FILE, help='the building JSON file')
+    parser.add_argument('--corners', default=CORNER_FILE, help='the corner JSON file')
+    parser.add_argument('--matrix', default=MATRIX_FILE, help='the building matrix file')
+    parser.add_argument('--rules', default=RULE_FILE,
+                        help='the access rules file, used by route if it exists')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    route = commands.add_parser('route', help='print the route between two buildings')
+    route.add_argument('start', help='the name of the departure building')
+    route.add_argument('end', help='the name of the destination building')
+    route.add_argument('--engine', default='auto', choices=ENGINES,
+                       help='the search used by shortest_path')
+    batch = commands.add_parser('batch', help='print the route of each pair in a file, '
+                                              'searching once per departure')
+    batch.add_argument('file', help="a file of tab-separated pairs, or '-' for stdin")
+    batch.add_argument('--processes', type=int, default=None,
+                       help='the largest number of worker processes (all CPU cores by '
+                            'default, and never more than the number of departures)')
+    for command in (route, batch):
+        command.add_argument('--json', action='store_true', help='print one JSON object per route')
+
+    commands.add_parser('build-matrix', help='precompute and save the building matrix')
+    timing = commands.add_parser('import-time', help='measure the import time of a module')
+    timing.add_argument('--module', default='cli', help='the module to import')
+    timing.add_argument('--top', type=int, default=10, help='the number of modules listed')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'import-time':
+        report = measure_import_time(args.module, args.top)
+        print('import {module}: {ms:.1f} ms'.format(module=args.module, ms=report['total'] * 1e3))
+        for seconds, name in report['slowest']:
+            print('  {ms:8.2f} ms  {name}'.format(ms=seconds * 1e3, name=name))
+        print('heavy modules imported: {names}'.format(names=', '.join(report['heavy']) or 'none'))
+        return 0
+
+    if args.command == 'build-matrix':
+        graph = load(args.buildings, args.corners, None)
+        BuildingMatrix.build(graph).save(args.matrix)
+        print('saved {path}'.format(path=args.matrix))
+        return 0
+
+    graph = load(args.buildings, args.corners, args.matrix, args.rules)
+    if args.command == 'route':
+        pairs = [(args.start, args.end)]
+    else:
+        try:
+            if args.file == '-':
+                pairs = list(read_pairs(sys.stdin))
+            else:
+                with open(args.file) as f:
+                    pairs = list(read_pairs(f))
+        except (ValueError, OSError) as error:
+            print('error: ' + str(error), file=sys.stderr)
+            return 2
+    pairs, status = _known_pairs(pairs, graph)
+
+    if args.command == 'route':
+        routes = []
+        for start, end in pairs:
+            try:
+                routes.append(route_info(start, end, graph, args.engine))
+            except NoShortestPathError:
+                routes.append(None)
+    else:
+        routes = (None if route['path'] is None else
+                  dict(route, times={mode: min_sec(t) for mode, t in route['times'].items()})
+                  for route in batch_routes(pairs, graph, args.processes))
+
+    for (start, end), info in zip(pairs, routes):
+        if info is None:
+            print('error: no route from {start} to {end}'.format(start=start, end=end),
+                  file=sys.stderr)
+            status = 1
+        elif args.json:
+            print(json.dumps(info))
+        else:
+            print(format_route(info) + '\n')
+    return status
+
+
+def _known_pairs(pairs: list, graph: Any) -> tuple[list, int]:
+    """Return the pairs of pairs whose departure and destination are both buildings of graph,
+    and 1 if any pair was left out or 0 otherwise. Each pair left out is reported on stderr.
+    """
+    buildings = graph.get_all_vertices('building')
+    index = None
+    known = []
+    status = 0
+    for start, end in pairs:
+        try:
+            if start not in buildings or end not in buildings:
+                # The name index is only built once a name needs suggestions
+                index = index or NameIndex(sorted(buildings))
+                check_building(start, buildings, index)
+                check_building(end, buildings, index)
+            known.append((start, end))
+        except UnknownBuildingError as error:
+            print('error: ' + str(error), file=sys.stderr)
+            status = 1
+    return known, status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This python module contains the ContractionHierarchy class. A contraction hierarchy is built
+once from a MapGraph by contracting the vertices one at a time in order of importance and adding
+shortcut edges that preserve the shortest distances between the remaining vertices. A query then
+only searches upwards in the hierarchy from both ends, which settles a few hundred vertices even
+on very large maps, and the shortcuts are unpacked back into the original corners and buildings.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import math
+from heapq import heappush, heappop
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+from map_graph import MapGraph
+from dijkstra import IndexedPriorityQueue, NoShortestPathError, SearchStats
+
+# The maximum number of vertices settled by one witness search during preprocessing.
+# A witness search that gives up early only adds an unnecessary shortcut, never a wrong one.
+WITNESS_SETTLE_LIMIT = 60
+
+# Hierarchies built by hierarchy_for(), mapping each graph to its version and hierarchy
+_HIERARCHIES = WeakKeyDictionary()
+
+
+class ContractionHierarchy:
+    """A contraction hierarchy over the vertices of a MapGraph.
+
+    >>> g = MapGraph()
+    >>> for name in ['A', 'B', 'C', 'D', 'E']:
+    ...     g.add_vertex(name, (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 2)
+    >>> g.add_edge('B', 'C', 2)
+    >>> g.add_edge('C', 'D', 2)
+    >>> g.add_edge('A', 'E', 3)
+    >>> g.add_edge('E', 'D', 7)
+    >>> ch = ContractionHierarchy(g)
+    >>> ch.query('A', 'D')
+    ['A', 'B', 'C', 'D']
+    >>> ch.query('E', 'C')
+    ['E', 'A', 'B', 'C']
+    """
+    # Private Instance Attributes:
+    #   - _rank: maps each vertex name to its position in the contraction order
+    #   - _up: maps each vertex name to its neighbours of higher rank (through original
+    #       edges and shortcuts) and the weight of the edge to each of them
+    #   - _middle: maps a shortcut (u, w), in both directions, to the contracted vertex
+    #       that the shortcut skips over
+    #   - shortcuts: the number of shortcut edges added during preprocessing
+    _rank: dict[Any, int]
+    _up: dict[Any, dict[Any, float]]
+    _middle: dict[tuple[Any, Any], Any]
+    shortcuts: int
+
+    def __init__(self, map_graph: MapGraph) -> None:
+        """Build the contraction hierarchy of the given graph."""
+        self._rank = {}
+        self._up = {}
+        self._middle = {}
+        self.shortcuts = 0
+
+        # A working copy of the graph from which contracted vertices are removed
+        adj = {v: dict(map_graph.weighted_neighbours(v)) for v in map_graph.get_all_vertices()}
+        contracted_neighbours = dict.fromkeys(adj, 0)
+
+        order = []
+        for v in adj:
+            heappush(order, (self._priority(adj, v, contracted_neighbours), v))
+
+        while order:
+            _, v = heappop(order)
+            # Lazy update: recompute the priority and put v back if it is no longer the lowest
+            priority = self._priority(adj, v, contracted_neighbours)
+            if order and priority > order[0][0]:
+                heappush(order, (priority, v))
+                continue
+            self._contract(adj, v, contracted_neighbours)
+
+    def query(self, start_vertex: Any, end_vertex: Any,
+              stats: Optional[SearchStats] = None) -> list:
+        """Return the shortest path from start_vertex to end_vertex as a list of the original
+        vertices of the graph.
+
+        Raise NoShortestPathError when there is no possible shortest path between the two
+        vertices. If stats is given, the work of the search is added to it.
+
+        Preconditions:
+            - start_vertex and end_vertex are vertices of the graph this hierarchy was built from
+        """
+        if start_vertex == end_vertex:
+            return [start_vertex]
+
+        # Index 0 holds the upward search from start_vertex, index 1 from end_vertex
+        d = ({start_vertex: 0}, {end_vertex: 0})
+        path_via = ({start_vertex: None}, {end_vertex: None})
+        queues = (IndexedPriorityQueue(), IndexedPriorityQueue())
+        queues[0].enqueue(start_vertex, 0)
+        queues[1].enqueue(end_vertex, 0)
+        best, meeting = math.inf, None
+        settled = relaxed = 0
+
+        while True:
+            # A side is finished once its queue is empty or cannot improve on best
+            active = [side for side in (0, 1)
+                      if not queues[side].is_empty() and queues[side].peek_priority() < best]
+            if not active:
+                break
+            side = min(active, key=lambda s: queues[s].peek_priority())
+            i = queues[side].dequeue()
+            settled += 1
+            d_i = d[side][i]
+            if i in d[1 - side] and d_i + d[1 - side][i] < best:
+                best, meeting = d_i + d[1 - side][i], i
+            for v, weight in self._up[i].items():
+                relaxed += 1
+                new_d = d_i + weight
+                if new_d < d[side].get(v, math.inf):
+                    d[side][v] = new_d
+                    queues[side].decrease_key(v, new_d)
+                    path_via[side][v] = i
+
+        if stats is not None:
+            stats.record('ch', settled, relaxed)
+        if meeting is None:
+            raise NoShortestPathError
+
+        # Collect the hierarchy path start_vertex -> meeting -> end_vertex
+        upward = [meeting]
+        while path_via[0][upward[-1]] is not None:
+            upward.append(path_via[0][upward[-1]])
+        upward.reverse()
+        curr = meeting
+        while path_via[1][curr] is not None:
+            curr = path_via[1][curr]
+            upward.append(curr)
+
+        path = [upward[0]]
+        for k in range(1, len(upward)):
+            self._unpack(upward[k - 1], upward[k], path)
+        return path
+
+    def distance(self, start_vertex: Any, end_vertex: Any) -> float:
+        """Return the length of the shortest path from start_vertex to end_vertex.
+
+        Raise NoShortestPathError when there is no possible shortest path between the two
+        vertices.
+        """
+        path = self.query(start_vertex, end_vertex)
+        return sum(self._edge_weight(path[k - 1], path[k]) for k in range(1, len(path)))
+
+    def _edge_weight(self, u: Any, w: Any) -> float:
+        """Return the weight of the hierarchy edge between u and w."""
+        if self._rank[u] < self._rank[w]:
+            return self._up[u][w]
+        else:
+            return self._up[w][u]
+
+    def _unpack(self, u: Any, w: Any, path: list) -> None:
+        """Append the original vertices on the hierarchy edge from u to w to path, excluding u.
+        """
+        # Iterative to avoid deep recursion on long chains of nested shortcuts
+        stack = [(u, w)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._middle.get((a, b))
+            if middle is None:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def _contract(self, adj: dict, v: Any, contracted_neighbours: dict) -> None:
+        """Contract v: give it the next rank, add the shortcuts needed between its remaining
+        neighbours and remove it from adj.
+        """
+        neighbours = adj.pop(v)
+        self._rank[v] = len(self._rank)
+        self._up[v] = dict(neighbours)
+        for u in neighbours:
+            del adj[u][v]
+            contracted_neighbours[u] += 1
+
+        for u, w, weight in self._needed_shortcuts(adj, v, neighbours):
+            if weight < adj[u].get(w, math.inf):
+                adj[u][w] = adj[w][u] = weight
+                self._middle[(u, w)] = self._middle[(w, u)] = v
+                self.shortcuts += 1
+
+    def _priority(self, adj: dict, v: Any, contracted_neighbours: dict) -> int:
+        """Return the contraction priority of v: the number of shortcuts its contraction would
+        add minus its degree, plus the number of its neighbours already contracted.
+        """
+        neighbours = adj[v]
+        shortcuts = len(self._needed_shortcuts(adj, v, neighbours))
+        return shortcuts - len(neighbours) + contracted_neighbours[v]
+
+    def _needed_shortcuts(self, adj: dict, v: Any,
+                          neighbours: dict) -> list[tuple[Any, Any, float]]:
+        """Return the shortcuts (u, w, weight) needed between the given neighbours of v when v
+        is contracted, that is the pairs with no witness path avoiding v that is at most as
+        long as the path via v.
+        """
+        result = []
+        names = list(neighbours)
+        for a in range(len(names)):
+            u = names[a]
+            targets = {names[b]: neighbours[u] + neighbours[names[b]]
+                       for b in range(a + 1, len(names))}
+            if not targets:
+                continue
+            witness = _witness_search(adj, u, v, max(targets.values()), targets)
+            for w, via_v in targets.items():
+                if witness.get(w, math.inf) > via_v:
+                    result.append((u, w, via_v))
+        return result
+
+
+def _witness_search(adj: dict, source: Any, excluded: Any, limit: float,
+                    targets: dict) -> dict:
+    """Return the distances from source found by a Dijkstra search in adj that avoids
+    excluded, stops past the given distance limit and settles at most WITNESS_SETTLE_LIMIT
+    vertices.
+    """
+    d = {source: 0}
+    heap = [(0, source)]
+    remaining = len(targets)
+    settled = 0
+    done = set()
+    while heap and settled < WITNESS_SETTLE_LIMIT and remaining > 0:
+        d_i, i = heappop(heap)
+        if i in done:
+            continue
+        if d_i > limit:
+            break
+        done.add(i)
+        settled += 1
+        if i in targets:
+            remaining -= 1
+        for v, weight in adj[i].items():
+            if v != excluded and d_i + weight < d.get(v, math.inf):
+                d[v] = d_i + weight
+                heappush(heap, (d[v], v))
+    return d
+
+
+def hierarchy_for(map_graph: MapGraph) -> ContractionHierarchy:
+    """Return the contraction hierarchy of map_graph, building it the first time it is
+    requested for this graph.
+
+    Call this once at startup, after the graph is loaded, so that later queries with the
+    'ch' engine of shortest_path do not pay for the preprocessing. The hierarchy is rebuilt
+    if the graph has changed since it was built, except for changes of access rules, which do
+    not change any edge weight.
+    """
+    version = map_graph.get_version()
+    if map_graph in _HIERARCHIES:
+        built_version, hierarchy = _HIERARCHIES[map_graph]
+        if built_version == version or map_graph.changes_since(built_version) == []:
+            return hierarchy
+    _HIERARCHIES[map_graph] = (version, ContractionHierarchy(map_graph))
+    return _HIERARCHIES[map_graph][1]
+
+
+def attach_hierarchy(map_graph: MapGraph, hierarchy: ContractionHierarchy) -> None:
+    """Make hierarchy_for return hierarchy for map_graph until the graph changes, such as in
+    a worker process that receives a copy of a graph with the hierarchy already built for it.
+
+    Preconditions:
+        - hierarchy was built from map_graph, or from a graph with the same vertices and edges
+    """
+    _HIERARCHIES[map_graph] = (map_graph.get_version(), hierarchy)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'map_graph', 'heapq',
+                          'weakref', 'dijkstra'],
+        'disable': ['R1705', 'C0200']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,280 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the CSRGraph class, a frozen, array-backed copy of a MapGraph in compressed
+sparse row (CSR) form. Each vertex gets an integer id, and the neighbours of vertex i are the
+entries offsets[i] to offsets[i + 1] of the targets and weights arrays. The coordinates of the
+vertices are stored in two more arrays. A CSRGraph uses much less memory per vertex than a
+MapGraph, keeps the edges of a vertex next to each other, and lets the routing engines in
+dijkstra.py relax edges without creating any objects.
+
+A CSRGraph has no access rules (see MapGraph.set_edge_modes): every mode can use every edge at
+its usual speed. A MapGraph with access rules cannot be converted, so that its rules are never
+dropped without notice; such a graph is searched as a MapGraph instead.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+from array import array
+from typing import Any, Iterator, Optional, Union
+from distance import distance, pairwise_distances
+from map_graph import MapGraph
+
+# The kinds of vertices, stored in CSRGraph.kinds by their index in this tuple
+KINDS = ('corner', 'building')
+
+
+class CSRGraph:
+    """A read-only weighted graph in compressed sparse row form.
+
+    CSRGraph has the same methods for reading a graph as MapGraph, so it can be passed to
+    shortest_path and the other routing functions, but it cannot be changed once built.
+
+    Instance Attributes:
+        - names: the name of each vertex, indexed by vertex id
+        - kinds: the index in KINDS of the kind of each vertex
+        - lats: the latitude of each vertex
+        - lngs: the longitude of each vertex
+        - offsets: the edges of vertex i are at positions offsets[i] to offsets[i + 1] - 1
+        - targets: the vertex id at the other end of each edge
+        - weights: the weight of each edge
+
+    Representation Invariants:
+        - len(self.offsets) == len(self.names) + 1
+        - len(self.targets) == len(self.weights) == self.offsets[-1]
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (43.0, -79.0), 'corner')
+    >>> g.add_vertex('B', (43.1, -79.0), 'building')
+    >>> g.add_edge('A', 'B', 12000)
+    >>> csr = CSRGraph.from_map_graph(g)
+    >>> csr.get_neighbours('A'), csr.get_distance('B', 'A'), csr.get_location('B')
+    ({'B'}, 12000.0, (43.1, -79.0))
+    >>> restored = csr.to_map_graph()
+    >>> restored.get_distance('A', 'B'), restored.get_all_vertices('building')
+    (12000.0, {'B'})
+    """
+    names: list[Any]
+    kinds: array
+    lats: array
+    lngs: array
+    offsets: array
+    targets: array
+    weights: array
+
+    # Private Instance Attributes:
+    #   - _index: maps each vertex name to its id
+    #   - _min_weight_ratio: the same bound as MapGraph._min_weight_ratio
+    _index: dict[Any, int]
+    _min_weight_ratio: float
+
+    def __init__(self, names: list, kinds: array, lats: array, lngs: array,
+                 offsets: array, targets: array, weights: array,
+                 min_weight_ratio: Optional[float] = None) -> None:
+        """Initialize a graph from its arrays. Use from_map_graph to convert a MapGraph.
+
+        The arrays may also be views of a shared buffer, such as a memoryview cast to the
+        matching type. min_weight_ratio is the value of weight_ratio() for these arrays if it
+        is already known; otherwise it is computed from every edge.
+        """
+        self.names = names
+        self.kinds = kinds
+        self.lats = lats
+        self.lngs = lngs
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self._index = {name: i for i, name in enumerate(names)}
+        if min_weight_ratio is not None:
+            self._min_weight_ratio = min_weight_ratio
+            return
+
+        # Measure every edge in one batched call; sources[k] is the vertex edge k leaves from
+        sources = [i for i in range(len(names)) for _ in range(offsets[i], offsets[i + 1])]
+        great_circles = pairwise_distances([lats[i] for i in sources], [lngs[i] for i in sources],
+                                           [lats[j] for j in targets], [lngs[j] for j in targets])
+        self._min_weight_ratio = 1.0
+        for k, great_circle in enumerate(great_circles):
+            i, j = sources[k], targets[k]
+            if (lats[i], lngs[i]) != (lats[j], lngs[j]) and great_circle > 0:
+                self._min_weight_ratio = min(self._min_weight_ratio, weights[k] / great_circle)
+
+    def __getstate__(self) -> dict:
+        """Return the state of this graph to be pickled, copying any arrays that are views of
+        a shared buffer (which cannot be pickled) into plain arrays.
+        """
+        state = {'names': self.names, 'min_weight_ratio': self._min_weight_ratio}
+        for name, typecode in (('kinds', 'b'), ('lats', 'd'), ('lngs', 'd'), ('offsets', 'q'),
+                               ('targets', 'i'), ('weights', 'd')):
+            state[name] = array(typecode, getattr(self, name))
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore this graph from the state returned by __getstate__."""
+        self.__init__(state['names'], state['kinds'], state['lats'], state['lngs'],
+                      state['offsets'], state['targets'], state['weights'],
+                      state['min_weight_ratio'])
+
+    @classmethod
+    def from_map_graph(cls, map_graph: Union[MapGraph, CSRGraph]) -> CSRGraph:
+        """Return the CSR form of map_graph. Vertex ids follow the sorted vertex names.
+
+        Raise a ValueError if map_graph is a MapGraph with access rules, which a CSRGraph
+        cannot hold.
+        """
+        if isinstance(map_graph, MapGraph) and map_graph.has_mode_rules():
+            raise ValueError
+        names = sorted(map_graph.get_all_vertices())
+        index = {name: i for i, name in enumerate(names)}
+        buildings = map_graph.get_all_vertices('building')
+        kinds = array('b', (KINDS.index('building') if name in buildings
+                            else KINDS.index('corner') for name in names))
+        lats, lngs = array('d'), array('d')
+        offsets, targets, weights = array('q', [0]), array('i'), array('d')
+
+        for name in names:
+            lat, lng = map_graph.get_location(name)
+            lats.append(lat)
+            lngs.append(lng)
+            for neighbour, weight in sorted(map_graph.weighted_neighbours(name)):
+                targets.append(index[neighbour])
+                weights.append(weight)
+            offsets.append(len(targets))
+        return cls(names, kinds, lats, lngs, offsets, targets, weights)
+
+    def to_map_graph(self) -> MapGraph:
+        """Return a new MapGraph with the same vertices and edges as this graph."""
+        g = MapGraph()
+        for i, name in enumerate(self.names):
+            g.add_vertex(name, (self.lats[i], self.lngs[i]), KINDS[self.kinds[i]])
+        for i, name in enumerate(self.names):
+            for k in range(self.offsets[i], self.offsets[i + 1]):
+                if i < self.targets[k]:
+                    g.add_edge(name, self.names[self.targets[k]], self.weights[k])
+        return g
+
+    def __len__(self) -> int:
+        """Return the number of vertices in this graph."""
+        return len(self.names)
+
+    def index(self, name: Any) -> int:
+        """Return the id of the vertex with the given name.
+
+        Raise a ValueError if name does not appear as a vertex in this graph.
+        """
+        if name in self._index:
+            return self._index[name]
+        else:
+            raise ValueError
+
+    def weight_ratio(self) -> float:
+        """Return the factor that distance_lower_bound scales the great-circle distance by."""
+        return self._min_weight_ratio
+
+    def get_version(self) -> int:
+        """Return the version of this graph, which never changes since it is frozen."""
+        return 0
+
+    def get_distance(self, name1: Any, name2: Any) -> float:
+        """Return the weight of the edge between the given vertices, or 0 if they are not
+        adjacent.
+        """
+        j = self._index[name2]
+        for k in range(self.offsets[self._index[name1]], self.offsets[self._index[name1] + 1]):
+            if self.targets[k] == j:
+                return self.weights[k]
+        return 0
+
+    def adjacent(self, name1: Any, name2: Any) -> bool:
+        """Return whether name1 and name2 are adjacent vertices in this graph.
+
+        Return False if name1 or name2 do not appear as vertices in this graph.
+        """
+        if name1 in self._index and name2 in self._index:
+            i, j = self._index[name1], self._index[name2]
+            return any(self.targets[k] == j for k in range(self.offsets[i], self.offsets[i + 1]))
+        else:
+            return False
+
+    def get_neighbours(self, name: Any) -> set:
+        """Return a set of the names of the neighbours of the given vertex.
+
+        Raise a ValueError if name does not appear as a vertex in this graph.
+        """
+        i = self.index(name)
+        return {self.names[self.targets[k]] for k in range(self.offsets[i], self.offsets[i + 1])}
+
+    def weighted_neighbours(self, name: Any) -> Iterator[tuple[Any, float]]:
+        """Return an iterator over (neighbour name, edge weight) pairs of the given vertex.
+
+        Raise a ValueError if name does not appear as a vertex in this graph.
+        """
+        i = self.index(name)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(map(self.names.__getitem__, self.targets[start:end]), self.weights[start:end])
+
+    def get_all_vertices(self, kind: str = '') -> set:
+        """Return a set of all vertex names in this graph, or only those of the given kind.
+
+        Preconditions:
+            - kind in {'', 'corner', 'building'}
+        """
+        if kind != '':
+            k = KINDS.index(kind)
+            return {self.names[i] for i in range(len(self.names)) if self.kinds[i] == k}
+        else:
+            return set(self.names)
+
+    def get_kind(self, name: Any) -> str:
+        """Return the kind of the given vertex: 'building' or 'corner'.
+
+        Preconditions:
+            - name in self.get_all_vertices()
+        """
+        return KINDS[self.kinds[self._index[name]]]
+
+    def get_location(self, name: Any) -> tuple:
+        """Return the (latitude, longitude) of the given vertex.
+
+        Preconditions:
+            - name in self.get_all_vertices()
+        """
+        i = self._index[name]
+        return (self.lats[i], self.lngs[i])
+
+    def distance_lower_bound(self, name1: Any, name2: Any) -> float:
+        """Return a lower bound on the length of any path between the given vertices, as in
+        MapGraph.distance_lower_bound.
+        """
+        i, j = self._index[name1], self._index[name2]
+        if (self.lats[i], self.lngs[i]) == (self.lats[j], self.lngs[j]):
+            return 0.0
+        return self._min_weight_ratio * distance(self.lngs[i], self.lngs[j],
+                                                 self.lats[i], self.lats[j])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'array', 'distance', 'map_graph'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
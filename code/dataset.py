@@ -0,0 +1,294 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the CampusDataset class, which reads the building file (UofTMap.json) and
+the corner file (full_corner.json) once each and keeps their records in columnar form: one array
+per field instead of one dictionary per record. The records are streamed from the files, so even
+very large files are never decoded into a single JSON tree. Both the MapGraph and the list of
+building names are built from the same CampusDataset.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import json
+import time
+from array import array
+from typing import Any, Iterator, Optional
+from map_graph import MapGraph
+from distance import pairwise_distances
+
+# The number of characters read from a file at a time while streaming its records
+CHUNK_SIZE = 1 << 16
+
+# The characters that can follow the start of a JSON number and still be part of it
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class CampusDataset:
+    """The building and corner records of a campus, stored column by column.
+
+    Buildings with a name that already appeared earlier in the building file are skipped, and
+    each corner is stored once, with the coordinates of its first appearance.
+
+    Instance Attributes:
+        - names: the name of each building, in file order
+        - lats: the latitude of each building
+        - lngs: the longitude of each building
+        - cat_ids: the category id (catId) of each building
+        - level_offsets: the levels of building i are level_values[level_offsets[i]] to
+            level_values[level_offsets[i + 1] - 1]
+        - level_values: the levels of all buildings, one building after another
+        - corner_names: the id of each corner, in order of first appearance
+        - corner_lats: the latitude of each corner
+        - corner_lngs: the longitude of each corner
+        - edge_from: the index in corner_names of the first corner of each street segment
+        - edge_to: the index in corner_names of the second corner of each street segment
+        - edge_dist: the length in whole metres of each street segment
+
+    Representation Invariants:
+        - len(self.names) == len(self.lats) == len(self.lngs) == len(self.cat_ids)
+        - len(self.level_offsets) == len(self.names) + 1
+        - len(self.edge_from) == len(self.edge_to) == len(self.edge_dist)
+
+    >>> data = CampusDataset('Data/UofTMap.json', 'Data/full_corner.json')
+    >>> len(data.names), len(data.corner_names)
+    (450, 1076)
+    >>> data.names[0], data.levels(0)
+    ('TWH - Krembil Discovery Tower', [0])
+    """
+    names: list[str]
+    lats: array
+    lngs: array
+    cat_ids: array
+    level_offsets: array
+    level_values: array
+    corner_names: list[str]
+    corner_lats: array
+    corner_lngs: array
+    edge_from: array
+    edge_to: array
+    edge_dist: array
+
+    def __init__(self, building_file: Optional[str] = None, corner_file: Optional[str] = None,
+                 timings: Optional[dict] = None) -> None:
+        """Read the given building file and corner file. Either may be left out, in which
+        case its columns stay empty.
+
+        If timings is given, the seconds spent reading each file are stored in it under the
+        keys 'read_buildings' and 'read_corners'.
+
+        Precondition:
+            - building_file and corner_file are as in load_weighted_graph
+        """
+        if timings is None:
+            timings = {}
+        self.names = []
+        self.lats, self.lngs = array('d'), array('d')
+        self.cat_ids = array('q')
+        self.level_offsets, self.level_values = array('q', [0]), array('q')
+        self.corner_names = []
+        self.corner_lats, self.corner_lngs = array('d'), array('d')
+        self.edge_from, self.edge_to, self.edge_dist = array('i'), array('i'), array('q')
+
+        if corner_file is not None:
+            start = time.perf_counter()
+            self._read_corners(corner_file)
+            timings['read_corners'] = time.perf_counter() - start
+        if building_file is not None:
+            start = time.perf_counter()
+            self._read_buildings(building_file)
+            timings['read_buildings'] = time.perf_counter() - start
+
+    def _read_buildings(self, building_file: str) -> None:
+        """Append the buildings of building_file to the building columns."""
+        seen = set()
+        for p in iter_json_array(building_file):
+            if p['name'] not in seen:
+                seen.add(p['name'])
+                self.names.append(p['name'])
+                self.lats.append(p['lat'])
+                self.lngs.append(p['lng'])
+                self.cat_ids.append(p.get('catId', 0))
+                self.level_values.extend(p.get('level', []))
+                self.level_offsets.append(len(self.level_values))
+
+    def _read_corners(self, corner_file: str) -> None:
+        """Append the corners and street segments of corner_file to the corner columns."""
+        index = {}
+        for p in iter_json_array(corner_file):
+            nodes = p['nodes'][0].split('-')
+            coords = p['coordinates']
+            for k in (0, 1):
+                if nodes[k] not in index:
+                    index[nodes[k]] = len(self.corner_names)
+                    self.corner_names.append(nodes[k])
+                    self.corner_lats.append(coords[k][0])
+                    self.corner_lngs.append(coords[k][1])
+            self.edge_from.append(index[nodes[0]])
+            self.edge_to.append(index[nodes[1]])
+            self.edge_dist.append(int(p["distance_metres"][0]))
+
+    def levels(self, i: int) -> list[int]:
+        """Return the levels of the building at index i."""
+        return list(self.level_values[self.level_offsets[i]:self.level_offsets[i + 1]])
+
+    def building_names(self) -> list[str]:
+        """Return the names of the buildings without duplicates, in file order."""
+        return list(self.names)
+
+    def build_graph(self, timings: Optional[dict] = None) -> MapGraph:
+        """Return the MapGraph of this dataset, the same graph as load_weighted_graph returns
+        for the files it was read from.
+
+        If timings is given, the seconds spent adding the corners and the buildings are
+        stored in it under the keys 'corners' and 'buildings'.
+
+        Preconditions:
+            - both a building file and a corner file were read
+        """
+        if timings is None:
+            timings = {}
+        g = MapGraph()
+
+        start = time.perf_counter()
+        for i, name in enumerate(self.corner_names):
+            g.add_vertex(name, (self.corner_lats[i], self.corner_lngs[i]), 'corner')
+        edges = {}  # maps (corner, corner) in increasing order to the distance of the edge
+        for k in range(len(self.edge_dist)):
+            a, b, dist = self.edge_from[k], self.edge_to[k], self.edge_dist[k]
+            # Skip segments from a corner to itself, and reverse-direction records that
+            # repeat the distance of an edge that was already added
+            if a != b and edges.get((min(a, b), max(a, b))) != dist:
+                edges[(min(a, b), max(a, b))] = dist
+                g.add_edge(self.corner_names[a], self.corner_names[b], dist)
+        timings['corners'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pairs = []  # (building index, corner name) of each building connection
+        for i, name in enumerate(self.names):
+            g.add_vertex(name, (self.lats[i], self.lngs[i]), 'building')
+            # Connect each building to its closest three corners
+            pairs.extend((i, v) for v in g.find_closest_vertex(name))
+
+        corner_locations = [g.get_location(v) for _, v in pairs]
+        dists = pairwise_distances([self.lats[i] for i, _ in pairs],
+                                   [self.lngs[i] for i, _ in pairs],
+                                   [location[0] for location in corner_locations],
+                                   [location[1] for location in corner_locations],
+                                   exact=True)
+        for (i, v), dist in zip(pairs, dists):
+            g.add_edge(self.names[i], v, float(dist))
+        timings['buildings'] = time.perf_counter() - start
+
+        return g
+
+
+def iter_json_array(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of the JSON array stored in the file at path, one at a time.
+
+    The file is read chunk_size characters at a time, and only the text of the elements that
+    have not been yielded yet is kept, so the memory used does not grow with the file.
+
+    Raise a ValueError if the file does not contain a JSON array.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'test.json')
+    >>> def parse(text: str, chunk_size: int) -> list:
+    ...     with open(path, 'w') as f:
+    ...         _ = f.write(text)
+    ...     return list(iter_json_array(path, chunk_size))
+    >>> [parse('[1.5, 2e3, true, "a,]"]', size) for size in (1, 2, 3)]
+    [[1.5, 2000.0, True, 'a,]'], [1.5, 2000.0, True, 'a,]'], [1.5, 2000.0, True, 'a,]']]
+    >>> parse('       [ ]', 2)
+    []
+    >>> parse('[{"a":1} {"b":2}]', 4)
+    Traceback (most recent call last):
+    ValueError
+    >>> parse('[{"a":1},]', 4)
+    Traceback (most recent call last):
+    ValueError
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer, pos, at_end = '', 0, False
+        # What may come next: '[', the first element or ']', an element, or ',' or ']'
+        expected = 'start'
+        while True:
+            pos = _skip(buffer, pos)
+            if pos == len(buffer):
+                if at_end:
+                    raise ValueError
+                # Drop the text already read and read more of the file
+                chunk = f.read(chunk_size)
+                at_end = chunk == ''
+                buffer, pos = chunk, 0
+                continue
+
+            char = buffer[pos]
+            if expected == 'start':
+                if char != '[':
+                    raise ValueError
+                expected, pos = 'first', pos + 1
+            elif expected == 'separator' or (expected == 'first' and char == ']'):
+                if char == ']':
+                    return
+                if char != ',':
+                    raise ValueError
+                expected, pos = 'element', pos + 1
+            elif char == ']':
+                raise ValueError
+            else:
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                    # A number that runs to the end of the buffer or up to a character that
+                    # could extend it may continue in the file
+                    complete = at_end or (end < len(buffer) and not (
+                        isinstance(element, (int, float)) and buffer[end] in _NUMBER_CHARS))
+                except json.JSONDecodeError:
+                    complete = False
+                if complete:
+                    yield element
+                    expected, pos = 'separator', end
+                elif at_end:
+                    raise ValueError
+                else:
+                    chunk = f.read(chunk_size)
+                    at_end = chunk == ''
+                    buffer, pos = buffer[pos:] + chunk, 0
+
+
+def _skip(text: str, pos: int) -> int:
+    """Return the index of the first character of text at or after pos that is not whitespace.
+    """
+    while pos < len(text) and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'json', 'time', 'array', 'map_graph',
+                          'distance'],
+        'allowed-io': ['iter_json_array'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -4,7 +4,9 @@ Module Description
 ==================
 This python module contains the PriorityQueue class that we use to store vertices with the priority
 of distance and methods involving Dijkstra's algorithm in order to return the list showing the
-shortest path from starting vertex to destination vertex.
+shortest path from starting vertex to destination vertex. The IndexedPriorityQueue class keeps
+the position of each vertex in the heap so that Dijkstra's algorithm can lower the distance of a
+vertex in logarithmic time; the original PriorityQueue is kept as a reference implementation.
 
 Copyright and Usage Information
 ===============================
@@ -18,9 +20,13 @@ please consult our Course Syllabus.
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
 import math
-from typing import Any, Dict
+import weakref
+from collections import OrderedDict
+from array import array
+from typing import Any, Dict, Optional, Union
 from heapq import heapify, heappush, heappop
 from map_graph import MapGraph
+from csr_graph import CSRGraph
 
 
 class NoShortestPathError(Exception):
@@ -38,6 +44,46 @@ class EmptyPriorityQueueError(Exception):
         return 'You called dequeue on an empty priority queue.'
 
 
+class SearchStats:
+    """Counters describing the work done by a single shortest-path query.
+
+    Instance Attributes:
+        - settled: the number of vertices removed from the priority queue
+        - relaxed: the number of edges examined while expanding settled vertices
+        - engine: the name of the engine that answered the query
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 1)
+    >>> stats = SearchStats()
+    >>> shortest_path('A', 'B', g, 'point_to_point', stats)
+    ['A', 'B']
+    >>> (stats.engine, stats.settled, stats.relaxed)
+    ('point_to_point', 2, 1)
+    """
+    settled: int
+    relaxed: int
+    engine: str
+
+    def __init__(self) -> None:
+        """Initialize counters for a query that has not run yet."""
+        self.settled = 0
+        self.relaxed = 0
+        self.engine = ''
+
+    def __repr__(self) -> str:
+        """Return a string representation of these counters."""
+        return 'SearchStats(engine={0!r}, settled={1}, relaxed={2})'.format(
+            self.engine, self.settled, self.relaxed)
+
+    def record(self, engine: str, settled: int, relaxed: int) -> None:
+        """Add the work of one search with the given engine to these counters."""
+        self.engine = engine
+        self.settled += settled
+        self.relaxed += relaxed
+
+
 class PriorityQueue:
     """A queue of items that can be dequeued in priority order.
 
@@ -83,9 +129,148 @@ class PriorityQueue:
         heapify(self._items)
 
 
-def dijkstra(map_graph: MapGraph, start_vertex: str) -> Dict:
+class IndexedPriorityQueue:
+    """A binary min-heap of items that supports changing the priority of a queued item.
+
+    Every item in the queue is stored with its position in the heap, so that decrease_key
+    only needs to sift the item up instead of scanning and re-heapifying the whole list.
+    Items with equal priority are dequeued in the order of the items themselves, which is
+    the same order that PriorityQueue uses.
+
+    >>> pq = IndexedPriorityQueue()
+    >>> pq.enqueue('A', 5)
+    >>> pq.enqueue('B', 3)
+    >>> pq.decrease_key('A', 1)
+    >>> pq.dequeue()
+    'A'
+    >>> 'A' in pq
+    False
+    >>> pq.dequeue()
+    'B'
+    >>> pq.is_empty()
+    True
+    """
+
+    # Private Instance Attributes:
+    #   - _heap: a list of [priority, item] pairs satisfying the heap property
+    #   - _position: maps each item in the queue to its index in _heap
+    _heap: list[list[Any]]
+    _position: dict[Any, int]
+
+    def __init__(self) -> None:
+        """Initialize a new and empty indexed priority queue."""
+        self._heap = []
+        self._position = {}
+
+    def __len__(self) -> int:
+        """Return the number of items in this priority queue."""
+        return len(self._heap)
+
+    def __contains__(self, item: Any) -> bool:
+        """Return whether the given item is currently in this priority queue."""
+        return item in self._position
+
+    def is_empty(self) -> bool:
+        """Return whether this priority queue contains no items."""
+        return not self._heap
+
+    def peek_priority(self) -> float:
+        """Return the lowest priority value in this priority queue without removing it.
+
+        Raise an EmptyPriorityQueueError when the priority queue is empty.
+        """
+        if not self._heap:
+            raise EmptyPriorityQueueError
+        return self._heap[0][0]
+
+    def enqueue(self, item: Any, priority: float) -> None:
+        """Add the given item with the given priority to this priority queue.
+
+        Preconditions:
+            - item not in self
+        """
+        self._heap.append([priority, item])
+        self._position[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def dequeue(self) -> Any:
+        """Remove and return the item with the lowest priority value.
+
+        Raise an EmptyPriorityQueueError when the priority queue is empty.
+        """
+        if not self._heap:
+            raise EmptyPriorityQueueError
+        last = self._heap.pop()
+        if not self._heap:
+            del self._position[last[1]]
+            return last[1]
+        top = self._heap[0]
+        self._heap[0] = last
+        self._position[last[1]] = 0
+        del self._position[top[1]]
+        self._sift_down(0)
+        return top[1]
+
+    def decrease_key(self, item: Any, priority: float) -> None:
+        """Lower the priority of the given item to the given priority.
+
+        If the item is not in the queue, it is added with the given priority.
+
+        Preconditions:
+            - item not in self or priority <= the current priority of item
+        """
+        if item not in self._position:
+            self.enqueue(item, priority)
+        else:
+            i = self._position[item]
+            self._heap[i][0] = priority
+            self._sift_up(i)
+
+    def _sift_up(self, i: int) -> None:
+        """Move the entry at index i up until the heap property holds."""
+        heap, position = self._heap, self._position
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if entry < heap[parent]:
+                heap[i] = heap[parent]
+                position[heap[i][1]] = i
+                i = parent
+            else:
+                break
+        heap[i] = entry
+        position[entry[1]] = i
+
+    def _sift_down(self, i: int) -> None:
+        """Move the entry at index i down until the heap property holds."""
+        heap, position = self._heap, self._position
+        n = len(heap)
+        entry = heap[i]
+        child = 2 * i + 1
+        while child < n:
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[child] < entry:
+                heap[i] = heap[child]
+                position[heap[i][1]] = i
+                i = child
+                child = 2 * i + 1
+            else:
+                break
+        heap[i] = entry
+        position[entry[1]] = i
+
+
+def dijkstra(map_graph: Union[MapGraph, CSRGraph], start_vertex: str,
+             queue: str = 'indexed') -> Dict:
     """Return a dictionary for the minimum path that took to reach each vertex.
 
+    queue selects the priority queue used by the search: 'indexed' uses the
+    IndexedPriorityQueue with decrease-key, and 'reference' uses the original
+    PriorityQueue, which is kept for comparison. Both return the same dictionary.
+
+    Raise a ValueError if queue is not one of 'indexed' or 'reference'.
+
         Preconditions:
             - start_vertex in map_graph.get_all_vertices()
     >>> g = MapGraph()
@@ -99,6 +284,217 @@ def dijkstra(map_graph: MapGraph, start_vertex: str) -> Dict:
     >>> g.add_edge('C', 'D', 3)
     >>> dijkstra(g, 'A') == {'C': 'A', 'D': 'C', 'A': None, 'B': 'A'}
     True
+    >>> dijkstra(g, 'A', 'reference') == dijkstra(g, 'A')
+    True
+    """
+    if queue == 'indexed':
+        return shortest_path_tree(map_graph, start_vertex)[1]
+    elif queue == 'reference':
+        return _reference_dijkstra(map_graph, start_vertex)
+    else:
+        raise ValueError
+
+
+def shortest_path_tree(map_graph: Union[MapGraph, CSRGraph], start_vertex: str,
+                       stats: Optional[SearchStats] = None) -> tuple[Dict, Dict]:
+    """Return the distances and the path_via dictionary of the shortest-path tree
+    rooted at start_vertex.
+
+    Vertices that cannot be reached from start_vertex have a distance of math.inf and
+    a path_via entry of None. If stats is given, the work of the search is added to it.
+
+        Preconditions:
+            - start_vertex in map_graph.get_all_vertices()
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_vertex('C', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 4)
+    >>> g.add_edge('B', 'C', 1)
+    >>> d, path_via = shortest_path_tree(g, 'A')
+    >>> d == {'A': 0, 'B': 4, 'C': 5}
+    True
+    >>> path_via == {'A': None, 'B': 'A', 'C': 'B'}
+    True
+    """
+    if isinstance(map_graph, CSRGraph):
+        dist, pred = csr_shortest_path_tree(map_graph, map_graph.index(start_vertex), stats)
+        names = map_graph.names
+        return (dict(zip(names, dist)),
+                {names[i]: None if pred[i] == -1 else names[pred[i]] for i in range(len(names))})
+
+    vertices = map_graph.get_all_vertices()
+    d = dict.fromkeys(vertices, math.inf)  # distance pair with initial d = inf
+    path_via = dict.fromkeys(vertices, None)  # dictionary for the path for reaching a vertex
+    d[start_vertex] = 0
+
+    # Only vertices that have been reached are queued; the rest keep d = inf
+    pq = IndexedPriorityQueue()
+    pq.enqueue(start_vertex, 0)
+    settled = relaxed = 0
+
+    while not pq.is_empty():
+        i = pq.dequeue()
+        settled += 1
+        d_i = d[i]
+        for v, weight in map_graph.weighted_neighbours(i):
+            relaxed += 1
+            new_d = d_i + weight
+            if new_d < d[v]:
+                d[v] = new_d
+                pq.decrease_key(v, new_d)
+                path_via[v] = i
+
+    if stats is not None:
+        stats.record('dijkstra', settled, relaxed)
+    return d, path_via
+
+
+def repair_shortest_path_tree(map_graph: MapGraph, tree: tuple[Dict, Dict], changes: list,
+                              stats: Optional[SearchStats] = None) -> None:
+    """Update tree, the distances and path_via dictionary of a shortest-path tree of
+    map_graph, after the given changes of edge weights, as returned by
+    MapGraph.changes_since, so that it is the shortest-path tree of map_graph as it is now.
+
+    Only the vertices whose distance changes are searched again: the vertices below an edge
+    of the tree that became longer or was closed, and the vertices that an edge that became
+    shorter or was opened brings closer. The two dictionaries of tree are changed in place.
+    If stats is given, the work of the search is added to it.
+
+    >>> g = MapGraph()
+    >>> for name in ['A', 'B', 'C', 'D']:
+    ...     g.add_vertex(name, (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 1)
+    >>> g.add_edge('B', 'C', 1)
+    >>> g.add_edge('A', 'D', 5)
+    >>> g.add_edge('D', 'C', 5)
+    >>> tree = shortest_path_tree(g, 'A')
+    >>> version = g.get_version()
+    >>> g.close_edge('A', 'B')
+    >>> g.set_edge_weight('A', 'D', 2)
+    >>> repair_shortest_path_tree(g, tree, g.changes_since(version))
+    >>> tree == shortest_path_tree(g, 'A')
+    True
+    """
+    d, path_via = tree
+    # The first old weight and the last new weight of each changed edge
+    net = {}
+    for name1, name2, old, new in changes:
+        key = frozenset((name1, name2))
+        net[key] = (name1, name2, net[key][2] if key in net else old, new)
+
+    # The vertices whose path in the tree used an edge that became longer
+    roots = []
+    for name1, name2, old, new in net.values():
+        if new > old:
+            if path_via[name2] == name1:
+                roots.append(name2)
+            elif path_via[name1] == name2:
+                roots.append(name1)
+    affected = set()
+    if roots:
+        children = {}
+        for v, parent in path_via.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(v)
+        stack = roots
+        while stack:
+            v = stack.pop()
+            if v not in affected:
+                affected.add(v)
+                stack.extend(children.get(v, ()))
+        for v in affected:
+            d[v] = math.inf
+            path_via[v] = None
+
+    pq = IndexedPriorityQueue()
+    # The affected vertices start from their closest neighbour that was not affected
+    for v in affected:
+        for u, weight in map_graph.weighted_neighbours(v):
+            if u not in affected and d[u] + weight < d[v]:
+                d[v] = d[u] + weight
+                path_via[v] = u
+        if d[v] < math.inf:
+            pq.enqueue(v, d[v])
+    # The ends of the edges that became shorter start from each other
+    for name1, name2, old, new in net.values():
+        if new < old:
+            for u, v in ((name1, name2), (name2, name1)):
+                if d[u] + new < d[v]:
+                    d[v] = d[u] + new
+                    path_via[v] = u
+                    pq.decrease_key(v, d[v])
+
+    settled = relaxed = 0
+    while not pq.is_empty():
+        i = pq.dequeue()
+        settled += 1
+        d_i = d[i]
+        for v, weight in map_graph.weighted_neighbours(i):
+            relaxed += 1
+            new_d = d_i + weight
+            if new_d < d[v]:
+                d[v] = new_d
+                pq.decrease_key(v, new_d)
+                path_via[v] = i
+
+    if stats is not None:
+        stats.record('repair', settled, relaxed)
+
+
+def csr_shortest_path_tree(csr: CSRGraph, source: int,
+                           stats: Optional[SearchStats] = None) -> tuple[list, array]:
+    """Return the distances and predecessors of the shortest-path tree of csr rooted at the
+    vertex with id source.
+
+    Both are indexed by vertex id. Unreachable vertices have a distance of math.inf, and the
+    source and unreachable vertices have a predecessor of -1. The search works on the arrays
+    of csr directly, so relaxing an edge does not create any objects.
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_vertex('C', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 4)
+    >>> g.add_edge('B', 'C', 1)
+    >>> csr = CSRGraph.from_map_graph(g)
+    >>> dist, pred = csr_shortest_path_tree(csr, csr.index('A'))
+    >>> dist, list(pred)
+    ([0, 4.0, 5.0], [-1, 0, 1])
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    d = [math.inf] * len(csr)
+    pred = array('i', [-1]) * len(csr)
+    d[source] = 0
+
+    pq = IndexedPriorityQueue()
+    pq.enqueue(source, 0)
+    settled = relaxed = 0
+
+    while not pq.is_empty():
+        i = pq.dequeue()
+        settled += 1
+        d_i = d[i]
+        end = offsets[i + 1]
+        relaxed += end - offsets[i]
+        for k in range(offsets[i], end):
+            v = targets[k]
+            new_d = d_i + weights[k]
+            if new_d < d[v]:
+                d[v] = new_d
+                pq.decrease_key(v, new_d)
+                pred[v] = i
+
+    if stats is not None:
+        stats.record('dijkstra', settled, relaxed)
+    return d, pred
+
+
+def _reference_dijkstra(map_graph: Union[MapGraph, CSRGraph], start_vertex: str) -> Dict:
+    """Return the path_via dictionary of dijkstra using the original PriorityQueue.
+
+    Every vertex is enqueued up front and each relaxation calls
+    PriorityQueue.update_items_order, which takes linear time in the number of vertices.
     """
     pq = PriorityQueue()  # priority queue of vertices in the format of [[distance, vertex]]
     d = dict.fromkeys(map_graph.get_all_vertices(), math.inf)  # distance pair with initial d = inf
@@ -120,9 +516,320 @@ def dijkstra(map_graph: MapGraph, start_vertex: str) -> Dict:
     return path_via
 
 
-def shortest_path(start_vertex: str, end_vertex: str, g: MapGraph) -> list:
+def point_to_point(map_graph: Union[MapGraph, CSRGraph], start_vertex: str, end_vertex: str,
+                   stats: Optional[SearchStats] = None) -> list:
+    """Return the shortest path from start_vertex to end_vertex, stopping the search as soon as
+    end_vertex is settled.
+
+    Only the vertices that are reached before end_vertex is settled are stored, so nearby
+    vertices are found without touching the rest of the graph.
+
+    Raise NoShortestPathError when there is no possible shortest path between the two vertices.
+
+        Preconditions:
+            - start_vertex in map_graph.get_all_vertices()
+            - end_vertex in map_graph.get_all_vertices()
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_vertex('C', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 4)
+    >>> g.add_edge('B', 'C', 1)
+    >>> g.add_edge('A', 'C', 6)
+    >>> point_to_point(g, 'A', 'C')
+    ['A', 'B', 'C']
+    """
+    return _goal_directed(map_graph, start_vertex, end_vertex, False, stats)
+
+
+def a_star(map_graph: Union[MapGraph, CSRGraph], start_vertex: str, end_vertex: str,
+           stats: Optional[SearchStats] = None) -> list:
+    """Return the shortest path from start_vertex to end_vertex using A* search.
+
+    Vertices are expanded in order of their distance from start_vertex plus
+    map_graph.distance_lower_bound to end_vertex, which is the great-circle distance scaled
+    so that it never overestimates. The search is pulled towards end_vertex and settles
+    fewer vertices than point_to_point, while returning a path of the same length.
+
+    Raise NoShortestPathError when there is no possible shortest path between the two vertices.
+
+        Preconditions:
+            - start_vertex in map_graph.get_all_vertices()
+            - end_vertex in map_graph.get_all_vertices()
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (43.660, -79.395), 'corner')
+    >>> g.add_vertex('B', (43.661, -79.395), 'corner')
+    >>> g.add_vertex('C', (43.662, -79.395), 'corner')
+    >>> g.add_vertex('D', (43.659, -79.395), 'corner')
+    >>> g.add_edge('A', 'B', 111)
+    >>> g.add_edge('B', 'C', 111)
+    >>> g.add_edge('A', 'D', 111)
+    >>> stats = SearchStats()
+    >>> a_star(g, 'A', 'C', stats)
+    ['A', 'B', 'C']
+    >>> stats.settled
+    3
+    """
+    return _goal_directed(map_graph, start_vertex, end_vertex, True, stats)
+
+
+def _goal_directed(map_graph: Union[MapGraph, CSRGraph], start_vertex: str, end_vertex: str,
+                   use_heuristic: bool, stats: Optional[SearchStats]) -> list:
+    """Return the shortest path from start_vertex to end_vertex, stopping once end_vertex is
+    settled. This is the search behind point_to_point and, when use_heuristic is True, a_star.
+
+    Raise NoShortestPathError when there is no possible shortest path between the two vertices.
+    """
+    d = {start_vertex: 0}
+    path_via = {start_vertex: None}
+    closed = set()
+    pq = IndexedPriorityQueue()
+    pq.enqueue(start_vertex, 0)
+    settled = relaxed = 0
+    engine = 'astar' if use_heuristic else 'point_to_point'
+
+    while not pq.is_empty():
+        i = pq.dequeue()
+        settled += 1
+        if i == end_vertex:
+            if stats is not None:
+                stats.record(engine, settled, relaxed)
+            return _walk_path(path_via, start_vertex, end_vertex)
+        closed.add(i)
+        d_i = d[i]
+        for v, weight in map_graph.weighted_neighbours(i):
+            relaxed += 1
+            if v not in closed:
+                new_d = d_i + weight
+                if new_d < d.get(v, math.inf):
+                    d[v] = new_d
+                    if use_heuristic:
+                        pq.decrease_key(v, new_d + map_graph.distance_lower_bound(v, end_vertex))
+                    else:
+                        pq.decrease_key(v, new_d)
+                    path_via[v] = i
+
+    if stats is not None:
+        stats.record(engine, settled, relaxed)
+    raise NoShortestPathError
+
+
+def bidirectional(map_graph: Union[MapGraph, CSRGraph], start_vertex: str, end_vertex: str,
+                  stats: Optional[SearchStats] = None) -> list:
+    """Return the shortest path from start_vertex to end_vertex by searching forward from
+    start_vertex and backward from end_vertex at the same time.
+
+    The search stops when the sum of the smallest distances left in the two queues is at
+    least the length of the best path found where the two frontiers meet.
+
+    Raise NoShortestPathError when there is no possible shortest path between the two vertices.
+
+        Preconditions:
+            - start_vertex in map_graph.get_all_vertices()
+            - end_vertex in map_graph.get_all_vertices()
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_vertex('C', (0, 0), 'corner')
+    >>> g.add_vertex('D', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 4)
+    >>> g.add_edge('B', 'C', 1)
+    >>> g.add_edge('C', 'D', 2)
+    >>> g.add_edge('A', 'D', 8)
+    >>> bidirectional(g, 'A', 'D')
+    ['A', 'B', 'C', 'D']
+    """
+    if start_vertex == end_vertex:
+        return [start_vertex]
+
+    # Index 0 holds the forward search from start_vertex, index 1 the backward search
+    d = ({start_vertex: 0}, {end_vertex: 0})
+    path_via = ({start_vertex: None}, {end_vertex: None})
+    closed = (set(), set())
+    queues = (IndexedPriorityQueue(), IndexedPriorityQueue())
+    queues[0].enqueue(start_vertex, 0)
+    queues[1].enqueue(end_vertex, 0)
+    best, meeting = math.inf, None
+    settled = relaxed = 0
+
+    while not queues[0].is_empty() and not queues[1].is_empty():
+        if queues[0].peek_priority() + queues[1].peek_priority() >= best:
+            break
+        # Expand the side with the smaller queue so both frontiers grow evenly
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        i = queues[side].dequeue()
+        closed[side].add(i)
+        settled += 1
+        d_i = d[side][i]
+        for v, weight in map_graph.weighted_neighbours(i):
+            relaxed += 1
+            if v in closed[side]:
+                continue
+            new_d = d_i + weight
+            if new_d < d[side].get(v, math.inf):
+                d[side][v] = new_d
+                queues[side].decrease_key(v, new_d)
+                path_via[side][v] = i
+            if v in d[1 - side] and d[side][v] + d[1 - side][v] < best:
+                best, meeting = d[side][v] + d[1 - side][v], v
+
+    if stats is not None:
+        stats.record('bidirectional', settled, relaxed)
+    if meeting is None:
+        raise NoShortestPathError
+    forward = _walk_path(path_via[0], start_vertex, meeting)
+    backward = _walk_path(path_via[1], end_vertex, meeting)
+    return forward + backward[-2::-1]
+
+
+class ShortestPathTreeCache:
+    """A bounded cache of shortest-path trees keyed by their source vertex.
+
+    When the cache is full, the tree that was used least recently is evicted. The cached trees
+    belong to one graph: a lookup for a different graph clears the cache first. When the
+    weights of some edges of the graph have changed since a tree was computed, such as by
+    MapGraph.close_edge, the tree is repaired by repair_shortest_path_tree when it is next
+    looked up, which only searches the vertices whose distance changed. After any other
+    change, such as a new vertex, the tree is computed again.
+
+    Instance Attributes:
+        - maxsize: the maximum number of trees kept in the cache
+        - hits: the number of lookups answered from the cache
+        - misses: the number of lookups that had to run dijkstra
+        - repairs: the number of lookups answered by repairing a cached tree
+
+    Representation Invariants:
+        - self.maxsize >= 1
+        - len(self._trees) <= self.maxsize
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_vertex('C', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 1)
+    >>> cache = ShortestPathTreeCache(maxsize=2)
+    >>> shortest_path('A', 'B', g, cache=cache)
+    ['A', 'B']
+    >>> shortest_path('A', 'B', g, cache=cache)
+    ['A', 'B']
+    >>> (cache.hits, cache.misses)
+    (1, 1)
+    >>> g.add_edge('B', 'C', 1)
+    >>> shortest_path('A', 'C', g, cache=cache)
+    ['A', 'B', 'C']
+    >>> (cache.hits, cache.misses, cache.repairs)
+    (1, 1, 1)
+    >>> g.add_vertex('D', (0, 0), 'corner')
+    >>> shortest_path('A', 'C', g, cache=cache)
+    ['A', 'B', 'C']
+    >>> (cache.hits, cache.misses, cache.repairs)
+    (1, 2, 1)
+    """
+    maxsize: int
+    hits: int
+    misses: int
+    repairs: int
+
+    # Private Instance Attributes:
+    #   - _trees: maps a source vertex to the version of the graph its tree was computed at
+    #       and its (distances, path_via) pair, ordered from the least recently used to the
+    #       most recently used
+    #   - _graph: a weak reference to the graph the cached trees belong to
+    _trees: OrderedDict[Any, tuple[int, tuple[Dict, Dict]]]
+    _graph: Optional[weakref.ref]
+
+    def __init__(self, maxsize: int = 32) -> None:
+        """Initialize an empty cache that holds at most maxsize trees.
+
+        Preconditions:
+            - maxsize >= 1
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.repairs = 0
+        self._trees = OrderedDict()
+        self._graph = None
+
+    def __len__(self) -> int:
+        """Return the number of trees in this cache."""
+        return len(self._trees)
+
+    def get_tree(self, map_graph: Union[MapGraph, CSRGraph], start_vertex: str,
+                 stats: Optional[SearchStats] = None) -> tuple[Dict, Dict]:
+        """Return the distances and path_via dictionary of the shortest-path tree of
+        map_graph rooted at start_vertex, computing it only if it is not cached, and
+        repairing it if the graph has changed since it was.
+
+        If stats is given and the tree is computed or repaired, the work of the search is
+        added to it.
+
+        Preconditions:
+            - start_vertex in map_graph.get_all_vertices()
+        """
+        if self._graph is None or self._graph() is not map_graph:
+            self.clear()
+            self._graph = weakref.ref(map_graph)
+
+        version = map_graph.get_version()
+        if start_vertex in self._trees:
+            self._trees.move_to_end(start_vertex)
+            tree_version, tree = self._trees[start_vertex]
+            if tree_version == version:
+                self.hits += 1
+                return tree
+            changes = map_graph.changes_since(tree_version)
+            if changes is not None:
+                self.repairs += 1
+                repair_shortest_path_tree(map_graph, tree, changes, stats)
+                self._trees[start_vertex] = (version, tree)
+                return tree
+
+        self.misses += 1
+        tree = shortest_path_tree(map_graph, start_vertex, stats)
+        self._trees[start_vertex] = (version, tree)
+        self._trees.move_to_end(start_vertex)
+        if len(self._trees) > self.maxsize:
+            self._trees.popitem(last=False)
+        return tree
+
+    def clear(self) -> None:
+        """Remove every tree from this cache. The hit, miss and repair counts are kept."""
+        self._trees.clear()
+
+    def cache_info(self) -> dict[str, int]:
+        """Return the hits, misses, repairs, current size and maximum size of this cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'repairs': self.repairs,
+                'size': len(self._trees), 'maxsize': self.maxsize}
+
+
+ENGINES = ('auto', 'dijkstra', 'point_to_point', 'bidirectional', 'astar', 'ch', 'matrix')
+
+
+def shortest_path(start_vertex: str, end_vertex: str, g: Union[MapGraph, CSRGraph],
+                  engine: str = 'auto', stats: Optional[SearchStats] = None,
+                  cache: Optional[ShortestPathTreeCache] = None) -> list:
     """Return an ordered list of path with the element at zero index as the starting vertex.
     Raise NoShortestPathError when there is no possible shortest path between the two vertices
+
+    engine selects the search that is used:
+        - 'dijkstra' builds the whole shortest-path tree from start_vertex
+        - 'point_to_point' stops once end_vertex is settled
+        - 'bidirectional' searches from both ends until the two frontiers meet
+        - 'astar' is guided towards end_vertex by the great-circle distance
+        - 'ch' queries the contraction hierarchy of g, which is built on the first 'ch'
+          query (see hierarchy_for in contraction_hierarchy.py)
+        - 'matrix' looks the path up in the BuildingMatrix attached to g
+          (see building_matrix.py)
+        - 'auto' uses 'matrix' when an attached matrix contains both vertices, and
+          'dijkstra' otherwise
+    Raise a ValueError if engine is not in ENGINES, or if engine is 'matrix' and there is no
+    attached matrix containing both vertices.
+
+    If stats is given, the number of settled vertices and relaxed edges is added to it.
+    If cache is given and 'dijkstra' is used, the shortest-path tree of start_vertex is taken
+    from the cache, so repeated queries from the same start only walk the path.
+
         Preconditions:
             - start_vertex in g.get_all_vertices() and end_vertex in g.get_all_vertices()
     >>> g = MapGraph()
@@ -158,17 +865,63 @@ def shortest_path(start_vertex: str, end_vertex: str, g: MapGraph) -> list:
     >>> g.add_edge('B', 'A', 3)
     >>> shortest_path('S', 'E', g) == ['S', 'B', 'H', 'G', 'E']
     True
+    >>> shortest_path('S', 'E', g, 'point_to_point') == ['S', 'B', 'H', 'G', 'E']
+    True
+    >>> shortest_path('S', 'E', g, 'bidirectional') == ['S', 'B', 'H', 'G', 'E']
+    True
+    >>> shortest_path('S', 'E', g, 'astar') == ['S', 'B', 'H', 'G', 'E']
+    True
+    >>> shortest_path('S', 'E', g, 'ch') == ['S', 'B', 'H', 'G', 'E']
+    True
+    """
+    if engine in ('auto', 'matrix'):
+        # Imported here because building_matrix depends on this module
+        from building_matrix import matrix_for
+        matrix = matrix_for(g)
+        if matrix is not None and start_vertex in matrix and end_vertex in matrix:
+            if stats is not None:
+                stats.record('matrix', 0, 0)
+            return matrix.path(start_vertex, end_vertex)
+        elif engine == 'matrix':
+            raise ValueError
+        engine = 'dijkstra'
+
+    if engine == 'dijkstra' and cache is not None:
+        path_via = cache.get_tree(g, start_vertex, stats)[1]
+        return _walk_path(path_via, start_vertex, end_vertex)
+    elif engine == 'dijkstra':
+        path_via = shortest_path_tree(g, start_vertex, stats)[1]
+        return _walk_path(path_via, start_vertex, end_vertex)
+    elif engine == 'point_to_point':
+        return point_to_point(g, start_vertex, end_vertex, stats)
+    elif engine == 'bidirectional':
+        return bidirectional(g, start_vertex, end_vertex, stats)
+    elif engine == 'astar':
+        return a_star(g, start_vertex, end_vertex, stats)
+    elif engine == 'ch':
+        # Imported here because contraction_hierarchy depends on this module
+        from contraction_hierarchy import hierarchy_for
+        return hierarchy_for(g).query(start_vertex, end_vertex, stats)
+    else:
+        raise ValueError
+
+
+def _walk_path(path_via: Dict, start_vertex: str, end_vertex: str) -> list:
+    """Return the path from start_vertex to end_vertex by following path_via back from
+    end_vertex.
+
+    Raise NoShortestPathError if start_vertex is not reached by following path_via.
     """
-    path_via = dijkstra(g, start_vertex)
     path = [end_vertex]
     curr = end_vertex
 
-    while path_via[curr]:
-        path.insert(0, path_via[curr])
+    while path_via.get(curr) is not None:
         curr = path_via[curr]
-    if start_vertex not in path:
+        path.append(curr)
+    if curr != start_vertex:
         raise NoShortestPathError
     else:
+        path.reverse()
         return path
 
 
@@ -177,7 +930,8 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'map_graph', 'heapq'],
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'map_graph', 'heapq',
+                          'weakref', 'collections', 'array', 'csr_graph'],
         'disable': ['R1705', 'C0200']
     })
     import python_ta.contracts
@@ -8,6 +8,14 @@ The function will obtain distance between the two points using longitudes and la
 of the two points. The value gained from this function will be be used to constructing graphs
 and visualization
 
+The module also contains batched versions that measure the distance from one point to many
+points, or between many pairs of points, in one call. They use NumPy when it is installed and
+plain Python otherwise, unless they are asked for exact results: NumPy's trigonometric functions
+can differ from those of math in the last bits, which acos turns into differences of about a
+centimetre, so values that become edge weights are always computed with math. Both the scalar
+and batched functions can use the haversine formula, which stays accurate for points only a few
+metres apart, where acos loses precision.
+
 Copyright and Usage Information
 ===============================
 
@@ -19,19 +27,133 @@ expressly prohibited.
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
 import math
+from typing import Sequence
+
+# The numpy module, or False if it is not installed. NumPy is optional, and it is only imported
+# by the first batched call since importing it takes longer than loading a graph snapshot.
+_np = None
+
+R = 6.378e+6  # This constant is a radius of Earth
+
+METHODS = ('acos', 'haversine')
 
 
 def distance(long1: float, long2: float, lat1: float, lat2: float) -> float:
     """Return a distance between two points of location in float
     >>> distance(43.66170149580518, 43.6620507644913, -79.3951503932476, -79.39372479915619)
     158.85423099904
+    >>> distance(-79.39, -79.39, 43.66, 43.66)
+    0.0
     """
-    r = 6.378e+6  # This constant is a radius of Earth
     phi1 = lat1 * math.pi / 180
     phi2 = lat2 * math.pi / 180
     diff_lam = (long2 - long1) * math.pi / 180
-    return math.acos(math.sin(phi1) * math.sin(phi2)
-                     + math.cos(phi1) * math.cos(phi2) * math.cos(diff_lam)) * r
+    # Rounding can push the cosine of a zero angle just above 1
+    return math.acos(min(1.0, math.sin(phi1) * math.sin(phi2)
+                         + math.cos(phi1) * math.cos(phi2) * math.cos(diff_lam))) * R
+
+
+def haversine(long1: float, long2: float, lat1: float, lat2: float) -> float:
+    """Return the distance between two points of location using the haversine formula.
+
+    The arguments are in the same order as distance. The result agrees with distance, but
+    does not lose precision when the two points are very close.
+    >>> round(haversine(-79.3951503932476, -79.39372479915619, 43.66170149580518,
+    ...                 43.6620507644913), 3)
+    121.208
+    >>> round(haversine(-79.39, -79.39, 43.66, 43.66000001), 6)
+    0.001113
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    h = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(long2 - long1) / 2) ** 2)
+    return 2 * R * math.asin(min(1.0, math.sqrt(h)))
+
+
+def distances_from(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float],
+                   method: str = 'acos') -> Sequence[float]:
+    """Return the distances from the point (lat, lng) to each point (lats[i], lngs[i]).
+
+    method is 'acos' for the same formula as distance or 'haversine' for the formula of
+    haversine. The result is a NumPy array when NumPy is installed, and a list otherwise.
+
+    Raise a ValueError if method is not in METHODS.
+
+    Preconditions:
+        - len(lats) == len(lngs)
+
+    >>> result = distances_from(43.66170149580518, -79.3951503932476,
+    ...                         [43.6620507644913, 43.66170149580518],
+    ...                         [-79.39372479915619, -79.3951503932476], 'haversine')
+    >>> [round(float(x), 3) for x in result]
+    [121.208, 0.0]
+    """
+    return pairwise_distances([lat] * len(lats), [lng] * len(lngs), lats, lngs, method)
+
+
+def pairwise_distances(lats1: Sequence[float], lngs1: Sequence[float],
+                       lats2: Sequence[float], lngs2: Sequence[float],
+                       method: str = 'acos', exact: bool = False) -> Sequence[float]:
+    """Return the distance between each pair of points (lats1[i], lngs1[i]) and
+    (lats2[i], lngs2[i]), in the same way as distances_from.
+
+    If exact is True, the result is a list whose values are identical, to the last bit, to
+    those of distance or haversine, whether or not NumPy is installed.
+
+    Raise a ValueError if method is not in METHODS.
+
+    Preconditions:
+        - len(lats1) == len(lngs1) == len(lats2) == len(lngs2)
+
+    >>> result = pairwise_distances([43.66, 43.67], [-79.39, -79.40],
+    ...                             [43.66, 43.68], [-79.40, -79.40], 'haversine')
+    >>> [round(float(x), 3) for x in result]
+    [805.323, 1113.171]
+    >>> lats1, lngs1 = [43.66170149580518, 43.66], [-79.3951503932476, -79.39]
+    >>> lats2, lngs2 = [43.6620507644913, 43.66], [-79.39372479915619, -79.39]
+    >>> exact = pairwise_distances(lats1, lngs1, lats2, lngs2, exact=True)
+    >>> exact == [distance(lngs1[i], lngs2[i], lats1[i], lats2[i]) for i in range(2)]
+    True
+    >>> fast = pairwise_distances(lats1, lngs1, lats2, lngs2)
+    >>> all(abs(float(fast[i]) - exact[i]) < 0.1 for i in range(2))
+    True
+    """
+    if method not in METHODS:
+        raise ValueError
+    np = None if exact else _numpy()
+    if not np:
+        formula = distance if method == 'acos' else haversine
+        return [formula(lngs1[i], lngs2[i], lats1[i], lats2[i]) for i in range(len(lats1))]
+
+    lats1, lngs1 = np.asarray(lats1, dtype=float), np.asarray(lngs1, dtype=float)
+    lats2, lngs2 = np.asarray(lats2, dtype=float), np.asarray(lngs2, dtype=float)
+    if method == 'acos':
+        # The same operations in the same order as distance
+        phi1 = lats1 * math.pi / 180
+        phi2 = lats2 * math.pi / 180
+        diff_lam = (lngs2 - lngs1) * math.pi / 180
+        cos_angle = np.sin(phi1) * np.sin(phi2) + np.cos(phi1) * np.cos(phi2) * np.cos(diff_lam)
+        return np.arccos(np.minimum(cos_angle, 1.0)) * R
+    else:
+        phi1 = np.radians(lats1)
+        phi2 = np.radians(lats2)
+        diff_lam = np.radians(lngs2 - lngs1)
+        h = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(diff_lam / 2) ** 2
+        return 2 * R * np.arcsin(np.minimum(np.sqrt(h), 1.0))
+
+
+def _numpy() -> object:
+    """Return the numpy module, or False if it is not installed, importing it the first time.
+    """
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # the batched functions fall back to plain Python
+            _np = False
+    return _np
 
 
 if __name__ == '__main__':
@@ -39,8 +161,8 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['math'],
-        'disable': ['R1705', 'C0200']
+        'extra-imports': ['math', 'typing', 'numpy'],
+        'disable': ['R1705', 'C0200', 'W0603', 'C0415']
     })
     import python_ta.contracts
 
@@ -0,0 +1,217 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module saves a fully built graph to a versioned binary snapshot and memory-maps it back
+as a CSRGraph. The snapshot holds the vertex names, kinds and coordinates, the adjacency arrays,
+the edge weights and the building names in file order, together with a hash of the JSON files
+it was built from. Loading a snapshot only maps the file and wraps its arrays, so it does not
+parse any JSON or compute any distances, and several processes that load the same snapshot
+share the same pages of memory. When a source file changes, its hash no longer matches and
+load_graph rebuilds the snapshot.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Optional
+from csr_graph import CSRGraph
+from dataset import CampusDataset
+
+# The first bytes of every snapshot, followed by the format version and the header length
+MAGIC = b'TRTS'
+FORMAT_VERSION = 2
+_PREFIX = struct.Struct('<4sII')
+
+# The arrays stored in a snapshot, in file order, with their type codes
+_SECTIONS = (('kinds', 'b'), ('lats', 'd'), ('lngs', 'd'), ('offsets', 'q'),
+             ('targets', 'i'), ('weights', 'd'))
+
+
+def source_hash(building_file: str, corner_file: str) -> str:
+    """Return a hash of the contents of the two source files of a graph."""
+    h = hashlib.sha256()
+    for path in (building_file, corner_file):
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def save_snapshot(graph: CSRGraph, path: str, source: str,
+                  building_names: Optional[list[str]] = None) -> None:
+    """Write graph to a snapshot file at path, recording source as the hash of its source files.
+
+    building_names is the list of building names returned by load_campus; by default it is
+    the buildings of graph in name order.
+
+    The file is written under a temporary name unique to this call and then renamed, so a
+    process loading the snapshot at the same time never sees a partly written file, and
+    processes rebuilding the same snapshot at the same time do not overwrite each other's
+    temporary files.
+    """
+    if building_names is None:
+        building_names = sorted(graph.get_all_vertices('building'))
+    header = {'source': source,
+              'byteorder': sys.byteorder,
+              'names': graph.names,
+              'building_names': building_names,
+              'min_weight_ratio': graph.weight_ratio(),
+              'sections': []}
+    # Every section starts at a multiple of 8 bytes from the start of the data
+    position = 0
+    for name, typecode in _SECTIONS:
+        data = getattr(graph, name)
+        size = len(data) * struct.calcsize(typecode)
+        header['sections'].append([name, typecode, position, len(data)])
+        position += size + (-size % 8)
+
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' ' * (-(_PREFIX.size + len(encoded)) % 8)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            f.write(encoded)
+            for name, _ in _SECTIONS:
+                data = memoryview(getattr(graph, name)).cast('B')
+                f.write(data)
+                f.write(b'\0' * (-len(data) % 8))
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def load_snapshot(path: str) -> tuple[CSRGraph, str]:
+    """Return the graph stored in the snapshot at path and the source hash it was built from.
+
+    The arrays of the returned graph are views of the memory-mapped file.
+
+    Raise a ValueError if the file is not a snapshot of the current format version or was
+    written on a machine with a different byte order.
+
+    >>> import os, tempfile
+    >>> from map_graph import MapGraph
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (43.66, -79.39), 'corner')
+    >>> g.add_vertex('Hall', (43.661, -79.39), 'building')
+    >>> g.add_edge('A', 'Hall', 111)
+    >>> path = os.path.join(tempfile.mkdtemp(), 'test.snapshot')
+    >>> save_snapshot(CSRGraph.from_map_graph(g), path, 'abc')
+    >>> loaded, source = load_snapshot(path)
+    >>> source, loaded.get_distance('Hall', 'A'), loaded.get_all_vertices('building')
+    ('abc', 111.0, {'Hall'})
+    """
+    graph, header = _load(path)
+    return graph, header['source']
+
+
+def _load(path: str) -> tuple[CSRGraph, dict]:
+    """Return the graph stored in the snapshot at path and the header of the snapshot, as in
+    load_snapshot.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, header_len = _PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError
+    start = _PREFIX.size
+    header = json.loads(mapped[start:start + header_len].decode('utf-8'))
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError
+
+    data_start = start + header_len
+    view = memoryview(mapped)
+    arrays = {}
+    for name, typecode, position, length in header['sections']:
+        begin = data_start + position
+        arrays[name] = view[begin:begin + length * struct.calcsize(typecode)].cast(typecode)
+
+    graph = CSRGraph(header['names'], arrays['kinds'], arrays['lats'], arrays['lngs'],
+                     arrays['offsets'], arrays['targets'], arrays['weights'],
+                     header['min_weight_ratio'])
+    return graph, header
+
+
+def load_graph(building_file: str, corner_file: str,
+               snapshot_file: Optional[str] = None) -> CSRGraph:
+    """Return the graph of the given source files, using the snapshot at snapshot_file.
+
+    If the snapshot is missing, unreadable, or was built from different source files, the
+    graph is built from the files and a new snapshot is saved first. By default the snapshot
+    is stored next to building_file.
+
+    Precondition:
+        - building_file and corner_file are as in load_weighted_graph
+    """
+    return load_campus(building_file, corner_file, snapshot_file)[0]
+
+
+def load_campus(building_file: str, corner_file: str,
+                snapshot_file: Optional[str] = None) -> tuple[CSRGraph, list[str]]:
+    """Return the graph of the given source files, as load_graph does, and the names of the
+    buildings without duplicates, in the order of building_file.
+
+    Both come from the snapshot, so the JSON files are only read when the snapshot has to be
+    rebuilt, and then only once each, into a single CampusDataset. If the new snapshot cannot
+    be saved, for example because its directory is read-only, the graph that was just built
+    is returned instead.
+
+    Precondition:
+        - building_file and corner_file are as in load_weighted_graph
+    """
+    if snapshot_file is None:
+        snapshot_file = os.path.splitext(building_file)[0] + '.snapshot'
+    source = source_hash(building_file, corner_file)
+
+    if os.path.exists(snapshot_file):
+        try:
+            graph, header = _load(snapshot_file)
+            if header['source'] == source:
+                return graph, header['building_names']
+        except (ValueError, KeyError, TypeError, struct.error):
+            pass
+
+    dataset = CampusDataset(building_file, corner_file)
+    built = CSRGraph.from_map_graph(dataset.build_graph())
+    try:
+        save_snapshot(built, snapshot_file, source, dataset.building_names())
+    except OSError:
+        return built, dataset.building_names()
+    graph, header = _load(snapshot_file)
+    return graph, header['building_names']
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'hashlib', 'json', 'mmap', 'os',
+                          'struct', 'sys', 'tempfile', 'csr_graph',
+                          'dataset'],
+        'allowed-io': ['source_hash', 'save_snapshot', '_load'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
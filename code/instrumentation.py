@@ -0,0 +1,386 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains opt-in instrumentation of the hot paths of the map. enable() replaces the
+functions and methods listed in TARGETS with wrappers that count and time their calls, and
+disable() puts the originals back, so when instrumentation is off the code runs exactly as if
+this module did not exist. While it is on, every search also records the vertices it settled,
+the edges it relaxed and the priority queue operations it made, and load_weighted_graph_fast
+records the time of each of its phases.
+
+The counters can be read with snapshot() as a dictionary, or with prometheus_text() in the
+Prometheus text format. profile() is a context manager that runs a block under cProfile and
+writes the report to a file.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import contextlib
+import functools
+import importlib
+import inspect
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+# The instrumented functions, as (module, attribute) pairs, where the attribute is either a
+# function of the module or 'Class.method'
+TARGETS = (
+    ('map_graph', 'MapGraph.get_neighbours'),
+    ('map_graph', 'MapGraph.weighted_neighbours'),
+    ('map_graph', 'MapGraph.get_distance'),
+    ('map_graph', 'MapGraph.find_closest_vertex'),
+    ('csr_graph', 'CSRGraph.get_neighbours'),
+    ('csr_graph', 'CSRGraph.weighted_neighbours'),
+    ('csr_graph', 'CSRGraph.get_distance'),
+    ('dijkstra', 'shortest_path'),
+    ('dijkstra', 'dijkstra'),
+    ('dijkstra', 'shortest_path_tree'),
+    ('dijkstra', 'repair_shortest_path_tree'),
+    ('dijkstra', 'csr_shortest_path_tree'),
+    ('dijkstra', 'point_to_point'),
+    ('dijkstra', 'a_star'),
+    ('dijkstra', 'bidirectional'),
+    ('contraction_hierarchy', 'ContractionHierarchy.query'),
+    ('load_weighted_graph', 'load_weighted_graph'),
+    ('load_weighted_graph', 'load_weighted_graph_fast'),
+    ('graph_snapshot', 'load_graph'),
+    ('visualize_map', 'visualize_map_graph'),
+    ('visualize_map', 'make_route_page'),
+    ('visualize_map', 'plan_route'),
+    ('visualize_map', '_template_page'),
+    ('visualize_map', '_folium_page'),
+    ('visualize_map', 'save_page'),
+)
+
+# The priority queue methods that are counted, without being timed
+HEAP_OPERATIONS = ('enqueue', 'dequeue', 'decrease_key')
+
+# The prefix of the names of the Prometheus metrics
+PROMETHEUS_PREFIX = 'to_run_to'
+
+# The counters of each instrumented function, by the name 'module.attribute'. Each maps
+# 'calls' and 'seconds', and for searches 'settled', 'relaxed' and 'heap_operations', to
+# their totals.
+_counters = {}
+_lock = threading.Lock()
+
+# The total number of priority queue operations, by method name, guarded by _lock
+_heap_counts = dict.fromkeys(HEAP_OPERATIONS, 0)
+
+# The number of priority queue operations made by each thread, as its 'count' attribute. The
+# heap operations of a search are the change in the count of the thread it runs on, so searches
+# running at the same time on other threads are not counted in it.
+_thread_heap = threading.local()
+
+# The (owner, attribute, original) of every attribute replaced by enable()
+_patched = []
+
+
+def enable() -> None:
+    """Start counting and timing the calls to TARGETS. Calling it again does nothing.
+
+    The modules of TARGETS are imported if needed. Any module of this project that imported
+    a target function by name is patched as well.
+    """
+    if _patched:
+        return
+    for module_name, attribute in TARGETS:
+        module = importlib.import_module(module_name)
+        if '.' in attribute:
+            class_name, method = attribute.split('.')
+            _patch(getattr(module, class_name), method, '{m}.{a}'.format(m=module_name,
+                                                                         a=attribute))
+        else:
+            original = getattr(module, attribute)
+            wrapper = _patch(module, attribute, '{m}.{a}'.format(m=module_name, a=attribute))
+            _patch_aliases(original, wrapper)
+
+    queue_class = importlib.import_module('dijkstra').IndexedPriorityQueue
+    for method in HEAP_OPERATIONS:
+        original = getattr(queue_class, method)
+        _patched.append((queue_class, method, original))
+        setattr(queue_class, method, _counted(original, method))
+
+
+def disable() -> None:
+    """Stop counting and timing, restoring every original function. The counters are kept."""
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+
+def is_enabled() -> bool:
+    """Return whether the instrumentation is on."""
+    return bool(_patched)
+
+
+def reset() -> None:
+    """Set every counter back to zero."""
+    with _lock:
+        _counters.clear()
+        for method in HEAP_OPERATIONS:
+            _heap_counts[method] = 0
+
+
+@contextlib.contextmanager
+def instrumented() -> Iterator[None]:
+    """Turn the instrumentation on for the duration of a with block.
+
+    >>> from map_graph import MapGraph
+    >>> import dijkstra
+    >>> g = MapGraph()
+    >>> g.add_vertex('A', (0, 0), 'corner')
+    >>> g.add_vertex('B', (0, 0), 'corner')
+    >>> g.add_edge('A', 'B', 1)
+    >>> reset()
+    >>> with instrumented():
+    ...     dijkstra.shortest_path('A', 'B', g, 'point_to_point')
+    ['A', 'B']
+    >>> counters = snapshot()
+    >>> counters['dijkstra.shortest_path']['calls'], counters['dijkstra.shortest_path']['settled']
+    (1, 2)
+    >>> counters['dijkstra.shortest_path']['heap_operations']
+    4
+    >>> is_enabled(), 'dijkstra.shortest_path' in snapshot()
+    (False, True)
+    """
+    was_enabled = is_enabled()
+    enable()
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Return a copy of the counters of every function called since the last reset, by the
+    name 'module.attribute', together with the priority queue operations under 'heap'.
+    """
+    with _lock:
+        result = {name: dict(counters) for name, counters in _counters.items()}
+        result['heap'] = dict(_heap_counts)
+    return result
+
+
+def prometheus_text() -> str:
+    """Return the counters in the Prometheus text exposition format.
+
+    >>> reset()
+    >>> print(prometheus_text())
+    # HELP to_run_to_heap_operations_total Priority queue operations by method.
+    # TYPE to_run_to_heap_operations_total counter
+    to_run_to_heap_operations_total{method="enqueue"} 0
+    to_run_to_heap_operations_total{method="dequeue"} 0
+    to_run_to_heap_operations_total{method="decrease_key"} 0
+    """
+    counters = snapshot()
+    heap = counters.pop('heap')
+    metrics = (('calls', 'Calls of each instrumented function.'),
+               ('seconds', 'Total seconds spent in each instrumented function.'),
+               ('settled', 'Vertices settled by each search function.'),
+               ('relaxed', 'Edges relaxed by each search function.'),
+               ('heap_operations', 'Priority queue operations of each search function.'))
+    lines = []
+    for metric, description in metrics:
+        rows = [(name, values[metric]) for name, values in sorted(counters.items())
+                if metric in values]
+        if rows:
+            full_name = '{prefix}_{metric}_total'.format(prefix=PROMETHEUS_PREFIX, metric=metric)
+            lines.append('# HELP {name} {text}'.format(name=full_name, text=description))
+            lines.append('# TYPE {name} counter'.format(name=full_name))
+            for name, value in rows:
+                lines.append('{metric}{{function="{name}"}} {value}'.format(
+                    metric=full_name, name=name, value=_format_value(value)))
+    full_name = '{prefix}_heap_operations_total'.format(prefix=PROMETHEUS_PREFIX)
+    lines.append('# HELP {name} Priority queue operations by method.'.format(name=full_name))
+    lines.append('# TYPE {name} counter'.format(name=full_name))
+    for method in HEAP_OPERATIONS:
+        lines.append('{metric}{{method="{method}"}} {value}'.format(
+            metric=full_name, method=method, value=heap[method]))
+    return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def profile(path: str, sort: str = 'cumulative', limit: int = 50) -> Iterator[Any]:
+    """Run the block of a with statement under cProfile, and write the report of its limit
+    most expensive functions, ordered by sort, to the text file at path. The raw profile is
+    also saved next to it, with the extension .prof, for tools such as snakeviz.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'profile.txt')
+    >>> with profile(path):
+    ...     total = sum(range(1000))
+    >>> os.path.exists(path) and os.path.exists(os.path.splitext(path)[0] + '.prof')
+    True
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.splitext(path)[0] + '.prof')
+        with open(path, 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats(sort).print_stats(limit)
+
+
+def _patch(owner: Any, attribute: str, name: str) -> Callable:
+    """Replace owner.attribute with a wrapper that records its calls under name, and return
+    the wrapper.
+    """
+    original = getattr(owner, attribute)
+    wrapper = _timed(original, name)
+    _patched.append((owner, attribute, original))
+    setattr(owner, attribute, wrapper)
+    return wrapper
+
+
+def _patch_aliases(original: Callable, wrapper: Callable) -> None:
+    """Replace original with wrapper in every module of this project that imported it by
+    name, such as cli after 'from dijkstra import shortest_path'.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path is None or not path.endswith('.py') \
+                or os.path.dirname(os.path.abspath(path)) != directory:
+            continue
+        for attribute, value in list(vars(module).items()):
+            if value is original:
+                _patched.append((module, attribute, original))
+                setattr(module, attribute, wrapper)
+
+
+def _timed(original: Callable, name: str) -> Callable:
+    """Return a wrapper of original that records its calls and time under name.
+
+    If original takes a stats argument that the caller left out or gave as None, the wrapper
+    passes a new SearchStats and records the vertices it settled and the edges it relaxed.
+    Searches that are given the stats of an outer search add their work to it instead, so it
+    is counted once. Likewise, if original takes a timings argument that the caller left out
+    or gave as None, the time of each phase is recorded under 'name.phase'.
+    """
+    parameters = inspect.signature(original).parameters
+    takes_stats = 'stats' in parameters
+    takes_timings = 'timings' in parameters
+    search_stats = importlib.import_module('dijkstra').SearchStats
+
+    stats_position = list(parameters).index('stats') if takes_stats else -1
+    timings_position = list(parameters).index('timings') if takes_timings else -1
+
+    @functools.wraps(original)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        stats = timings = None
+        if takes_stats and _missing(args, kwargs, 'stats', stats_position):
+            stats = search_stats()
+            args, kwargs = _with_argument(args, kwargs, 'stats', stats_position, stats)
+        if takes_timings and _missing(args, kwargs, 'timings', timings_position):
+            timings = {}
+            args, kwargs = _with_argument(args, kwargs, 'timings', timings_position, timings)
+        heap_before = _thread_heap_count()
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                counters = _counters.setdefault(name, {'calls': 0, 'seconds': 0.0})
+                counters['calls'] += 1
+                counters['seconds'] += elapsed
+                if stats is not None:
+                    counters['settled'] = counters.get('settled', 0) + stats.settled
+                    counters['relaxed'] = counters.get('relaxed', 0) + stats.relaxed
+                    counters['heap_operations'] = (counters.get('heap_operations', 0)
+                                                   + _thread_heap_count() - heap_before)
+                for phase, seconds in (timings or {}).items():
+                    phase_counters = _counters.setdefault(name + '.' + phase,
+                                                          {'calls': 0, 'seconds': 0.0})
+                    phase_counters['calls'] += 1
+                    phase_counters['seconds'] += seconds
+
+    return wrapper
+
+
+def _missing(args: tuple, kwargs: dict, name: str, position: int) -> bool:
+    """Return whether the argument called name, at the given position, was left out or given
+    as None in a call with args and kwargs.
+    """
+    if position < len(args):
+        return args[position] is None
+    return kwargs.get(name) is None
+
+
+def _with_argument(args: tuple, kwargs: dict, name: str, position: int,
+                   value: Any) -> tuple[tuple, dict]:
+    """Return args and kwargs with the argument called name, at the given position, set to
+    value.
+    """
+    if position < len(args):
+        return args[:position] + (value,) + args[position + 1:], kwargs
+    return args, dict(kwargs, **{name: value})
+
+
+def _counted(original: Callable, method: str) -> Callable:
+    """Return a wrapper of the priority queue method original that counts its calls.
+
+    A decrease_key of an item that is not in the queue is an enqueue, and is counted as one
+    by the enqueue it calls.
+    """
+    @functools.wraps(original)
+    def wrapper(queue: Any, item: Any = None, *args: Any) -> Any:
+        if method != 'decrease_key' or item in queue:
+            _thread_heap.count = _thread_heap_count() + 1
+            with _lock:
+                _heap_counts[method] += 1
+        if method == 'dequeue':
+            return original(queue)
+        return original(queue, item, *args)
+
+    return wrapper
+
+
+def _thread_heap_count() -> int:
+    """Return the number of priority queue operations made so far by the current thread."""
+    return getattr(_thread_heap, 'count', 0)
+
+
+def _format_value(value: float) -> str:
+    """Return value as a Prometheus sample value."""
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'contextlib', 'functools',
+                          'importlib', 'inspect', 'os', 'sys', 'threading', 'time', 'cProfile',
+                          'pstats'],
+        'allowed-io': ['profile'],
+        'disable': ['E1136', 'W0221', 'C0415']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,172 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module answers reachability queries: which buildings and corners can be reached from a
+building within a number of seconds, by one of the modes of transportation of
+vehicle_return_time, such as everything within a ten-minute walk of a lecture hall. The search
+is Dijkstra's algorithm on travel times that stops at the time budget, so it only looks at the
+part of the map that is reachable, and vertices that would be reached too late never enter
+its priority queue. The result is a set of parallel arrays, in order of arrival, that can be
+drawn over the campus map by visualize_map.visualize_isochrone.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+from array import array
+from typing import Any, Optional, Union
+from dijkstra import IndexedPriorityQueue, SearchStats
+from map_graph import MapGraph
+from csr_graph import CSRGraph, KINDS
+from vehicle_return_time import SPEEDS
+
+
+def isochrone(graph: Union[MapGraph, CSRGraph], start: Any, mode: str, seconds: float,
+              stats: Optional[SearchStats] = None) -> dict:
+    """Return every vertex of graph that can be reached from start within the given number
+    of seconds by mode, with the time at which it is reached.
+
+    The result is a dictionary of parallel sequences, ordered by arrival time: the 'names',
+    'kinds' ('building' or 'corner'), 'lats', 'lngs' and arrival 'seconds' of the reached
+    vertices. The numbers are kept in array('d') arrays. start itself comes first, at 0
+    seconds. The access rules of a MapGraph (see MapGraph.set_edge_modes) are followed; a
+    CSRGraph has none, and a MapGraph with rules cannot be converted to one.
+
+    If stats is given, the number of settled vertices and relaxed edges is added to it.
+
+    Preconditions:
+        - start in graph.get_all_vertices()
+        - mode in SPEEDS
+        - seconds >= 0
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (43.66, -79.39), 'building')
+    >>> g.add_vertex('1', (43.661, -79.39), 'corner')
+    >>> g.add_vertex('Library', (43.662, -79.39), 'building')
+    >>> g.add_edge('Hall', '1', 100)
+    >>> g.add_edge('1', 'Library', 600)
+    >>> reached = isochrone(g, 'Hall', 'walking', 300)
+    >>> reached['names'], reached['kinds'], list(reached['seconds'])
+    (['Hall', '1'], ['building', 'corner'], [0.0, 100.0])
+    >>> isochrone(g, 'Hall', 'bicycle', 300)['names']
+    ['Hall', '1', 'Library']
+    >>> g.set_edge_modes('1', 'Library', {'walking': None})
+    >>> isochrone(g, 'Hall', 'bicycle', 300)['names']
+    ['Hall', '1']
+    >>> CSRGraph.from_map_graph(g)
+    Traceback (most recent call last):
+    ...
+    ValueError
+    """
+    if isinstance(graph, CSRGraph):
+        order, times = _csr_reachable(graph, graph.index(start), SPEEDS[mode], seconds, stats)
+        names = [graph.names[i] for i in order]
+        kinds = [KINDS[graph.kinds[i]] for i in order]
+        lats = array('d', (graph.lats[i] for i in order))
+        lngs = array('d', (graph.lngs[i] for i in order))
+    else:
+        names, times = _reachable(graph, start, mode, seconds, stats)
+        kinds = [graph.get_kind(v) for v in names]
+        locations = [graph.get_location(v) for v in names]
+        lats = array('d', (location[0] for location in locations))
+        lngs = array('d', (location[1] for location in locations))
+    return {'names': names, 'kinds': kinds, 'lats': lats, 'lngs': lngs, 'seconds': times}
+
+
+def _reachable(graph: MapGraph, start: Any, mode: str, budget: float,
+               stats: Optional[SearchStats]) -> tuple[list, array]:
+    """Return the names of the vertices of graph reached from start by mode within budget
+    seconds, and their arrival times, in order of arrival.
+    """
+    usual_speed = SPEEDS[mode]
+    arrival = {start: 0.0}
+    names, times = [], array('d')
+    pq = IndexedPriorityQueue()
+    pq.enqueue(start, 0.0)
+    settled = relaxed = 0
+
+    while not pq.is_empty():
+        v = pq.dequeue()
+        settled += 1
+        t_v = arrival[v]
+        names.append(v)
+        times.append(t_v)
+        for u, dist, rules in graph.mode_neighbours(v):
+            relaxed += 1
+            if rules is None:
+                speed = usual_speed
+            elif mode in rules:
+                speed = usual_speed if rules[mode] is None else rules[mode]
+            else:
+                continue
+            new_t = t_v + dist / speed
+            # Vertices reached after the budget are never queued
+            if new_t <= budget and new_t < arrival.get(u, budget + 1):
+                arrival[u] = new_t
+                pq.decrease_key(u, new_t)
+
+    if stats is not None:
+        stats.record('isochrone', settled, relaxed)
+    return names, times
+
+
+def _csr_reachable(csr: CSRGraph, source: int, speed: float, budget: float,
+                   stats: Optional[SearchStats]) -> tuple[list, array]:
+    """Return the ids of the vertices of csr reached from the vertex with id source within
+    budget seconds at the given speed, and their arrival times, in order of arrival. The
+    search works on the arrays of csr, and only keeps the vertices it reaches.
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    # Search on distances, which are times multiplied by the speed
+    limit = budget * speed
+    d = {source: 0.0}
+    order, times = [], array('d')
+    pq = IndexedPriorityQueue()
+    pq.enqueue(source, 0.0)
+    settled = relaxed = 0
+
+    while not pq.is_empty():
+        i = pq.dequeue()
+        settled += 1
+        d_i = d[i]
+        order.append(i)
+        times.append(d_i / speed)
+        end = offsets[i + 1]
+        relaxed += end - offsets[i]
+        for k in range(offsets[i], end):
+            v = targets[k]
+            new_d = d_i + weights[k]
+            if new_d <= limit and new_d < d.get(v, limit + 1):
+                d[v] = new_d
+                pq.decrease_key(v, new_d)
+
+    if stats is not None:
+        stats.record('isochrone', settled, relaxed)
+    return order, times
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'array', 'dijkstra', 'map_graph',
+                          'csr_graph', 'vehicle_return_time'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -4,7 +4,8 @@ Module Description
 ==================
 This python module contains the load_weighted_graph() function. This function takes the
 directory of the UofTMap.json file and the directory of the full_corner.json file and returns
-a MapGraph instance.
+a MapGraph instance. The load_weighted_graph_fast() function builds the same graph in a single
+pass over each file and can report how long each phase of loading took.
 
 Copyright and Usage Information
 ===============================
@@ -19,8 +20,10 @@ This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and T
 """
 from __future__ import annotations
 import json
+from typing import Optional
 from map_graph import MapGraph
-from distance import distance
+from distance import pairwise_distances
+from dataset import CampusDataset
 
 
 def load_weighted_graph(building_file: str, corner_file: str) -> MapGraph:
@@ -60,6 +63,8 @@ def load_weighted_graph(building_file: str, corner_file: str) -> MapGraph:
                 dist = int(p["distance_metres"][0])
                 g.add_edge(nodes[0], nodes[1], dist)
 
+    # Pairs of (building, corner) to connect, with their locations
+    pairs = []
     with open(building_file) as json_file:
         data = json.load(json_file)
         for p in data:
@@ -68,22 +73,55 @@ def load_weighted_graph(building_file: str, corner_file: str) -> MapGraph:
                 # Find the closest three corner vertices to connect to
                 closest = g.find_closest_vertex(p['name'])
                 for v in closest:
-                    # Get the location of the corner vertex to measure the distance
-                    location = g.get_location(v)
+                    pairs.append((p['name'], (p['lat'], p['lng']), v, g.get_location(v)))
 
-                    # Calculate the distance using the distance() function
-                    dist = distance(p['lng'], location[1], p['lat'], location[0])
-                    g.add_edge(p['name'], v, dist)
+    # Calculate the distances of all pairs with one batched call of the distance() formula,
+    # exactly as distance() would, so the weights do not depend on whether NumPy is installed
+    dists = pairwise_distances([pair[1][0] for pair in pairs], [pair[1][1] for pair in pairs],
+                               [pair[3][0] for pair in pairs], [pair[3][1] for pair in pairs],
+                               exact=True)
+    for pair, dist in zip(pairs, dists):
+        g.add_edge(pair[0], pair[2], float(dist))
 
     return g
 
 
+def load_weighted_graph_fast(building_file: str, corner_file: str,
+                             timings: Optional[dict] = None) -> MapGraph:
+    """Return the same MapGraph as load_weighted_graph, in time linear in the size of the files.
+
+    The files are streamed once each into a CampusDataset, where duplicates are found with
+    sets instead of building the set of all corners or buildings for every record. Every edge
+    "a-b" also appears as "b-a" in the corner file, so a record for an edge that was already
+    added with the same distance is skipped.
+
+    If timings is given, the number of seconds spent in each phase of loading is stored in it
+    under the keys 'read_corners', 'corners', 'read_buildings' and 'buildings'.
+
+    Precondition:
+        - building_file is the path to a JSON file containing the data on the coordinates
+          of the buildings.
+        - corner_file is the path to JSON file containing the data of the coordinates
+          of the 'corners' which are intersections of each street.
+
+    >>> from building_matrix import graph_fingerprint
+    >>> timings = {}
+    >>> g = load_weighted_graph_fast('Data/UofTMap.json', 'Data/full_corner.json', timings)
+    >>> plain = load_weighted_graph('Data/UofTMap.json', 'Data/full_corner.json')
+    >>> graph_fingerprint(g) == graph_fingerprint(plain)
+    True
+    >>> sorted(timings)
+    ['buildings', 'corners', 'read_buildings', 'read_corners']
+    """
+    return CampusDataset(building_file, corner_file, timings).build_graph(timings)
+
+
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['json', 'map_graph', 'distance'],
-        'allowed-io': ['load_weighted_graph'],
+        'extra-imports': ['json', 'typing', 'map_graph', 'distance', 'dataset'],
+        'allowed-io': ['load_weighted_graph', 'load_weighted_graph_fast'],
         'max-line-length': 100,
         'disable': ['E1136']
     })
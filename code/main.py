@@ -3,6 +3,8 @@
 Module Description
 ==================
 This file contains the main code to run the map from the beginning to the end.
+Given one of the commands of cli.py, such as 'python main.py route <departure> <destination>',
+it runs that command instead of opening the GUI, and Tkinter and folium are not imported.
 
 Copyright and Usage Information
 ===============================
@@ -15,16 +17,42 @@ please consult our Course Syllabus.
 
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
-from load_weighted_graph import load_weighted_graph
-from buildings_list import buildings_list
-from tkinter_gui import gui_generator
+import sys
+import cli
+from graph_snapshot import load_campus
+from multimodal import with_access_rules
+from building_matrix import BuildingMatrix, load_building_matrix
+from contraction_hierarchy import hierarchy_for
+
+if __name__ == '__main__' and len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+    sys.exit(cli.main())
 
 if __name__ == '__main__':
+    # Imported here so that the commands of cli.py never load Tkinter or folium
+    from tkinter_gui import gui_generator
+
     building_file = 'Data/UofTMap.json'
     corner_file = 'Data/full_corner.json'
+    matrix_file = 'Data/building_matrix.bin'
+    rule_file = 'Data/access_rules.json'
+
+    # The graph and the building names are read from Data/UofTMap.snapshot, which is rebuilt
+    # from the JSON files, each parsed once, whenever they change
+    graph, building_lst = load_campus(building_file, corner_file)
+    # With a file of access rules, the GUI searches a MapGraph copy of the graph that has them
+    graph = with_access_rules(graph, rule_file)
+
+    # Run 'python main.py --build-matrix' to precompute the building-to-building table
+    if '--build-matrix' in sys.argv:
+        BuildingMatrix.build(graph).save(matrix_file)
 
-    graph = load_weighted_graph(building_file, corner_file)
-    building_lst = buildings_list(building_file)
+    if load_building_matrix(matrix_file, graph) is not None:
+        # Every route between buildings is looked up in the table
+        engine = 'auto'
+    else:
+        # Build the contraction hierarchy once so that every route uses the 'ch' engine
+        hierarchy_for(graph)
+        engine = 'ch'
 
     # Open GUI and get the map between two places
-    gui_generator(graph, building_lst)
+    gui_generator(graph, building_lst, engine=engine)
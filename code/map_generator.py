@@ -0,0 +1,265 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module generates synthetic maps of any size in the same JSON formats as full_corner.json
+and UofTMap.json, so that every loader and routing engine can be tried on city-sized graphs.
+The streets form a square grid of corners with randomly moved corners, a few diagonal streets,
+some streets removed and a few small one-off clusters of corners such as courtyards, and the
+buildings are scattered over the grid. Removed streets never disconnect the map. The same seed
+always generates the same files:
+
+    python map_generator.py --corners 100000 --out Data/synthetic
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+from array import array
+from typing import Optional
+from distance import haversine
+from spatial_index import METRES_PER_DEGREE
+
+# The centre of the generated maps, at the centre of the St. George campus
+ORIGIN = (43.6629, -79.3957)
+
+# The number of buildings generated per corner when it is not given, as in the campus data
+BUILDINGS_PER_CORNER = 450 / 1076
+
+# The category ids given to the generated buildings
+CATEGORY_IDS = (48654, 48655, 48656, 48657)
+
+
+class MapSpec:
+    """The settings of a generated map.
+
+    Instance Attributes:
+        - corners: the number of corners
+        - buildings: the number of buildings
+        - seed: the seed of the random generator
+        - spacing: the distance between neighbouring grid corners, in metres
+        - jitter: the standard deviation of the random move of each corner, in metres
+        - removed: the fraction of the streets not needed to connect the map that are removed
+        - diagonals: the fraction of grid squares crossed by a diagonal street
+        - clustered: the fraction of the corners placed in one-off clusters
+
+    Representation Invariants:
+        - self.corners >= 4
+        - self.buildings >= 0
+        - 0 <= self.removed <= 1 and 0 <= self.diagonals <= 1 and 0 <= self.clustered < 1
+    """
+    corners: int
+    buildings: int
+    seed: int
+    spacing: float
+    jitter: float
+    removed: float
+    diagonals: float
+    clustered: float
+
+    def __init__(self, corners: int, buildings: Optional[int] = None, seed: int = 0,
+                 spacing: float = 80.0, jitter: float = 8.0, removed: float = 0.1,
+                 diagonals: float = 0.03, clustered: float = 0.05) -> None:
+        """Initialize the settings. By default there are BUILDINGS_PER_CORNER buildings per
+        corner.
+        """
+        self.corners = corners
+        self.buildings = round(corners * BUILDINGS_PER_CORNER) if buildings is None else buildings
+        self.seed = seed
+        self.spacing = spacing
+        self.jitter = jitter
+        self.removed = removed
+        self.diagonals = diagonals
+        self.clustered = clustered
+
+
+def generate_map(spec: MapSpec, building_file: str, corner_file: str) -> dict:
+    """Write the map described by spec to building_file and corner_file, and return the
+    number of corners, streets and buildings written.
+
+    Each street is written twice, once in each direction, like in full_corner.json. The
+    records are written one at a time, so the files can be much larger than the memory
+    needed for the corners and streets themselves.
+
+    >>> import tempfile
+    >>> from load_weighted_graph import load_weighted_graph_fast
+    >>> from dijkstra import shortest_path_tree
+    >>> directory = tempfile.mkdtemp()
+    >>> buildings = os.path.join(directory, 'map.json')
+    >>> corners = os.path.join(directory, 'corner.json')
+    >>> generate_map(MapSpec(500, 50, seed=1), buildings, corners)
+    {'corners': 500, 'streets': 894, 'buildings': 50}
+    >>> g = load_weighted_graph_fast(buildings, corners)
+    >>> len(g.get_all_vertices('corner')), len(g.get_all_vertices('building'))
+    (500, 50)
+    >>> d, _ = shortest_path_tree(g, '0')
+    >>> max(d.values()) < math.inf
+    True
+    """
+    rng = random.Random(spec.seed)
+    lats, lngs = array('d'), array('d')
+    edges = array('i')  # the two corners of each street, one pair after another
+
+    cols = max(2, math.isqrt(round(spec.corners * (1 - spec.clustered))))
+    rows = max(2, round(spec.corners * (1 - spec.clustered)) // cols)
+    _add_grid(spec, rng, rows, cols, lats, lngs, edges)
+    _add_clusters(spec, rng, rows, cols, lats, lngs, edges)
+    kept = _remove_streets(spec, rng, len(lats), edges)
+
+    with open(corner_file, 'w') as f:
+        f.write('[\n')
+        for k, e in enumerate(kept):
+            a, b = edges[2 * e], edges[2 * e + 1]
+            dist = haversine(lngs[a], lngs[b], lats[a], lats[b])
+            for u, v in ((a, b), (b, a)):
+                f.write(',\n' if k > 0 or u == b else '')
+                json.dump({'nodes': ['{u}-{v}'.format(u=u, v=v)],
+                           'coordinates': [[lats[u], lngs[u]], [lats[v], lngs[v]]],
+                           'distance_metres': [dist]}, f)
+        f.write('\n]\n')
+
+    south, north = min(lats), max(lats)
+    west, east = min(lngs), max(lngs)
+    with open(building_file, 'w') as f:
+        f.write('[\n')
+        for i in range(spec.buildings):
+            f.write(',\n' if i > 0 else '')
+            json.dump(_building_record(rng, i, rng.uniform(south, north), rng.uniform(west, east)),
+                      f)
+        f.write('\n]\n')
+
+    return {'corners': len(lats), 'streets': len(kept), 'buildings': spec.buildings}
+
+
+def _add_grid(spec: MapSpec, rng: random.Random, rows: int, cols: int,
+              lats: array, lngs: array, edges: array) -> None:
+    """Add a grid of rows by cols corners around ORIGIN, with its streets and diagonals.
+    The corner at row r and column c gets id r * cols + c.
+    """
+    lat_step = spec.spacing / METRES_PER_DEGREE
+    lng_step = lat_step / math.cos(math.radians(ORIGIN[0]))
+    for r in range(rows):
+        for c in range(cols):
+            lats.append(ORIGIN[0] + (r - rows / 2) * lat_step
+                        + rng.gauss(0, spec.jitter) / METRES_PER_DEGREE)
+            lngs.append(ORIGIN[1] + (c - cols / 2) * lng_step
+                        + rng.gauss(0, spec.jitter) * lng_step / lat_step / METRES_PER_DEGREE)
+    for r in range(rows):
+        for c in range(cols):
+            i = r * cols + c
+            if c + 1 < cols:
+                edges.extend((i, i + 1))
+            if r + 1 < rows:
+                edges.extend((i, i + cols))
+            if r + 1 < rows and c + 1 < cols and rng.random() < spec.diagonals:
+                # A diagonal across the square, in either direction
+                if rng.random() < 0.5:
+                    edges.extend((i, i + cols + 1))
+                else:
+                    edges.extend((i + 1, i + cols))
+
+
+def _add_clusters(spec: MapSpec, rng: random.Random, rows: int, cols: int,
+                  lats: array, lngs: array, edges: array) -> None:
+    """Add the remaining corners as small clusters next to random grid corners. The corners
+    of a cluster form a loop, joined to the grid corner it is next to.
+    """
+    radius = spec.spacing / 3 / METRES_PER_DEGREE
+    while len(lats) < spec.corners:
+        size = min(rng.randint(4, 12), spec.corners - len(lats))
+        anchor = rng.randrange(rows * cols)
+        centre = (lats[anchor] + rng.uniform(-radius, radius),
+                  lngs[anchor] + rng.uniform(-radius, radius))
+        first = len(lats)
+        for k in range(size):
+            angle = 2 * math.pi * k / size
+            lats.append(centre[0] + radius * 0.5 * math.sin(angle))
+            lngs.append(centre[1] + radius * 0.5 * math.cos(angle)
+                        / math.cos(math.radians(centre[0])))
+            if k > 0:
+                edges.extend((first + k - 1, first + k))
+        if size > 2:
+            edges.extend((first + size - 1, first))
+        edges.extend((anchor, first))
+
+
+def _remove_streets(spec: MapSpec, rng: random.Random, n: int, edges: array) -> list[int]:
+    """Return the indices of the streets of edges that are kept, in increasing order.
+
+    The streets are visited in random order, and every street that joins two parts of the
+    map not yet joined by an earlier street is kept, so the kept streets connect all n
+    corners. Each other street is removed with probability spec.removed.
+    """
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    order = list(range(len(edges) // 2))
+    rng.shuffle(order)
+    kept = []
+    for e in order:
+        root_a, root_b = find(edges[2 * e]), find(edges[2 * e + 1])
+        if root_a != root_b:
+            parent[root_a] = root_b
+            kept.append(e)
+        elif rng.random() >= spec.removed:
+            kept.append(e)
+    kept.sort()
+    return kept
+
+
+def _building_record(rng: random.Random, i: int, lat: float, lng: float) -> dict:
+    """Return the record of the building with index i at (lat, lng), with the same fields as
+    the records of UofTMap.json.
+    """
+    return {'id': 1000000 + i, 'mrkId': 2000000 + i, 'mapId': 1809,
+            'name': 'Building {i:06d}'.format(i=i), 'catId': rng.choice(CATEGORY_IDS),
+            'shape': '', 'level': list(range(rng.randint(1, 4))), 'schedule': '',
+            'lat': lat, 'lng': lng, 'altitude': 0, 'reference': '', 'icon': '',
+            'marker_feed': {'rate': 0}, 'weight': 10}
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Generate the map given by argv (sys.argv[1:] by default)."""
+    parser = argparse.ArgumentParser(description='Generate a synthetic map.')
+    parser.add_argument('--corners', type=int, default=10000)
+    parser.add_argument('--buildings', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spacing', type=float, default=80.0, help='metres between corners')
+    parser.add_argument('--jitter', type=float, default=8.0, help='metres corners are moved')
+    parser.add_argument('--removed', type=float, default=0.1)
+    parser.add_argument('--diagonals', type=float, default=0.03)
+    parser.add_argument('--clustered', type=float, default=0.05)
+    parser.add_argument('--out', default=os.path.join('Data', 'synthetic'),
+                        help='the directory the two files are written to')
+    args = parser.parse_args(argv)
+
+    spec = MapSpec(args.corners, args.buildings, args.seed, args.spacing, args.jitter,
+                   args.removed, args.diagonals, args.clustered)
+    os.makedirs(args.out, exist_ok=True)
+    building_file = os.path.join(args.out, 'UofTMap.json')
+    corner_file = os.path.join(args.out, 'full_corner.json')
+    counts = generate_map(spec, building_file, corner_file)
+    print('wrote {corners} corners, {streets} streets and {buildings} buildings to {out}'.format(
+        out=args.out, **counts))
+
+
+if __name__ == '__main__':
+    main()
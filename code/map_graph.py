@@ -18,8 +18,13 @@ please consult our Course Syllabus.
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
 from __future__ import annotations
-from typing import Any, Union
+import math
+from typing import Any, Optional, Union
 from distance import distance
+from spatial_index import SpatialIndex
+
+# The number of recent changes of edge weights a MapGraph remembers for changes_since
+MAX_CHANGES = 4096
 
 
 class _LocationVertex:
@@ -77,11 +82,92 @@ class MapGraph:
     #     - _vertices:
     #         A collection of the vertices contained in this graph.
     #         Maps name to _LocationVertex object.
+    #     - _min_weight_ratio:
+    #         The smallest ratio of an edge's weight to the great-circle distance between
+    #         its endpoints, over all edges whose endpoints are at different locations.
+    #     - _version:
+    #         The number of changes made to this graph, used to detect stale cached results.
+    #     - _corner_index:
+    #         A spatial index of the locations of the corner vertices.
+    #     - _edge_modes:
+    #         The access rules of the edges that have them, by (name1, name2) for the edge
+    #         from name1 to name2. Each maps the modes of transportation allowed on the edge
+    #         to their speed on it in metres per second, or to None for their usual speed.
+    #         Every mode is allowed at its usual speed on the edges without rules.
+    #     - _closed:
+    #         The weight of each closed edge, by (name1, name2) in both directions.
+    #     - _changes:
+    #         The recent changes of edge weights, in the order they were made, as
+    #         (version, name1, name2, old weight, new weight) tuples, where version is the
+    #         version of this graph after the change. A missing or closed edge has a weight
+    #         of math.inf.
+    #     - _rebuild_version:
+    #         The version after the last change that is not recorded in _changes, either
+    #         because it is not a change of an edge weight or because it is too old.
     _vertices: dict[Any, _LocationVertex]
+    _min_weight_ratio: float
+    _version: int
+    _corner_index: SpatialIndex
+    _edge_modes: dict[tuple[Any, Any], dict[str, Optional[float]]]
+    _closed: dict[tuple[Any, Any], Union[int, float]]
+    _changes: list[tuple[int, Any, Any, float, float]]
+    _rebuild_version: int
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges)."""
         self._vertices = {}
+        self._min_weight_ratio = 1.0
+        self._version = 0
+        self._corner_index = SpatialIndex()
+        self._edge_modes = {}
+        self._closed = {}
+        self._changes = []
+        self._rebuild_version = 0
+
+    def __getstate__(self) -> dict:
+        """Return a flat representation of this graph to be pickled.
+
+        The vertices refer to each other through their neighbours, so pickling them directly
+        recurses once per vertex on a path and fails on the full campus map. Instead, the
+        vertices and edges are stored as lists of tuples.
+        """
+        edges = []
+        for v in self._vertices.values():
+            for u, dist in v.neighbours.items():
+                edges.append((v.name, u.name, dist))
+        return {'vertices': [(v.name, v.location, v.kind) for v in self._vertices.values()],
+                'edges': edges,
+                'min_weight_ratio': self._min_weight_ratio,
+                'version': self._version,
+                'edge_modes': list(self._edge_modes.items()),
+                'closed': list(self._closed.items())}
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore this graph from the representation returned by __getstate__.
+
+        >>> import pickle
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 1), 'building')
+        >>> g.add_edge('A', 'B', 5)
+        >>> copy = pickle.loads(pickle.dumps(g))
+        >>> copy.get_distance('A', 'B'), copy.get_location('B'), copy.get_version()
+        (5, (0, 1), 3)
+        """
+        self._vertices = {}
+        self._corner_index = SpatialIndex()
+        for name, location, kind in state['vertices']:
+            self._vertices[name] = _LocationVertex(name, location, kind)
+            if kind == 'corner':
+                self._corner_index.insert(name, location[0], location[1])
+        for name1, name2, dist in state['edges']:
+            self._vertices[name1].neighbours[self._vertices[name2]] = dist
+        self._min_weight_ratio = state['min_weight_ratio']
+        self._version = state['version']
+        self._edge_modes = dict(state['edge_modes'])
+        self._closed = dict(state['closed'])
+        self._changes = []
+        self._rebuild_version = self._version
 
     def add_vertex(self, name: Any, location: tuple[float, float], kind: str) -> None:
         """Add a vertex with the given name and kind to this graph.
@@ -94,6 +180,10 @@ class MapGraph:
         """
         if name not in self._vertices:
             self._vertices[name] = _LocationVertex(name, location, kind)
+            self._version += 1
+            self._rebuild_version = self._version
+            if kind == 'corner':
+                self._corner_index.insert(name, location[0], location[1])
 
     def add_edge(self, name1: Any, name2: Any, dist: Union[int, float]) -> None:
         """Add an edge between the two vertices with the given names in this graph,
@@ -109,12 +199,203 @@ class MapGraph:
             v2 = self._vertices[name2]
 
             # Add the new edge
+            old = v1.neighbours.get(v2, math.inf)
             v1.neighbours[v2] = dist
             v2.neighbours[v1] = dist
+            self._closed.pop((name1, name2), None)
+            self._closed.pop((name2, name1), None)
+            self._record_change(name1, name2, old, dist)
         else:
             # We didn't find an existing vertex for both items.
             raise ValueError
 
+    def close_edge(self, name1: Any, name2: Any) -> None:
+        """Close the edge between name1 and name2, such as a street closed for construction
+        or snow. The edge is removed from this graph until reopen_edge is called, and its
+        weight is kept for it.
+
+        Raise a ValueError if name1 and name2 are not adjacent vertices in this graph.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> g.add_edge('A', 'B', 5)
+        >>> g.close_edge('B', 'A')
+        >>> g.adjacent('A', 'B'), g.closed_edges()
+        (False, [('B', 'A', 5)])
+        >>> g.reopen_edge('A', 'B')
+        >>> g.get_distance('A', 'B'), g.closed_edges()
+        (5, [])
+        """
+        if not self.adjacent(name1, name2):
+            raise ValueError
+        v1, v2 = self._vertices[name1], self._vertices[name2]
+        dist = v1.neighbours.pop(v2)
+        del v2.neighbours[v1]
+        self._closed[(name1, name2)] = dist
+        self._closed[(name2, name1)] = dist
+        self._record_change(name1, name2, dist, math.inf)
+
+    def reopen_edge(self, name1: Any, name2: Any) -> None:
+        """Reopen the edge between name1 and name2 closed by close_edge, with the weight it
+        had when it was closed.
+
+        Raise a ValueError if there is no closed edge between name1 and name2.
+        """
+        if (name1, name2) not in self._closed:
+            raise ValueError
+        dist = self._closed.pop((name1, name2))
+        del self._closed[(name2, name1)]
+        v1, v2 = self._vertices[name1], self._vertices[name2]
+        v1.neighbours[v2] = dist
+        v2.neighbours[v1] = dist
+        self._record_change(name1, name2, math.inf, dist)
+
+    def set_edge_weight(self, name1: Any, name2: Any, dist: Union[int, float]) -> None:
+        """Change the weight of the edge between name1 and name2 to dist, such as when a
+        detour makes a street longer to walk.
+
+        Raise a ValueError if name1 and name2 are not adjacent vertices in this graph.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> g.add_edge('A', 'B', 5)
+        >>> version = g.get_version()
+        >>> g.set_edge_weight('A', 'B', 8)
+        >>> g.get_distance('B', 'A'), g.changes_since(version)
+        (8, [('A', 'B', 5, 8)])
+        """
+        if not self.adjacent(name1, name2):
+            raise ValueError
+        v1, v2 = self._vertices[name1], self._vertices[name2]
+        old = v1.neighbours[v2]
+        v1.neighbours[v2] = dist
+        v2.neighbours[v1] = dist
+        self._record_change(name1, name2, old, dist)
+
+    def closed_edges(self) -> list[tuple[Any, Any, Union[int, float]]]:
+        """Return the (name1, name2, weight) of each closed edge, as it was closed."""
+        seen = set()
+        edges = []
+        for (name1, name2), dist in self._closed.items():
+            if (name2, name1) not in seen:
+                seen.add((name1, name2))
+                edges.append((name1, name2, dist))
+        return edges
+
+    def changes_since(self, version: int) -> Optional[list[tuple[Any, Any, float, float]]]:
+        """Return the changes of edge weights made to this graph since it was at the given
+        version, in the order they were made, as (name1, name2, old weight, new weight)
+        tuples, where a missing or closed edge has a weight of math.inf.
+
+        Return None if some other change was made since then, such as adding a vertex, or
+        if the changes are too old to be remembered; a result computed at that version then
+        has to be computed again. Changes of access rules do not change any edge weight, so
+        they are not returned.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> version = g.get_version()
+        >>> g.add_edge('A', 'B', 5)
+        >>> g.close_edge('A', 'B')
+        >>> g.changes_since(version)
+        [('A', 'B', inf, 5), ('A', 'B', 5, inf)]
+        >>> g.add_vertex('C', (0, 0), 'corner')
+        >>> g.changes_since(version) is None
+        True
+
+        Forgetting old changes never hides a newer change that is not an edge weight:
+
+        >>> g.reopen_edge('A', 'B')
+        >>> for i in range(MAX_CHANGES - 3):
+        ...     g.set_edge_weight('A', 'B', 6 + i % 2)
+        >>> version = g.get_version()
+        >>> g.add_vertex('D', (0, 0), 'corner')
+        >>> g.add_edge('C', 'D', 1)
+        >>> g.changes_since(version) is None
+        True
+        """
+        if version < self._rebuild_version:
+            return None
+        changes = []
+        for change_version, name1, name2, old, new in reversed(self._changes):
+            if change_version <= version:
+                break
+            changes.append((name1, name2, old, new))
+        changes.reverse()
+        return changes
+
+    def _record_change(self, name1: Any, name2: Any, old: float, new: float) -> None:
+        """Record that the weight of the edge between name1 and name2 changed from old to
+        new, as a new version of this graph.
+        """
+        self._version += 1
+        self._changes.append((self._version, name1, name2, old, new))
+        if len(self._changes) > MAX_CHANGES:
+            # Forget the older half of the changes, keeping any later version of add_vertex
+            self._rebuild_version = max(self._rebuild_version,
+                                        self._changes[MAX_CHANGES // 2 - 1][0])
+            del self._changes[:MAX_CHANGES // 2]
+
+        # Keep the great-circle lower bound admissible for the new weight
+        v1, v2 = self._vertices[name1], self._vertices[name2]
+        great_circle = v1.get_distance(v2) if v1.location != v2.location else 0
+        if great_circle > 0 and new < old:
+            self._min_weight_ratio = min(self._min_weight_ratio, new / great_circle)
+
+    def set_edge_modes(self, name1: Any, name2: Any, speeds: dict[str, Optional[float]],
+                       both_ways: bool = True) -> None:
+        """Allow only the modes of transportation in speeds on the edge from name1 to name2.
+        Each mode is mapped to its speed on the edge in metres per second, or to None for its
+        usual speed. If both_ways is True, the same rules are given to the edge from name2 to
+        name1; otherwise, that direction keeps its rules (so a street can be one-way for cars).
+
+        Raise a ValueError if name1 and name2 are not adjacent vertices in this graph, or if
+        a speed in speeds is neither None nor greater than 0.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> g.add_edge('A', 'B', 5)
+        >>> g.set_edge_modes('A', 'B', {'walking': None, 'bicycle': 2.5})
+        >>> g.mode_neighbours('B')
+        [('A', 5, {'walking': None, 'bicycle': 2.5})]
+        >>> g.set_edge_modes('A', 'B', {'walking': 0})
+        Traceback (most recent call last):
+        ValueError
+        """
+        if not self.adjacent(name1, name2):
+            raise ValueError
+        if any(speed is not None and not speed > 0 for speed in speeds.values()):
+            raise ValueError
+        self._edge_modes[(name1, name2)] = dict(speeds)
+        if both_ways:
+            self._edge_modes[(name2, name1)] = dict(speeds)
+        self._version += 1
+
+    def has_mode_rules(self) -> bool:
+        """Return whether any edge of this graph has access rules set by set_edge_modes."""
+        return bool(self._edge_modes)
+
+    def get_version(self) -> int:
+        """Return the number of changes made to this graph so far.
+
+        Every call to add_vertex that adds a vertex and every call to add_edge,
+        set_edge_modes, close_edge, reopen_edge or set_edge_weight changes the version, so a
+        result computed at one version is stale at any other version.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> before = g.get_version()
+        >>> g.add_edge('A', 'B', 1)
+        >>> g.get_version() == before
+        False
+        """
+        return self._version
+
     def get_distance(self, name1: Any, name2: Any) -> Union[int, float]:
         """Return the weight of the edge between the given items.
 
@@ -151,6 +432,40 @@ class MapGraph:
         else:
             raise ValueError
 
+    def weighted_neighbours(self, name: Any) -> list[tuple[Any, Union[int, float]]]:
+        """Return a list of (neighbour name, edge weight) pairs of the given name.
+
+        This gives the routing engines each neighbour together with its distance, without
+        looking both vertices up again in get_distance.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (0, 0), 'corner')
+        >>> g.add_vertex('B', (0, 0), 'corner')
+        >>> g.add_edge('A', 'B', 7)
+        >>> g.weighted_neighbours('A')
+        [('B', 7)]
+        """
+        if name in self._vertices:
+            return [(u.name, dist) for u, dist in self._vertices[name].neighbours.items()]
+        else:
+            raise ValueError
+
+    def mode_neighbours(self, name: Any) -> list[tuple[Any, Union[int, float], Optional[dict]]]:
+        """Return a list of (neighbour name, edge weight, access rules) triples of the given
+        name, where the access rules are those set by set_edge_modes for the edge to the
+        neighbour, or None if every mode is allowed on it at its usual speed.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        if name in self._vertices:
+            rules = self._edge_modes
+            return [(u.name, dist, rules.get((name, u.name)))
+                    for u, dist in self._vertices[name].neighbours.items()]
+        else:
+            raise ValueError
+
     def get_all_vertices(self, kind: str = '') -> set:
         """Return a set of all vertex items in this graph.
 
@@ -164,27 +479,59 @@ class MapGraph:
         else:
             return set(self._vertices.keys())
 
-    def find_closest_vertex(self, name: str) -> list[str]:
-        """Return the list of names of (at most) three corner vertex that is closest
-        to the vertex with the given building name.
+    def find_closest_vertex(self, name: str, k: int = 3) -> list[str]:
+        """Return the list of names of (at most) k corner vertices that are closest
+        to the vertex with the given building name, from the closest to the furthest.
+
+        The corners are found with a spatial index, so only the corners near the building
+        are measured.
 
         Preconditions:
             - name in self._vertices
             - self._vertices[name].kind == 'building'
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('1', (43.660, -79.395), 'corner')
+        >>> g.add_vertex('2', (43.661, -79.395), 'corner')
+        >>> g.add_vertex('3', (43.670, -79.395), 'corner')
+        >>> g.add_vertex('4', (43.690, -79.395), 'corner')
+        >>> g.add_vertex('Hall', (43.6604, -79.395), 'building')
+        >>> g.find_closest_vertex('Hall')
+        ['1', '2', '3']
         """
-        dist_so_far = []
-        corners = self.get_all_vertices('corner')
-        b = self._vertices[name]
+        lat, lng = self._vertices[name].location
+        return self._corner_index.nearest(lat, lng, k)
 
-        for c_name in corners:
-            c = self._vertices[c_name]
-            dist = b.get_distance(c)
-            dist_so_far.append((c_name, dist))
+    def distance_lower_bound(self, name1: Any, name2: Any) -> float:
+        """Return a lower bound on the length of any path between the given vertices.
 
-        # Sort the list based on the distance (minimum)
-        dist_so_far.sort(key=lambda x: x[1])
+        The bound is the great-circle distance between the two vertices, scaled down so that
+        it never exceeds the weight of any edge in this graph (the edge weights in the data
+        files are truncated to whole metres).
 
-        return [dist_so_far[i][0] for i in range(3)]
+        Preconditions:
+            - name1 in self._vertices and name2 in self._vertices
+
+        >>> g = MapGraph()
+        >>> g.add_vertex('A', (43.66, -79.39), 'corner')
+        >>> g.add_vertex('B', (43.661, -79.39), 'corner')
+        >>> g.add_edge('A', 'B', 55)
+        >>> g.distance_lower_bound('A', 'B') <= 55
+        True
+        """
+        v1 = self._vertices[name1]
+        v2 = self._vertices[name2]
+        if v1.location == v2.location:
+            return 0.0
+        return self._min_weight_ratio * v1.get_distance(v2)
+
+    def get_kind(self, name: Any) -> str:
+        """Return the kind of the given vertex: 'building' or 'corner'.
+
+        Preconditions:
+            - name in self._vertices
+        """
+        return self._vertices[name].kind
 
     def get_location(self, name: str) -> tuple:
         """Return the location attribute of the given vertex
@@ -200,7 +547,7 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'typing', 'distance'],
+        'extra-imports': ['python_ta.contracts', 'typing', 'distance', 'spatial_index'],
         'disable': ['E1136', 'W0221']
     })
     import python_ta.contracts
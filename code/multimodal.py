@@ -0,0 +1,220 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module finds the fastest route for every mode of transportation at once. The edges of a
+MapGraph can have access rules (see MapGraph.set_edge_modes) that keep some modes off them,
+such as cars on a pedestrian-only lane, or change the speed of a mode on them, so the fastest
+route of each mode can be different. Instead of one search per mode, multimodal_routes runs a
+single search whose labels each carry every mode that reached a vertex at the same cost, so
+the modes are searched together until an access rule sets them apart.
+
+The access rules of the campus can be read from a JSON file with load_access_rules. Each rule
+names its edge in the same way as full_corner.json, and maps each mode allowed on the edge to
+its speed in metres per second, or to null for its usual speed:
+
+    [{"nodes": ["12-13"], "modes": {"walking": null, "bicycle": 3.0}, "one_way": false}]
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import json
+import math
+import os
+from typing import Any, Optional, Union
+from heapq import heappush, heappop
+from dijkstra import NoShortestPathError, SearchStats, ShortestPathTreeCache, shortest_path
+from map_graph import MapGraph
+from csr_graph import CSRGraph
+from vehicle_return_time import MODES, SPEEDS
+
+
+def multimodal_routes(graph: Union[MapGraph, CSRGraph], start: Any, end: Any,
+                      modes: tuple = MODES, engine: str = 'auto',
+                      stats: Optional[SearchStats] = None,
+                      cache: Optional[ShortestPathTreeCache] = None) -> dict[str, dict]:
+    """Return the fastest route from start to end for each mode of modes, as a dictionary
+    mapping each mode to its path (a list of vertex names), its distance in metres and the
+    number of seconds it takes. When a mode cannot reach end, its path is None and its
+    distance and seconds are math.inf.
+
+    If no edge of graph has access rules, every mode takes the shortest path, which is found
+    by a single shortest_path search with the given engine and cache. Otherwise, the routes
+    of all the modes are found by one search, in which the route of each mode is ordered by
+    its time multiplied by the usual speed of the mode. On the edges without access rules
+    this is the distance for every mode, so the modes are only searched apart after an access
+    rule has given them different routes.
+
+    If stats is given, the number of settled labels and relaxed edges is added to it.
+
+    Preconditions:
+        - start in graph.get_all_vertices() and end in graph.get_all_vertices()
+        - all(mode in SPEEDS for mode in modes)
+
+    >>> g = MapGraph()
+    >>> for name in ['Hall', '1', '2', 'Library']:
+    ...     g.add_vertex(name, (0, 0), 'corner')
+    >>> g.add_edge('Hall', '1', 100)
+    >>> g.add_edge('1', 'Library', 100)
+    >>> g.add_edge('Hall', '2', 150)
+    >>> g.add_edge('2', 'Library', 150)
+    >>> routes = multimodal_routes(g, 'Hall', 'Library')
+    >>> routes['car']['path'] == routes['walking']['path'] == ['Hall', '1', 'Library']
+    True
+    >>> g.set_edge_modes('1', 'Library', {'walking': None, 'bicycle': 2.0})
+    >>> routes = multimodal_routes(g, 'Hall', 'Library')
+    >>> routes['car']['path'], routes['car']['distance']
+    (['Hall', '2', 'Library'], 300.0)
+    >>> routes['walking']['path'], routes['walking']['seconds']
+    (['Hall', '1', 'Library'], 200.0)
+    >>> routes['bicycle']['path']
+    ['Hall', '2', 'Library']
+    """
+    if not (isinstance(graph, MapGraph) and graph.has_mode_rules()):
+        return _shared_routes(graph, start, end, modes, engine, stats, cache)
+
+    # Each entry of the queue is a (cost, tie, vertex, modes) label, where cost is the time of
+    # the modes multiplied by their usual speed. The modes whose routes reach a vertex at the
+    # same cost share a label, so while no access rule tells them apart the modes are searched
+    # together, as in a single shortest-path search.
+    queue = [(0.0, 0, start, modes)]
+    cost = {mode: {start: 0.0} for mode in modes}  # the best cost of each vertex, by mode
+    metres = {mode: {start: 0.0} for mode in modes}
+    path_via = {mode: {start: None} for mode in modes}
+    tie = 0  # keeps labels of equal cost in the order they were found
+    remaining = set(modes)
+    settled = relaxed = 0
+    while remaining and queue:
+        c, _, v, label_modes = heappop(queue)
+        # Drop the modes of this label that reached v sooner along another route, or that
+        # have already reached end
+        label_modes = [mode for mode in label_modes
+                       if cost[mode][v] == c and mode in remaining]
+        if not label_modes:
+            continue
+        settled += 1
+        if v == end:
+            remaining.difference_update(label_modes)
+            continue
+
+        for u, dist, rules in graph.mode_neighbours(v):
+            relaxed += 1
+            if rules is None:
+                # Every mode moves on at its usual speed, so the label stays together
+                new_cost = c + dist
+                new_modes = []
+                for mode in label_modes:
+                    if new_cost < cost[mode].get(u, math.inf):
+                        cost[mode][u] = new_cost
+                        metres[mode][u] = metres[mode][v] + dist
+                        path_via[mode][u] = v
+                        new_modes.append(mode)
+                if new_modes:
+                    tie += 1
+                    heappush(queue, (new_cost, tie, u, new_modes))
+                continue
+
+            improved = {}  # the modes whose best cost at u was lowered, by new cost
+            for mode in label_modes:
+                if mode in rules:
+                    speed = SPEEDS[mode] if rules[mode] is None else rules[mode]
+                    new_cost = c + dist * SPEEDS[mode] / speed
+                    if new_cost < cost[mode].get(u, math.inf):
+                        cost[mode][u] = new_cost
+                        metres[mode][u] = metres[mode][v] + dist
+                        path_via[mode][u] = v
+                        improved.setdefault(new_cost, []).append(mode)
+            for new_cost, new_modes in improved.items():
+                tie += 1
+                heappush(queue, (new_cost, tie, u, new_modes))
+
+    if stats is not None:
+        stats.record('multimodal', settled, relaxed)
+
+    routes = {}
+    for mode in modes:
+        if mode in remaining:
+            routes[mode] = _route(None, math.inf, math.inf)
+        else:
+            path = [end]
+            while path_via[mode][path[-1]] is not None:
+                path.append(path_via[mode][path[-1]])
+            path.reverse()
+            routes[mode] = _route(path, metres[mode][end], cost[mode][end] / SPEEDS[mode])
+    return routes
+
+
+def load_access_rules(graph: MapGraph, rule_file: str) -> int:
+    """Set the access rules in rule_file on the edges of graph, and return the number of
+    rules set. The format of rule_file is described at the top of this module.
+
+    Raise a ValueError if a rule names an edge that is not in graph or gives a speed that is
+    neither None nor greater than 0.
+    """
+    with open(rule_file) as json_file:
+        rules = json.load(json_file)
+    for rule in rules:
+        name1, name2 = rule['nodes'][0].split('-')
+        graph.set_edge_modes(name1, name2, rule['modes'], not rule.get('one_way', False))
+    return len(rules)
+
+
+def with_access_rules(graph: Union[MapGraph, CSRGraph],
+                      rule_file: str) -> Union[MapGraph, CSRGraph]:
+    """Return graph with the access rules in rule_file set on its edges, or graph itself if
+    there is no file at rule_file. A CSRGraph cannot hold access rules, so the rules are set
+    on a MapGraph copy of it, which is returned instead.
+
+    Raise a ValueError if a rule is not valid, as in load_access_rules.
+    """
+    if not os.path.exists(rule_file):
+        return graph
+    if isinstance(graph, CSRGraph):
+        graph = graph.to_map_graph()
+    load_access_rules(graph, rule_file)
+    return graph
+
+
+def _shared_routes(graph: Union[MapGraph, CSRGraph], start: Any, end: Any, modes: tuple,
+                   engine: str, stats: Optional[SearchStats],
+                   cache: Optional[ShortestPathTreeCache]) -> dict[str, dict]:
+    """Return the routes of multimodal_routes when every mode takes the shortest path."""
+    try:
+        path = shortest_path(start, end, graph, engine, stats, cache)
+    except NoShortestPathError:
+        return {mode: _route(None, math.inf, math.inf) for mode in modes}
+    total = sum(graph.get_distance(path[i - 1], path[i]) for i in range(1, len(path)))
+    return {mode: _route(path, total, total / SPEEDS[mode]) for mode in modes}
+
+
+def _route(path: Optional[list], distance: float, seconds: float) -> dict:
+    """Return the route dictionary of one mode returned by multimodal_routes."""
+    return {'path': path, 'distance': float(distance), 'seconds': float(seconds)}
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'json', 'math', 'os', 'heapq',
+                          'dijkstra', 'map_graph', 'csr_graph', 'vehicle_return_time'],
+        'allowed-io': ['load_access_rules'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
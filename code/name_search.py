@@ -0,0 +1,198 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the NameIndex class, a prebuilt index of the building names that finds the
+buildings matching a partly typed, abbreviated or misspelled name. Matches are ranked from exact
+names, through name prefixes, building codes and acronyms (such as "TWH" or "UTS"), prefixes of
+later words and substrings, down to names that only share most of their letter trigrams with the
+query. Every kind of match is found from sorted keys or from a trigram inverted index instead of
+scanning all the names, so the GUI can search again on every key press.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterator
+
+# Short words that are left out of the acronym of a name, as in "BCIT" for
+# "Bahen Centre for Information Technology"
+STOP_WORDS = frozenset({'of', 'for', 'and', 'the', 'in', 'at', 'on', 'a'})
+
+# The fraction of the trigrams of a query that a name must share to be a typo-tolerant match
+MIN_SIMILARITY = 0.5
+
+# A building code: an upper-case word before " - " or inside parentheses
+_CODE = re.compile(r'^([A-Z]{2,6}) - |\(([A-Z]{2,6})\)')
+
+
+class NameIndex:
+    """An index of names for ranked prefix, abbreviation, substring and typo-tolerant search.
+
+    >>> index = NameIndex(['TWH - Krembil Discovery Tower',
+    ...                    'Bahen Centre for Information Technology', 'Robarts Library',
+    ...                    'Gerstein Library', 'Bancroft Building'])
+    >>> index.search('twh')
+    ['TWH - Krembil Discovery Tower']
+    >>> index.search('ba')
+    ['Bahen Centre for Information Technology', 'Bancroft Building']
+    >>> index.search('bcit')
+    ['Bahen Centre for Information Technology']
+    >>> index.search('library')
+    ['Robarts Library', 'Gerstein Library']
+    >>> index.search('robrts')
+    ['Robarts Library']
+    >>> index.search('brary', limit=1)
+    ['Robarts Library']
+    """
+    # Private Instance Attributes:
+    #   - _names: the indexed names, in the order they were given
+    #   - _padded: the normalized form of each name, with a space at both ends
+    #   - _full: (normalized name, name id) pairs, sorted
+    #   - _codes: (building code or acronym, name id) pairs, sorted
+    #   - _words: (normalized name from its second or later word on, name id) pairs, sorted
+    #   - _trigrams: maps each trigram of a padded name to the ids of the names containing it
+    _names: list[str]
+    _padded: list[str]
+    _full: list[tuple[str, int]]
+    _codes: list[tuple[str, int]]
+    _words: list[tuple[str, int]]
+    _trigrams: dict[str, list[int]]
+
+    def __init__(self, names: list[str]) -> None:
+        """Build the index of the given names. Repeated names are indexed once."""
+        self._names = list(dict.fromkeys(names))
+        self._padded = []
+        self._full, self._codes, self._words = [], [], []
+        self._trigrams = {}
+
+        for i, name in enumerate(self._names):
+            normalized = normalize(name)
+            self._padded.append(' ' + normalized + ' ')
+            self._full.append((normalized, i))
+            for code in _codes_of(name):
+                self._codes.append((code, i))
+            words = normalized.split(' ')
+            for k in range(1, len(words)):
+                self._words.append((' '.join(words[k:]), i))
+            for trigram in set(_trigrams_of(self._padded[i])):
+                self._trigrams.setdefault(trigram, []).append(i)
+
+        self._full.sort()
+        self._codes = sorted(set(self._codes))
+        self._words.sort()
+
+    def __len__(self) -> int:
+        """Return the number of names in this index."""
+        return len(self._names)
+
+    def search(self, query: str, limit: int = 5) -> list[str]:
+        """Return at most limit names matching query, from the best match to the worst.
+
+        Case, punctuation and repeated spaces in query are ignored. Each kind of match is
+        only looked for when the better kinds have not found limit names yet.
+        """
+        q = normalize(query)
+        if q == '' or limit <= 0:
+            return []
+
+        found = []
+        seen = set()
+        for i in self._candidates(q):
+            if i not in seen:
+                seen.add(i)
+                found.append(self._names[i])
+                if len(found) == limit:
+                    break
+        return found
+
+    def _candidates(self, q: str) -> Iterator[int]:
+        """Yield the ids of the names matching the normalized query q, best matches first.
+        An id may be yielded more than once.
+        """
+        # Exact names, then names starting with q, then exact codes and acronyms
+        yield from _with_prefix(self._full, q)
+        yield from _with_prefix(self._codes, q)
+        # Names with a later word starting with q
+        yield from _with_prefix(self._words, q)
+        if len(q) < 3:
+            return
+        # Names containing q anywhere, checked only against the names sharing its trigrams
+        postings = sorted((self._trigrams.get(t, []) for t in set(_trigrams_of(q))), key=len)
+        if postings and postings[0]:
+            common = set(postings[0]).intersection(*postings[1:])
+            yield from sorted(i for i in common if q in self._padded[i])
+        # Names sharing most of the trigrams of q, including the word boundaries
+        trigrams = set(_trigrams_of(' ' + q + ' '))
+        counts = Counter(i for t in trigrams for i in self._trigrams.get(t, []))
+        scored = sorted((-count, len(self._names[i]), i) for i, count in counts.items()
+                        if count >= MIN_SIMILARITY * len(trigrams))
+        yield from (i for _, _, i in scored)
+
+
+def normalize(text: str) -> str:
+    """Return text in lower case, with each run of characters that are not letters or digits
+    replaced by a single space.
+
+    >>> normalize('  254/256 McCaul Street ')
+    '254 256 mccaul street'
+    """
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', text.lower()).split())
+
+
+def _codes_of(name: str) -> list[str]:
+    """Return the building codes and acronyms that name can be searched by.
+
+    >>> _codes_of('Canadian Catholic Bioethics Institute (CCBI)')
+    ['ccbi']
+    >>> _codes_of('Bahen Centre for Information Technology')
+    ['bcfit', 'bcit']
+    """
+    codes = [(match.group(1) or match.group(2)).lower() for match in _CODE.finditer(name)]
+    # The acronym is made from the words of the name other than its codes
+    words = normalize(_CODE.sub(' ', name)).split(' ')
+    if len(words) > 1:
+        codes.append(''.join(w[0] for w in words))
+        codes.append(''.join(w[0] for w in words if w not in STOP_WORDS))
+    return list(dict.fromkeys(codes))
+
+
+def _with_prefix(keys: list[tuple[str, int]], prefix: str) -> Iterator[int]:
+    """Yield the ids of the keys starting with prefix, in the order of keys."""
+    k = bisect_left(keys, (prefix,))
+    while k < len(keys) and keys[k][0].startswith(prefix):
+        yield keys[k][1]
+        k += 1
+
+
+def _trigrams_of(text: str) -> Iterator[str]:
+    """Yield the substrings of length 3 of text."""
+    return (text[k:k + 3] for k in range(len(text) - 2))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 're', 'bisect', 'collections'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
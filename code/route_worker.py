@@ -0,0 +1,155 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the RouteWorker class, which runs route requests on a background thread so
+that the Tkinter mainloop keeps handling events while a route is found and its map is drawn. The
+GUI submits a request and polls for the result with Tk.after(); nothing in this module touches
+Tkinter. Only the newest request matters: submitting a new one makes every older request stale,
+so a stale request that has not started yet is skipped, and the result of one that is already
+running is thrown away instead of being delivered.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+
+class RouteWorker:
+    """A background thread that runs one task at a time for the newest request only.
+
+    Instance Attributes:
+        - task: the function called on the worker thread with the arguments of each request
+
+    >>> import time
+    >>> worker = RouteWorker(lambda x: x * 2)
+    >>> request = worker.submit(21)
+    >>> while worker.busy():
+    ...     time.sleep(0.01)
+    >>> worker.poll() == (request, 'done', 42)
+    True
+    >>> worker.close()
+    """
+    task: Callable
+
+    # Private Instance Attributes:
+    #   - _requests: the requests waiting for the worker thread, as (request id, args) pairs,
+    #       or None to stop the thread
+    #   - _results: the finished requests, as (request id, status, value) tuples
+    #   - _latest: the id of the newest request; every request with a smaller id is stale
+    #   - _finished: the id of the newest request that has been delivered or skipped
+    #   - _lock: guards _latest and _finished
+    #   - _thread: the worker thread
+    _requests: queue.Queue
+    _results: queue.Queue
+    _latest: int
+    _finished: int
+    _lock: threading.Lock
+    _thread: threading.Thread
+
+    def __init__(self, task: Callable) -> None:
+        """Start a worker thread that runs task for each request."""
+        self.task = task
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = 0
+        self._finished = 0
+        self._lock = threading.Lock()
+        # A daemon thread does not keep the program running after the window is closed
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, *args: Any) -> int:
+        """Queue a request to run task(*args), cancel every older request, and return the id
+        of the new request.
+        """
+        with self._lock:
+            self._latest += 1
+            request = self._latest
+        self._requests.put((request, args))
+        return request
+
+    def cancel(self) -> None:
+        """Cancel every request submitted so far. The result of a task that is already running
+        is discarded when it finishes.
+        """
+        with self._lock:
+            self._finished = self._latest
+
+    def busy(self) -> bool:
+        """Return whether the newest request has neither finished nor been cancelled."""
+        with self._lock:
+            return self._finished < self._latest
+
+    def poll(self) -> Optional[tuple[int, str, Any]]:
+        """Return the result of the newest request if it has finished, or None otherwise.
+
+        The result is a tuple (request id, status, value), where status is 'done' and value is
+        the return value of task, or status is 'error' and value is the exception it raised.
+        Results of stale requests are dropped. This never blocks, so it can be called from
+        the Tkinter mainloop.
+        """
+        while True:
+            try:
+                request, status, value = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            with self._lock:
+                if request == self._latest:
+                    return (request, status, value)
+
+    def close(self) -> None:
+        """Cancel every request and stop the worker thread once its current task is done."""
+        self.cancel()
+        self._requests.put(None)
+
+    def _run(self) -> None:
+        """Run the requests of the queue on the worker thread until close is called."""
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            request, args = item
+            if self._is_stale(request):
+                continue
+            try:
+                result = (request, 'done', self.task(*args))
+            except Exception as error:  # passed to the GUI thread to report
+                result = (request, 'error', error)
+            with self._lock:
+                if request == self._latest and self._finished < request:
+                    self._finished = request
+                    self._results.put(result)
+
+    def _is_stale(self, request: int) -> bool:
+        """Return whether request has been replaced by a newer request or cancelled."""
+        with self._lock:
+            return request != self._latest or self._finished >= request
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'queue', 'threading'],
+        'disable': ['E1136', 'W0221', 'W0703']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,472 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains a small HTTP routing service built on asyncio. The graph is loaded once
+when the service starts and kept in memory, and every request is answered from it as JSON:
+
+    GET /route?from=<building>&to=<building>[&engine=<engine>]
+    GET /matrix?from=<building>&from=...&to=<building>&to=...
+    GET /isochrone?from=<building>&minutes=<n>[&mode=<mode>]
+    GET /search?q=<text>[&limit=<n>]
+    GET /metrics
+
+Searches run in an executor so the event loop keeps accepting requests, and identical requests
+that arrive while the first one is still being answered share its result instead of searching
+again. /metrics reports the number of requests and their latency for each endpoint.
+
+    python routing_service.py --port 8111
+    curl 'http://127.0.0.1:8111/route?from=Robarts%20Library&to=Sidney%20Smith%20Hall'
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import functools
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit, parse_qs
+from dijkstra import ENGINES, NoShortestPathError
+from building_matrix import BuildingMatrix, attach_matrix, matrix_for
+from contraction_hierarchy import ContractionHierarchy, attach_hierarchy, hierarchy_for
+from name_search import NameIndex
+from batch_routes import batch_routes
+from isochrone import isochrone
+from vehicle_return_time import MODES
+from cli import route_info, check_building, load, UnknownBuildingError
+from cli import BUILDING_FILE, CORNER_FILE, MATRIX_FILE, RULE_FILE
+
+# The endpoints of the service
+ENDPOINTS = ('/route', '/matrix', '/isochrone', '/search', '/metrics')
+
+# The number of recent requests of each endpoint whose latency is kept for /metrics
+LATENCY_WINDOW = 1024
+
+# The largest number of departures times destinations accepted by /matrix
+MAX_MATRIX_SIZE = 10000
+
+# The largest time budget accepted by /isochrone, in minutes
+MAX_ISOCHRONE_MINUTES = 60
+
+# The reason phrase of each status code the service sends
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+# The graph searched in a worker process of process_executor
+_worker_graph = None
+
+
+class HTTPError(Exception):
+    """Exception raised while answering a request, sent to the client as a JSON error.
+
+    Instance Attributes:
+        - status: the HTTP status code of the response
+        - body: the JSON body of the response
+    """
+    status: int
+    body: dict
+
+    def __init__(self, status: int, message: str, **details: Any) -> None:
+        """Initialize an error with the given status, message and extra fields of the body."""
+        Exception.__init__(self, message)
+        self.status = status
+        self.body = dict(error=message, **details)
+
+
+class RoutingService:
+    """The endpoints of the routing service, answering requests from one shared graph.
+
+    Instance Attributes:
+        - graph: the graph routes are found in
+        - executor: the executor the searches run in
+
+    >>> from map_graph import MapGraph
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (43.66, -79.39), 'building')
+    >>> g.add_vertex('1', (43.66, -79.39), 'corner')
+    >>> g.add_vertex('Library', (43.661, -79.39), 'building')
+    >>> g.add_edge('Hall', '1', 8)
+    >>> g.add_edge('1', 'Library', 100)
+    >>> service = RoutingService(g)
+    >>> status, body = asyncio.run(service.handle('GET', '/route?from=Hall&to=Library'))
+    >>> status, body['path'], body['distance']
+    (200, ['Hall', '1', 'Library'], 108.0)
+    >>> asyncio.run(service.handle('GET', '/matrix?from=Hall&to=Hall&to=Library'))[1]['distances']
+    [[0.0, 108.0]]
+    >>> asyncio.run(service.handle('GET', '/isochrone?from=Hall&minutes=1'))[1]['names']
+    ['Hall', '1']
+    >>> asyncio.run(service.handle('GET', '/search?q=lib'))[1]['results']
+    ['Library']
+    >>> asyncio.run(service.handle('GET', '/route?from=Hal&to=Library'))
+    (404, {'error': 'unknown building: Hal (did you mean: Hall?)', 'suggestions': ['Hall']})
+    >>> service.metrics()['/route']['requests']
+    2
+    >>> service.close()
+    """
+    graph: Any
+    executor: Executor
+
+    # Private Instance Attributes:
+    #   - _buildings: the names of the buildings of the graph
+    #   - _index: the name index of the buildings, used by /search and for suggestions
+    #   - _in_flight: maps the key of each request being answered to the future of its result
+    #   - _latencies: the latency in seconds of the recent requests of each endpoint
+    #   - _counts: the number of requests, errors and coalesced requests of each endpoint
+    #   - _started: the time.monotonic() when the service started
+    #   - _in_worker: whether the searches run in worker processes started by process_executor,
+    #       which keep their own copy of the graph
+    #   - _unmatched: the number of requests that matched no endpoint
+    _buildings: set
+    _index: NameIndex
+    _in_flight: dict[tuple, asyncio.Future]
+    _latencies: dict[str, deque]
+    _counts: dict[str, dict[str, int]]
+    _started: float
+    _in_worker: bool
+    _unmatched: int
+
+    def __init__(self, graph: Any, executor: Optional[Executor] = None) -> None:
+        """Initialize the service for graph. By default the searches run on one thread of
+        this process; use process_executor to run them in worker processes instead.
+        """
+        self.graph = graph
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1)
+        self.executor = executor
+        self._in_worker = isinstance(executor, ProcessPoolExecutor)
+        self._buildings = graph.get_all_vertices('building')
+        self._index = NameIndex(sorted(self._buildings))
+        self._in_flight = {}
+        self._latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in ENDPOINTS}
+        self._counts = {name: {'requests': 0, 'errors': 0, 'coalesced': 0}
+                        for name in ENDPOINTS}
+        self._started = time.monotonic()
+        self._unmatched = 0
+
+    def close(self) -> None:
+        """Shut down the executor of this service."""
+        self.executor.shutdown(wait=True)
+
+    async def handle(self, method: str, target: Optional[str]) -> tuple[int, dict]:
+        """Return the status code and JSON body of the response to a request for target,
+        the path and query string of the URL, or None if the request line was malformed.
+
+        An unexpected error while answering the request is sent as a 500 response.
+
+        >>> from map_graph import MapGraph
+        >>> service = RoutingService(MapGraph())
+        >>> asyncio.run(service.handle('GET', 'http://[::1'))
+        (400, {'error': 'malformed request'})
+        >>> service.metrics()['unmatched']
+        1
+        >>> service.close()
+        """
+        start = time.perf_counter()
+        endpoint = None
+        try:
+            try:
+                if target is None:
+                    raise ValueError
+                url = urlsplit(target)
+            except ValueError:
+                raise HTTPError(400, 'malformed request') from None
+            query = parse_qs(url.query)
+            endpoint = url.path.rstrip('/') or '/'
+            if endpoint not in ENDPOINTS:
+                raise HTTPError(404, 'unknown endpoint: ' + endpoint, endpoints=list(ENDPOINTS))
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(405, 'only GET requests are supported')
+            if endpoint == '/route':
+                status, body = 200, await self._route(query)
+            elif endpoint == '/matrix':
+                status, body = 200, await self._matrix(query)
+            elif endpoint == '/isochrone':
+                status, body = 200, await self._isochrone(query)
+            elif endpoint == '/search':
+                status, body = 200, self._search(query)
+            else:
+                status, body = 200, self.metrics()
+        except HTTPError as error:
+            status, body = error.status, error.body
+        except Exception as error:  # reported to the client instead of dropping the connection
+            status, body = 500, {'error': 'internal error: ' + repr(error)}
+
+        if endpoint in ENDPOINTS:
+            self._counts[endpoint]['requests'] += 1
+            if status != 200:
+                self._counts[endpoint]['errors'] += 1
+            self._latencies[endpoint].append(time.perf_counter() - start)
+        else:
+            self._unmatched += 1
+        return status, body
+
+    def metrics(self) -> dict:
+        """Return the number of requests, errors and coalesced requests of each endpoint,
+        with the mean, median, 95th percentile and maximum latency in milliseconds of its
+        recent requests, and the number of 'unmatched' requests that had no valid endpoint.
+        """
+        report = {'uptime_s': time.monotonic() - self._started,
+                  'in_flight': len(self._in_flight),
+                  'unmatched': self._unmatched}
+        for endpoint in ENDPOINTS:
+            latencies = sorted(self._latencies[endpoint])
+            report[endpoint] = dict(self._counts[endpoint])
+            if latencies:
+                report[endpoint]['latency_ms'] = {
+                    'mean': 1e3 * sum(latencies) / len(latencies),
+                    'p50': 1e3 * latencies[(len(latencies) - 1) // 2],
+                    'p95': 1e3 * latencies[math.ceil(0.95 * len(latencies)) - 1],
+                    'max': 1e3 * latencies[-1]}
+        return report
+
+    async def _route(self, query: dict) -> dict:
+        """Return the body of a /route request."""
+        start, end = self._building(query, 'from'), self._building(query, 'to')
+        engine = _single(query, 'engine', 'auto')
+        if engine not in ENGINES:
+            raise HTTPError(400, 'unknown engine: ' + engine, engines=list(ENGINES))
+        info = await self._coalesced('/route', _route_task, start, end, engine)
+        if info is None:
+            raise HTTPError(404, 'no route from {start} to {end}'.format(start=start, end=end))
+        return info
+
+    async def _matrix(self, query: dict) -> dict:
+        """Return the body of a /matrix request. Distances of pairs with no route are null."""
+        sources = [self._checked(name) for name in query.get('from', [])]
+        targets = [self._checked(name) for name in query.get('to', [])]
+        if not sources or not targets:
+            raise HTTPError(400, 'at least one from and one to building is needed')
+        if len(sources) * len(targets) > MAX_MATRIX_SIZE:
+            raise HTTPError(400, 'at most {n} pairs are allowed'.format(n=MAX_MATRIX_SIZE))
+        distances = await self._coalesced('/matrix', _matrix_task, tuple(sources),
+                                          tuple(targets))
+        return {'sources': sources, 'targets': targets, 'distances': distances}
+
+    async def _isochrone(self, query: dict) -> dict:
+        """Return the body of an /isochrone request, with the reached vertices as lists."""
+        start = self._building(query, 'from')
+        mode = _single(query, 'mode', 'walking')
+        if mode not in MODES:
+            raise HTTPError(400, 'unknown mode: ' + mode, modes=list(MODES))
+        try:
+            minutes = float(_single(query, 'minutes', ''))
+        except ValueError:
+            raise HTTPError(400, 'minutes must be a number') from None
+        if not 0 <= minutes <= MAX_ISOCHRONE_MINUTES:
+            raise HTTPError(400, 'minutes must be between 0 and {n}'.format(
+                n=MAX_ISOCHRONE_MINUTES))
+        reached = await self._coalesced('/isochrone', _isochrone_task, start, mode, minutes)
+        return dict(start=start, mode=mode, minutes=minutes, **reached)
+
+    def _search(self, query: dict) -> dict:
+        """Return the body of a /search request. Searching takes well under a millisecond,
+        so it is answered on the event loop.
+        """
+        text = _single(query, 'q', '')
+        try:
+            limit = int(_single(query, 'limit', '5'))
+        except ValueError:
+            raise HTTPError(400, 'limit must be an integer') from None
+        return {'query': text, 'results': self._index.search(text, min(limit, 50))}
+
+    async def _coalesced(self, endpoint: str, task: Callable, *args: Any) -> Any:
+        """Return task(*args) run in the executor. While it runs, another call with the same
+        task and arguments waits for the same result instead of running it again.
+        """
+        key = (task.__name__,) + args
+        if key in self._in_flight:
+            self._counts[endpoint]['coalesced'] += 1
+            # Shielded so that a client that disconnects does not cancel the shared search
+            return await asyncio.shield(self._in_flight[key])
+
+        if self._in_worker:
+            # Only the task and its arguments are sent; the workers have their own graph
+            call = functools.partial(_in_worker, task)
+        else:
+            call = functools.partial(task, self.graph)
+        future = asyncio.get_running_loop().run_in_executor(self.executor, call, *args)
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _building(self, query: dict, field: str) -> str:
+        """Return the building named by the single value of field in query."""
+        if field not in query:
+            raise HTTPError(400, 'missing parameter: ' + field)
+        return self._checked(_single(query, field, ''))
+
+    def _checked(self, name: str) -> str:
+        """Return name if it is a building of the graph, and raise a 404 HTTPError with the
+        closest names otherwise.
+        """
+        try:
+            check_building(name, self._buildings, self._index)
+        except UnknownBuildingError as error:
+            raise HTTPError(404, str(error), suggestions=error.suggestions) from None
+        return name
+
+
+async def serve(service: RoutingService, host: str = '127.0.0.1',
+                port: int = 8111) -> asyncio.AbstractServer:
+    """Start answering HTTP requests for service on host and port, and return the server.
+
+    >>> from map_graph import MapGraph
+    >>> import urllib.request
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (43.66, -79.39), 'building')
+    >>> g.add_vertex('Library', (43.661, -79.39), 'building')
+    >>> g.add_edge('Hall', 'Library', 108)
+    >>> service = RoutingService(g)
+    >>> async def fetch(path):
+    ...     server = await serve(service, '127.0.0.1', 0)
+    ...     url = 'http://127.0.0.1:{port}{path}'.format(port=server.sockets[0].getsockname()[1],
+    ...                                                  path=path)
+    ...     def get():
+    ...         with urllib.request.urlopen(url) as response:
+    ...             return response.status, json.loads(response.read())
+    ...     result = await asyncio.get_running_loop().run_in_executor(None, get)
+    ...     server.close()
+    ...     await server.wait_closed()
+    ...     return result
+    >>> asyncio.run(fetch('/route?from=Hall&to=Library'))[1]['distance']
+    108.0
+    >>> service.close()
+    """
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            # The headers are read and ignored, since no request has a body
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) != 3:
+                method, target = 'GET', None
+            else:
+                method, target = parts[0], parts[1]
+            status, body = await service.handle(method, target)
+            payload = json.dumps(body).encode('utf-8')
+            writer.write('HTTP/1.1 {status} {reason}\r\n'
+                         'Content-Type: application/json\r\n'
+                         'Content-Length: {length}\r\n'
+                         'Connection: close\r\n\r\n'.format(status=status,
+                                                            reason=_REASONS.get(status, ''),
+                                                            length=len(payload)).encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(on_connection, host, port)
+
+
+def process_executor(graph: Any, workers: Optional[int] = None) -> Executor:
+    """Return an executor that runs the searches of a RoutingService for graph in workers
+    worker processes (all CPU cores by default).
+
+    The graph is sent to each worker once, together with its attached building matrix and
+    its contraction hierarchy, which is built here first, so that no worker builds its own.
+    """
+    initargs = (graph, matrix_for(graph), hierarchy_for(graph))
+    return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs)
+
+
+def _init_worker(graph: Any, matrix: Optional[BuildingMatrix],
+                 hierarchy: ContractionHierarchy) -> None:
+    """Store the graph searched in a worker process of process_executor, and attach its
+    building matrix and contraction hierarchy to it.
+    """
+    global _worker_graph
+    _worker_graph = graph
+    if matrix is not None:
+        attach_matrix(graph, matrix)
+    attach_hierarchy(graph, hierarchy)
+
+
+def _in_worker(task: Callable, *args: Any) -> Any:
+    """Return task(graph, *args) for the graph of this worker process of process_executor."""
+    return task(_worker_graph, *args)
+
+
+def _route_task(graph: Any, start: str, end: str, engine: str) -> Optional[dict]:
+    """Return the route_info of a /route request, or None if there is no route."""
+    try:
+        return route_info(start, end, graph, engine)
+    except NoShortestPathError:
+        return None
+
+
+def _isochrone_task(graph: Any, start: str, mode: str, minutes: float) -> dict:
+    """Return the vertices reached by an /isochrone request, with their arrays as lists."""
+    reached = isochrone(graph, start, mode, 60 * minutes)
+    return {field: list(values) for field, values in reached.items()}
+
+
+def _matrix_task(graph: Any, sources: tuple, targets: tuple) -> list[list[Optional[float]]]:
+    """Return the distances of a /matrix request, one row per source, with one search per
+    distinct source. Pairs with no route have a distance of None.
+    """
+    pairs = [(s, t) for s in sources for t in targets]
+    routes = batch_routes(pairs, graph, processes=1, paths=False)
+    distances = [None if r['distance'] == math.inf else r['distance'] for r in routes]
+    return [distances[i * len(targets):(i + 1) * len(targets)] for i in range(len(sources))]
+
+
+def _single(query: dict, field: str, default: str) -> str:
+    """Return the last value of field in the parsed query string query, or default."""
+    return query[field][-1] if field in query else default
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Load the graph and serve it until interrupted."""
+    parser = argparse.ArgumentParser(description='Serve routes between UofT buildings.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8111)
+    parser.add_argument('--processes', type=int, default=0,
+                        help='the number of worker processes for searches (0 for one thread)')
+    parser.add_argument('--buildings', default=BUILDING_FILE)
+    parser.add_argument('--corners', default=CORNER_FILE)
+    parser.add_argument('--matrix', default=MATRIX_FILE)
+    parser.add_argument('--rules', default=RULE_FILE,
+                        help='the access rules file, followed by /route and /isochrone if it '
+                             'exists')
+    args = parser.parse_args(argv)
+
+    graph = load(args.buildings, args.corners, args.matrix, args.rules)
+    executor = process_executor(graph, args.processes) if args.processes > 0 else None
+    service = RoutingService(graph, executor)
+
+    async def run() -> None:
+        server = await serve(service, args.host, args.port)
+        print('serving on http://{host}:{port}'.format(host=args.host, port=args.port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""CSC111 Winter 2021 Project: To-Run-To Map
+
+Module Description
+==================
+This module contains the SpatialIndex class, a uniform grid over latitude and longitude that
+finds the points closest to a location without measuring the distance to every point. Points
+are bucketed into square cells, and a query looks at the cells in rings of growing size around
+the location until no unvisited cell can hold a closer point. MapGraph keeps one of these for its
+corners so that find_closest_vertex, and therefore load_weighted_graph, stay fast on large maps.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of students
+taking CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. For more information on copyright for CSC111 materials,
+please consult our Course Syllabus.
+
+This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Iterator
+from distance import distances_from
+
+# The number of metres in one degree of latitude, using the radius in distance.distance
+METRES_PER_DEGREE = 6.378e+6 * math.pi / 180
+
+# The fraction of the flat-map distance that the great-circle distance is always above, for
+# points less than about 80 degrees of longitude apart
+_SAFETY = 0.9
+
+
+class SpatialIndex:
+    """A grid index of named points, supporting nearest-neighbour and radius queries.
+
+    Instance Attributes:
+        - cell_size: the width and height of a grid cell, in degrees
+
+    >>> index = SpatialIndex()
+    >>> index.insert('a', 43.6600, -79.3950)
+    >>> index.insert('b', 43.6610, -79.3950)
+    >>> index.insert('c', 43.6700, -79.3950)
+    >>> index.nearest(43.6601, -79.3950, 2)
+    ['a', 'b']
+    >>> [name for name, _ in index.within(43.6601, -79.3950, 200)]
+    ['a', 'b']
+    """
+    cell_size: float
+
+    # Private Instance Attributes:
+    #   - _cells: maps the (row, column) of each non-empty cell to the points in it, as
+    #       (name, latitude, longitude) tuples
+    #   - _bounds: the smallest and largest row and column of a non-empty cell
+    #   - _max_abs_lat: the largest absolute latitude of a point in the index
+    #   - _size: the number of points in the index
+    _cells: dict[tuple[int, int], list[tuple[Any, float, float]]]
+    _bounds: list[int]
+    _max_abs_lat: float
+    _size: int
+
+    def __init__(self, cell_size: float = 0.001) -> None:
+        """Initialize an empty index with cells of the given size in degrees.
+
+        The default of 0.001 degrees is about 110 metres, close to the length of a block.
+
+        Preconditions:
+            - cell_size > 0
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._bounds = [0, -1, 0, -1]
+        self._max_abs_lat = 0.0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of points in this index."""
+        return self._size
+
+    def insert(self, name: Any, lat: float, lng: float) -> None:
+        """Add the point with the given name and location to this index."""
+        row, col = self._cell(lat, lng)
+        self._cells.setdefault((row, col), []).append((name, lat, lng))
+        if self._size == 0:
+            self._bounds = [row, row, col, col]
+        else:
+            self._bounds = [min(self._bounds[0], row), max(self._bounds[1], row),
+                            min(self._bounds[2], col), max(self._bounds[3], col)]
+        self._max_abs_lat = max(self._max_abs_lat, abs(lat))
+        self._size += 1
+
+    def nearest(self, lat: float, lng: float, k: int) -> list[Any]:
+        """Return the names of the (at most) k points closest to the given location, from
+        the closest to the furthest. Ties are broken by name.
+
+        The location may be closer to a pole than every point in the index:
+
+        >>> index = SpatialIndex(1.0)
+        >>> for name, lat, lng in [('p0', 67.18, -8.05), ('p1', 62.74, 25.91),
+        ...                        ('p2', 67.94, -24.81), ('p3', 69.77, -28.01)]:
+        ...     index.insert(name, lat, lng)
+        >>> index.nearest(82.3, 27.43, 1)
+        ['p3']
+        """
+        found = []
+        for ring, points in self._rings(lat, lng):
+            found.extend(zip(self._distances(lat, lng, points), (p[0] for p in points)))
+            if len(found) >= k:
+                found.sort()
+                del found[k:]
+                if found[-1][0] < self._unvisited_bound(lat, lng, ring):
+                    break
+        found.sort()
+        return [name for _, name in found[:k]]
+
+    def within(self, lat: float, lng: float, radius: float) -> list[tuple[Any, float]]:
+        """Return (name, distance) pairs of the points at most radius metres from the given
+        location, from the closest to the furthest.
+        """
+        found = []
+        for ring, points in self._rings(lat, lng):
+            for dist, point in zip(self._distances(lat, lng, points), points):
+                if dist <= radius:
+                    found.append((dist, point[0]))
+            if self._unvisited_bound(lat, lng, ring) > radius:
+                break
+        found.sort()
+        return [(name, dist) for dist, name in found]
+
+    @staticmethod
+    def _distances(lat: float, lng: float, points: list) -> list[float]:
+        """Return the distances in metres from the given location to each of points, measured
+        in one batched call like distance.distance.
+        """
+        if not points:
+            return []
+        return [float(dist) for dist in distances_from(lat, lng, [p[1] for p in points],
+                                                       [p[2] for p in points])]
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        """Return the (row, column) of the cell containing the given location."""
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def _rings(self, lat: float, lng: float) -> Iterator[tuple[int, list]]:
+        """Yield (ring, points) for the rings of cells around the given location: ring r is
+        the square of cells exactly r cells away from the cell of the location.
+
+        Rings that lie entirely outside the non-empty cells are skipped, and the iteration
+        stops once every non-empty cell has been visited.
+        """
+        if self._size == 0:
+            return
+        row, col = self._cell(lat, lng)
+        min_row, max_row, min_col, max_col = self._bounds
+        ring = max(0, min_row - row, row - max_row, min_col - col, col - max_col)
+        while True:
+            points = []
+            for r in range(max(row - ring, min_row), min(row + ring, max_row) + 1):
+                if abs(r - row) == ring:
+                    columns = range(max(col - ring, min_col), min(col + ring, max_col) + 1)
+                else:
+                    columns = {col - ring, col + ring}
+                for c in columns:
+                    points.extend(self._cells.get((r, c), ()))
+            yield ring, points
+            if row - ring <= min_row and row + ring >= max_row \
+                    and col - ring <= min_col and col + ring >= max_col:
+                return
+            ring += 1
+
+    def _unvisited_bound(self, lat: float, lng: float, ring: int) -> float:
+        """Return a lower bound, in metres, on the distance from the given location to any
+        point in a cell outside the first ring + 1 rings.
+        """
+        row, col = self._cell(lat, lng)
+        lat_margin = min(lat - (row - ring) * self.cell_size,
+                         (row + ring + 1) * self.cell_size - lat)
+        lng_margin = min(lng - (col - ring) * self.cell_size,
+                         (col + ring + 1) * self.cell_size - lng)
+        # Lines of longitude are closest together at the point nearest a pole, which may be
+        # the query location itself
+        lng_scale = math.cos(math.radians(min(max(self._max_abs_lat, abs(lat)), 89.0)))
+        return _SAFETY * METRES_PER_DEGREE * min(lat_margin, lng_margin * lng_scale)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'typing', 'math', 'distance'],
+        'disable': ['E1136', 'W0221']
+    })
+    import python_ta.contracts
+
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+    import doctest
+
+    doctest.testmod()
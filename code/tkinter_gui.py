@@ -4,7 +4,10 @@ Module Description
 ==================
 This module contains the functions for running the TKinter graphic user interface. It handles
 clicking buttons, writing inputs, and clicking Radiobutton. It displays a pop up interface for
-users to input their departure and destination.
+users to input their departure and destination. While the user types in a search box, the
+closest building names from a NameIndex are listed below it, and clicking one selects it. Routes
+are found and drawn on a RouteWorker thread, so the window stays responsive in the meantime, and
+only the page of the newest route is opened in the browser.
 
 Copyright and Usage Information
 ===============================
@@ -17,17 +20,37 @@ please consult our Course Syllabus.
 
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
-from difflib import get_close_matches
-from tkinter import Tk, Label, Button, Entry, StringVar, Radiobutton
-from visualize_map import visualize_map_graph
+from typing import Optional
+from tkinter import Tk, Label, Button, Entry, StringVar, BooleanVar, Radiobutton, Listbox, \
+    Checkbutton, END
+from tkinter.ttk import Progressbar
+from dijkstra import NoShortestPathError
+from visualize_map import visualize_map_graph, make_route_page, open_page, RENDERERS, MAP_DIR
 from map_graph import MapGraph
+from name_search import NameIndex
+from route_worker import RouteWorker
 
+# The number of building names suggested while typing, and shown after a search
+SUGGESTIONS = 5
 
-def gui_generator(graph: MapGraph, building_lst: list) -> None:
+# The number of milliseconds between two checks for the result of a route
+POLL_INTERVAL = 50
+
+# The number of routes drawn on the map when alternatives are asked for, counting the shortest
+# one. Finding alternatives builds a shortest-path tree from each end of the route instead of
+# looking the route up in the building matrix or contraction hierarchy, so by default only the
+# shortest route is drawn.
+ALTERNATIVES = 3
+
+
+def gui_generator(graph: MapGraph, building_lst: list, engine: str = 'auto') -> None:
     """ Runs the TKinter. Initializes the TKinter, adds labels, and
     Calls on functions for handling
+
+    engine is the search used by shortest_path to find each route.
     """
     root = Tk()
+    index = NameIndex(building_lst)
 
     root.title("To-Run-To Map")
 
@@ -46,9 +69,15 @@ def gui_generator(graph: MapGraph, building_lst: list) -> None:
     # Variable for Radiobutton for departure
     r1 = StringVar()
 
+    # Suggestions for departure, updated on every key press
+    l1 = Listbox(root, width=50, height=SUGGESTIONS)
+    l1.pack()
+    e1.bind('<KeyRelease>', lambda event: autocomplete(e1, l1, index))
+    l1.bind('<<ListboxSelect>>', lambda event: choose_suggestion(e1, l1, r1))
+
     # Search Button for start departure
     Button(root, text="Search Start",
-           command=lambda: search_start(root, e1, r1, building_lst)).pack(pady=4)
+           command=lambda: search_start(root, e1, r1, index)).pack(pady=4)
 
     # Entry Box for Search Destination
     e2 = Entry(root, width=50)
@@ -57,22 +86,39 @@ def gui_generator(graph: MapGraph, building_lst: list) -> None:
     # Variable for Radiobutton for destination
     r2 = StringVar()
 
+    # Suggestions for destination, updated on every key press
+    l2 = Listbox(root, width=50, height=SUGGESTIONS)
+    l2.pack()
+    e2.bind('<KeyRelease>', lambda event: autocomplete(e2, l2, index))
+    l2.bind('<<ListboxSelect>>', lambda event: choose_suggestion(e2, l2, r2))
+
     # Search Button for destination
     Button(root, text="Search Destination",
-           command=lambda: search_destination(root, e2, r2, building_lst)).pack(pady=4)
+           command=lambda: search_destination(root, e2, r2, index)).pack(pady=4)
 
     ending_label = Label(root, text="Click 'Open Map' after you have selected the start and "
                                     "end points")
     ending_label.pack()
 
+    # Whether to draw the alternative routes as well
+    show_alternatives = BooleanVar(value=False)
+    Checkbutton(root, text="Also show alternative routes", variable=show_alternatives).pack()
+
+    # Route pages are made on a background thread while the progress bar moves, and opened here
+    worker = RouteWorker(make_route_page)
+    progress = Progressbar(root, mode='indeterminate', length=300)
+
     # Open Map Button
-    Button(root, text="Open Map", command=lambda: clicked(r1, r2, graph, root),
+    Button(root, text="Open Map",
+           command=lambda: clicked(r1, r2, graph, root, engine, worker, progress,
+                                   show_alternatives),
            bg="ghost white", fg="cornflower blue", font=("Helvetica", 14, "bold")).pack(pady=2)
 
     root.mainloop()
+    worker.close()
 
 
-def search_start(root: Tk, e1: Entry, r1: StringVar, building_lst: list) -> None:
+def search_start(root: Tk, e1: Entry, r1: StringVar, index: NameIndex) -> None:
     """Function for handling the event of clicking on the "Search start" button.
     Opens a set of Radiobutton for options as destinations.
     """
@@ -84,15 +130,8 @@ def search_start(root: Tk, e1: Entry, r1: StringVar, building_lst: list) -> None
         my_label.pack()
         return
 
-    # Using the difflib library to get the closest words
-    options = get_close_matches(t, building_lst)
-
-    # Finding buildings in the list that contains the word that has been typed
-    for b in building_lst:
-        if t.lower() in b.lower() and b not in options:
-            options.append(b)
-
-    options = options[:5]
+    # Using the name index to get the closest building names
+    options = index.search(t, SUGGESTIONS)
 
     # If options is empty, ask the user to re-input the search
     if options == []:
@@ -125,7 +164,7 @@ def search_start(root: Tk, e1: Entry, r1: StringVar, building_lst: list) -> None
         clear_button.pack()
 
 
-def search_destination(root: Tk, e2: Entry, r2: StringVar, building_lst: list) -> None:
+def search_destination(root: Tk, e2: Entry, r2: StringVar, index: NameIndex) -> None:
     """Function for handling the event of clicking on the "Search Destination" button.
     Opens a set of Radiobuttons for options as destinations.
     """
@@ -138,15 +177,8 @@ def search_destination(root: Tk, e2: Entry, r2: StringVar, building_lst: list) -
         my_label.pack()
         return
 
-    # Using the difflib library to get the closest words
-    options = get_close_matches(t2, building_lst)
-
-    # Finding buildings in the list that contains the word that has been typed
-    for b in building_lst:
-        if t2.lower() in b.lower() and b not in options:
-            options.append(b)
-
-    options = options[:5]
+    # Using the name index to get the closest building names
+    options = index.search(t2, SUGGESTIONS)
 
     # If options is empty, ask the user to re-input the search
     if options == []:
@@ -182,6 +214,27 @@ def search_destination(root: Tk, e2: Entry, r2: StringVar, building_lst: list) -
         clear_button.pack()
 
 
+def autocomplete(entry: Entry, suggestions: Listbox, index: NameIndex) -> None:
+    """Function for handling a key press in a search box.
+    Replaces the names in suggestions with the closest matches to the text typed so far.
+    """
+    suggestions.delete(0, END)
+    for name in index.search(entry.get(), SUGGESTIONS):
+        suggestions.insert(END, name)
+
+
+def choose_suggestion(entry: Entry, suggestions: Listbox, var: StringVar) -> None:
+    """Function for handling the event of clicking on a suggested name.
+    Puts the name in the search box and selects it as the departure or destination.
+    """
+    selection = suggestions.curselection()
+    if selection != ():
+        name = suggestions.get(selection[0])
+        entry.delete(0, END)
+        entry.insert(0, name)
+        var.set(name)
+
+
 def clear_items(label1: Label, label2: Label, rb_lst: list, forget_button: Button) -> None:
     """Hopefully deletes it when I click clear."""
     label1.destroy()
@@ -191,10 +244,20 @@ def clear_items(label1: Label, label2: Label, rb_lst: list, forget_button: Butto
     forget_button.destroy()
 
 
-def clicked(val1: StringVar, val2: StringVar, graph: MapGraph, root: Tk) -> None:
+def clicked(val1: StringVar, val2: StringVar, graph: MapGraph, root: Tk,
+            engine: str = 'auto', worker: Optional[RouteWorker] = None,
+            progress: Optional[Progressbar] = None,
+            show_alternatives: Optional[BooleanVar] = None) -> None:
     """Function for handling the event of clicking the "Open Map" button.
     Visualizes the map.
+
+    If worker is given, the page of the map is made on its thread and any route still being
+    found for an earlier click is cancelled, so its page is never opened; progress is shown
+    until the map opens. If show_alternatives is given and set, up to ALTERNATIVES - 1
+    alternative routes are drawn as well.
     """
+    alternatives = ALTERNATIVES if show_alternatives is not None and show_alternatives.get() \
+        else 1
     val1_str = str(val1.get())
     val2_str = str(val2.get())
     if val1_str == '' or val2_str == '':
@@ -202,8 +265,43 @@ def clicked(val1: StringVar, val2: StringVar, graph: MapGraph, root: Tk) -> None
                                     " before clicking Open Map", fg='firebrick4',
                          font=("Helvetica", 12, "italic"))
         my_label.pack()
+    elif worker is None:
+        visualize_map_graph(val1_str, val2_str, graph, engine, alternatives=alternatives)
+    else:
+        worker.submit(val1_str, val2_str, graph, engine, RENDERERS[0], MAP_DIR, alternatives)
+        if progress is not None:
+            progress.pack(pady=2)
+            progress.start()
+        root.after(POLL_INTERVAL, lambda: check_route(root, worker, progress))
+
+
+def check_route(root: Tk, worker: RouteWorker, progress: Optional[Progressbar]) -> None:
+    """Check whether the worker has finished the newest route, and check again later if not.
+    Hides the progress bar once it has, and opens the page of the route in the browser, or
+    reports why it could not be made.
+    """
+    result = worker.poll()
+    if result is None and worker.busy():
+        root.after(POLL_INTERVAL, lambda: check_route(root, worker, progress))
+        return
+
+    # Each click starts its own checks, and only the one that receives the result reports it
+    if progress is not None:
+        progress.stop()
+        progress.pack_forget()
+    if result is None:
+        return
+    _, status, value = result
+    if status == 'done':
+        open_page(value)
+    elif isinstance(value, NoShortestPathError):
+        my_label = Label(root, text="* No route was found between these buildings",
+                         fg='firebrick4', font=("Helvetica", 12, "italic"))
+        my_label.pack()
     else:
-        visualize_map_graph(val1_str, val2_str, graph)
+        my_label = Label(root, text="* The map could not be made: {error!r}".format(error=value),
+                         fg='firebrick4', font=("Helvetica", 12, "italic"))
+        my_label.pack()
 
 
 if __name__ == "__main__":
@@ -212,7 +310,7 @@ if __name__ == "__main__":
     python_ta.check_all(config={
         'max-line-length': 100,
         'extra-imports': ['python_ta.contracts', 'typing', 'distance', 'tkinter', 'visualize_map',
-                          'map_graph', 'difflib'],
+                          'map_graph', 'name_search', 'route_worker', 'dijkstra'],
         'disable': ['E1136', 'W0221', 'R0914']
     })
     import python_ta.contracts
@@ -19,6 +19,10 @@ expressly prohibited.
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
 
+# The modes of transportation, and their usual speeds in metres per second
+MODES = ('car', 'bicycle', 'walking')
+SPEEDS = {'car': 13.8889, 'bicycle': 5.55556, 'walking': 1}
+
 
 def vehicle_mode_time(distance: float, mode: str) -> float:
     """returns a time to travel a distance using a certain transportation
@@ -31,12 +35,8 @@ def vehicle_mode_time(distance: float, mode: str) -> float:
     >>> vehicle_mode_time(108.0, 'walking')
     108.0
     """
-    if mode == 'car':
-        return distance / 13.8889
-    elif mode == 'bicycle':
-        return distance / 5.55556
-    elif mode == 'walking':
-        return distance / 1
+    if mode in SPEEDS:
+        return distance / SPEEDS[mode]
     else:
         raise ValueError
 
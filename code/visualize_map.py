@@ -5,6 +5,16 @@ Module Description
 This module contains the function to visualize the map showing the shortest path
 between two points selected by the user.
 
+By default the page of the empty campus map is built with folium only once and kept as a
+template, and each route only adds a short script with its markers and polyline to a copy of it.
+Every page is saved under a name made from a hash of its contents, so two routes never overwrite
+each other's page and a route that was already drawn is not written again. folium is imported
+only when the template or a full folium page is first built.
+
+When some streets of the graph have access rules, the car, bicycle and walking routes can be
+different. They are all found by one multimodal_routes search, and each different route is
+drawn in its own colour.
+
 Copyright and Usage Information
 ===============================
 
@@ -16,79 +26,369 @@ please consult our Course Syllabus.
 
 This file is Copyright (c) 2021 Jihyuk Yoon, Yeong Jae Ryu, Eunchae Seong, and Taewoong Oh.
 """
+import hashlib
+import html
+import json
 import os
+import tempfile
+import threading
 import webbrowser
-import folium
-from dijkstra import shortest_path
-from vehicle_return_time import vehicle_mode_time, min_sec
+from dijkstra import ShortestPathTreeCache, NoShortestPathError
+from vehicle_return_time import MODES, min_sec
 from map_graph import MapGraph
+from multimodal import multimodal_routes
+from alternative_routes import alternative_routes
+from isochrone import isochrone
+
+# Shortest-path trees of recent departures, reused by the 'dijkstra' engine
+TREE_CACHE = ShortestPathTreeCache(maxsize=32)
+
+# The ways a route page can be made: 'template' adds the route to the cached empty map, and
+# 'folium' builds a whole new folium.Map for the route
+RENDERERS = ('template', 'folium')
+
+# The directory the route pages are saved in, relative to the working directory
+MAP_DIR = 'Maps'
+
+# The colour of the line of each mode, when the modes take different routes
+MODE_COLOURS = {'car': 'blue', 'bicycle': 'green', 'walking': 'black'}
+
+# The colour of the lines of the alternative routes
+ALTERNATIVE_COLOUR = 'grey'
+
+# The centre and zoom of the empty campus map; each route page then moves to its departure
+CAMPUS_CENTRE = (43.6629, -79.3957)
+ZOOM = 17  # Adjusted according to the UofT Map
 
+# The HTML of the empty campus map and the name of its map variable, built on first use
+_base_page = None
+_base_page_lock = threading.Lock()
 
-def visualize_map_graph(starting_point: str, end_point: str, graph: MapGraph) -> None:
+
+def visualize_map_graph(starting_point: str, end_point: str, graph: MapGraph,
+                        engine: str = 'auto', renderer: str = 'template',
+                        output_dir: str = MAP_DIR, alternatives: int = 1) -> str:
     """return the map visualization of the graph
+
+    The page of the route is made by make_route_page and opened in the browser. Return the
+    path of the saved page.
+
+    Preconditions:
+        - renderer in RENDERERS
+    """
+    output = make_route_page(starting_point, end_point, graph, engine, renderer, output_dir,
+                             alternatives)
+    open_page(output)
+    return output
+
+
+def make_route_page(starting_point: str, end_point: str, graph: MapGraph,
+                    engine: str = 'auto', renderer: str = 'template',
+                    output_dir: str = MAP_DIR, alternatives: int = 1) -> str:
+    """Return the path of the saved page of the map of the route from starting_point to
+    end_point, without opening it.
+
+    engine is the search used by shortest_path to find the route when every mode takes the
+    same route. When shortest_path falls back to 'dijkstra', the shortest-path tree of
+    starting_point is kept in TREE_CACHE for the next route. If alternatives > 1, up to
+    alternatives - 1 other routes are also drawn (see plan_route).
+
+    The page is made by the given renderer and saved in output_dir. Nothing is shown to the
+    user, so this can run on a background thread.
+
+    Preconditions:
+        - renderer in RENDERERS
+    """
+    route = plan_route(starting_point, end_point, graph, engine, alternatives)
+    if renderer == 'folium':
+        page = _folium_page(route)
+    else:
+        page = _template_page(route)
+    return save_page(page, output_dir)
+
+
+def open_page(path: str) -> None:
+    """Open the page saved at path in a new browser window."""
+    url = 'file://{path}'.format(path=os.path.abspath(path))
+    webbrowser.open(url, new=1)
+
+
+def plan_route(starting_point: str, end_point: str, graph: MapGraph,
+               engine: str = 'auto', alternatives: int = 1) -> dict:
+    """Return the data drawn on the map of the route from starting_point to end_point: the
+    coordinates along the walking route and its distance, the lines to draw, and the popup of
+    each marker. Each line is a dictionary with the coordinates of a route, its colour and
+    the modes that take it; when every mode takes the same route, there is a single black line.
+
+    If alternatives > 1, up to alternatives - 1 other routes found by alternative_routes are
+    added before them as grey lines that no mode takes, and their lengths are added to the
+    popup of the destination.
+
+    Raise NoShortestPathError if no mode can reach end_point.
+
+    >>> g = MapGraph()
+    >>> g.add_vertex('Hall', (43.66, -79.39), 'building')
+    >>> g.add_vertex('Library', (43.661, -79.39), 'building')
+    >>> g.add_vertex('1', (43.6605, -79.389), 'corner')
+    >>> g.add_edge('Hall', 'Library', 108)
+    >>> g.add_edge('Hall', '1', 80)
+    >>> g.add_edge('1', 'Library', 80)
+    >>> route = plan_route('Hall', 'Library', g, 'dijkstra')
+    >>> route['coordinates'], route['distance'], len(route['lines'])
+    ([[43.66, -79.39], [43.661, -79.39]], 108.0, 1)
+    >>> route['end_popup'].split('<br>')[2]
+    '<i>Car:</i> 0 m 7 s'
+    >>> g.set_edge_modes('Hall', 'Library', {'walking': None})
+    >>> [(line['modes'], line['colour']) for line in plan_route('Hall', 'Library', g)['lines']]
+    [(['car', 'bicycle'], 'blue'), (['walking'], 'black')]
+    >>> route = plan_route('Hall', 'Library', g, alternatives=3)
+    >>> [(line['modes'], line['colour']) for line in route['lines']][0]
+    ([], 'grey')
+    >>> route['end_popup'].split('<br>')[-2]
+    '<i>Alternative 1</i>: 160 m'
+    """
+    routes = multimodal_routes(graph, starting_point, end_point, engine=engine,
+                               cache=TREE_CACHE)
+    reachable = [mode for mode in MODES if routes[mode]['path'] is not None]
+    if not reachable:
+        raise NoShortestPathError
+
+    # Group the modes that take the same route into one line
+    lines = []
+    for mode in reachable:
+        path = routes[mode]['path']
+        same = [line for line in lines if line['path'] == path]
+        if same:
+            same[0]['modes'].append(mode)
+        else:
+            lines.append({'path': path, 'modes': [mode],
+                          'coordinates': [list(graph.get_location(v)) for v in path]})
+    for line in lines:
+        line['colour'] = MODE_COLOURS[line['modes'][0]] if len(lines) > 1 else 'black'
+        del line['path']
+
+    times = {}
+    for mode in MODES:
+        if routes[mode]['path'] is None:
+            times[mode] = 'no route'
+        else:
+            minutes, seconds = min_sec(routes[mode]['seconds'])
+            times[mode] = '{m} m {s} s'.format(m=minutes, s=seconds)
+
+    message = ("<b>Destination:</b> {end}<br>"
+               "<b>Transportation:</b> <br>"
+               "<i>Car:</i> {car}<br>"
+               "<i>Bicycle</i>: {bicycle}<br>"
+               "<i>Walking</i>: {walking}<br>").format(end=html.escape(end_point), **times)
+
+    if alternatives > 1:
+        others = alternative_routes(starting_point, end_point, graph, alternatives,
+                                    cache=TREE_CACHE)[1:]
+        lines = [{'coordinates': [list(graph.get_location(v)) for v in other['path']],
+                  'colour': ALTERNATIVE_COLOUR, 'modes': []} for other in others] + lines
+        for i, other in enumerate(others):
+            message += "<i>Alternative {n}</i>: {metres} m<br>".format(
+                n=i + 1, metres=round(other['distance']))
+
+    main_mode = 'walking' if 'walking' in reachable else reachable[0]
+    main_line = next(line for line in lines if main_mode in line['modes'])
+    return {'coordinates': main_line['coordinates'],
+            'distance': routes[main_mode]['distance'],
+            'lines': lines,
+            'start_popup': "<b>Departure:</b> {start}<br>".format(
+                start=html.escape(starting_point)),
+            'end_popup': message}
+
+
+def visualize_isochrone(building: str, graph: MapGraph, mode: str, seconds: float,
+                       output_dir: str = MAP_DIR) -> str:
+    """Show every building and corner that can be reached from building within the given
+    number of seconds by mode, as found by isochrone, on the campus map. The page is saved in
+    output_dir and opened in the browser. Return the path of the saved page.
+
+    Preconditions:
+        - building in graph.get_all_vertices('building')
+        - mode in MODES
+    """
+    page, map_name = _get_base_page()
+    reached = isochrone(graph, building, mode, seconds)
+    output = save_page(_add_script(page, isochrone_script(reached, seconds, map_name)),
+                       output_dir)
+    open_page(output)
+    return output
+
+
+def isochrone_script(reached: dict, seconds: float, map_name: str) -> str:
+    """Return the script that draws the vertices reached by an isochrone query on the Leaflet
+    map named map_name. Each vertex is a circle coloured from green, for the departure, to
+    red, for the vertices reached after the given number of seconds; the buildings are larger
+    and show their name and arrival time when clicked.
+
+    >>> reached = {'names': ['Hall', '1'], 'kinds': ['building', 'corner'],
+    ...            'lats': [43.66, 43.661], 'lngs': [-79.39, -79.39], 'seconds': [0.0, 90.0]}
+    >>> script = isochrone_script(reached, 600, 'map_1')
+    >>> '<b>Hall<\\\\/b><br>0 m 0 s' in script, script.count('</script>')
+    (True, 1)
+    """
+    popups = []
+    for name, kind, arrival in zip(reached['names'], reached['kinds'], reached['seconds']):
+        if kind == 'building':
+            minutes, secs = min_sec(arrival)
+            popups.append('<b>{name}</b><br>{m} m {s} s'.format(name=html.escape(name),
+                                                              m=minutes, s=secs))
+        else:
+            popups.append(None)
+    data = json.dumps({'lats': list(reached['lats']),
+                       'lngs': list(reached['lngs']),
+                       'fractions': [min(1.0, t / seconds) if seconds > 0 else 0.0
+                                     for t in reached['seconds']],
+                       'popups': popups}).replace('</', '<\\/')
+    return ('<script>\n'
+            '(function () {{\n'
+            '    var reached = {data};\n'
+            '    {map}.setView([reached.lats[0], reached.lngs[0]], {zoom});\n'
+            '    reached.lats.forEach(function (lat, i) {{\n'
+            '        var colour = "hsl(" + Math.round(120 * (1 - reached.fractions[i])) '
+            '+ ", 90%, 40%)";\n'
+            '        var marker = L.circleMarker([lat, reached.lngs[i]], {{radius: '
+            'reached.popups[i] === null ? 3 : 7, color: colour, fillOpacity: 0.8}});\n'
+            '        if (reached.popups[i] !== null) {{\n'
+            '            marker.bindPopup(reached.popups[i], {{maxWidth: 160}});\n'
+            '        }}\n'
+            '        marker.addTo({map});\n'
+            '    }});\n'
+            '}})();\n'
+            '</script>\n').format(data=data, map=map_name, zoom=ZOOM)
+
+
+def save_page(page: str, output_dir: str = MAP_DIR) -> str:
+    """Save page in output_dir under a name made from a hash of its contents, and return the
+    path of the file. Nothing is written if a page with the same contents was saved before.
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> first = save_page('<html></html>', directory)
+    >>> first == save_page('<html></html>', directory)
+    True
+    >>> os.path.basename(first)
+    'route-b633a587c652d023.html'
     """
-    coordinates = []
-    total_distance = 0.0
-    path = shortest_path(starting_point, end_point, graph)
-    coordinates.append(list(graph.get_location(path[0])))
+    digest = hashlib.sha256(page.encode('utf-8')).hexdigest()[:16]
+    output = os.path.join(output_dir, 'route-{digest}.html'.format(digest=digest))
+    if not os.path.exists(output):
+        os.makedirs(output_dir, exist_ok=True)
+        # Written under a temporary name unique to this call first, so a page being opened is
+        # never incomplete, even when several threads or processes save the same page
+        fd, temporary = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(page)
+            os.replace(temporary, output)
+        except BaseException:
+            os.remove(temporary)
+            raise
+    return output
 
-    # Get the list of coordinates from the shortest path between two places
-    for i in range(1, len(path)):
-        curr_loc = graph.get_location(path[i])
-        coordinates.append(list(curr_loc))
-        total_distance += graph.get_distance(path[i], path[i - 1])
 
-    times = {'car': min_sec(vehicle_mode_time(total_distance, 'car')),
-             'bicycle': min_sec(vehicle_mode_time(total_distance, 'bicycle')),
-             'walking': min_sec(vehicle_mode_time(total_distance, 'walking'))}
+def route_script(route: dict, map_name: str) -> str:
+    """Return the script that draws route on the Leaflet map named map_name, in the same way
+    as the markers and polyline of a folium page.
+
+    >>> route = {'coordinates': [[43.66, -79.39]], 'start_popup': 'a</script>',
+    ...          'end_popup': 'b',
+    ...          'lines': [{'coordinates': [[43.66, -79.39]], 'colour': 'black'}]}
+    >>> route_script(route, 'map_1').count('</script>')
+    1
+    """
+    data = json.dumps({'path': route['coordinates'],
+                       'lines': [[line['coordinates'], line['colour']] for line in route['lines']],
+                       'start': route['start_popup'],
+                       'end': route['end_popup']}).replace('</', '<\\/')
+    return ('<script>\n'
+            '(function () {{\n'
+            '    var route = {data};\n'
+            '    var start = route.path[0], end = route.path[route.path.length - 1];\n'
+            '    {map}.setView(start, {zoom});\n'
+            '    L.marker(start, {{icon: L.AwesomeMarkers.icon({{markerColor: "blue", '
+            'icon: "info-sign", prefix: "glyphicon"}})}})\n'
+            '        .bindPopup(route.start, {{maxWidth: 160}}).addTo({map});\n'
+            '    L.marker(end, {{icon: L.AwesomeMarkers.icon({{markerColor: "red", '
+            'icon: "info-sign", prefix: "glyphicon"}})}})\n'
+            '        .bindPopup(route.end, {{maxWidth: 160}}).addTo({map});\n'
+            '    route.lines.forEach(function (line) {{\n'
+            '        L.polyline(line[0], {{color: line[1], weight: 5}}).addTo({map});\n'
+            '    }});\n'
+            '}})();\n'
+            '</script>\n').format(data=data, map=map_name, zoom=ZOOM)
 
+
+def _template_page(route: dict) -> str:
+    """Return the page of route, made by adding its script to the cached empty map."""
+    page, map_name = _get_base_page()
+    return _add_script(page, route_script(route, map_name))
+
+
+def _add_script(page: str, script: str) -> str:
+    """Return page with script added at the end of its body."""
+    head, end_tag, tail = page.rpartition('</html>')
+    if end_tag == '':
+        return page + script
+    return head + script + end_tag + tail
+
+
+def _get_base_page() -> tuple[str, str]:
+    """Return the HTML of the empty campus map and the name of its map variable, building
+    them with folium the first time.
+    """
+    global _base_page
+    with _base_page_lock:
+        if _base_page is None:
+            import folium
+
+            m = folium.Map(location=list(CAMPUS_CENTRE), zoom_start=ZOOM)
+            # folium includes the Leaflet.awesome-markers scripts used by route_script
+            _base_page = (m.get_root().render(), m.get_name())
+        return _base_page
+
+
+def _folium_page(route: dict) -> str:
+    """Return the page of route, made by building a new folium.Map for it."""
+    import folium
+
+    coordinates = route['coordinates']
     # Create a Map with two markers
-    m = folium.Map(location=coordinates[0], zoom_start=17)  # Adjusted according to the UofT Map
+    m = folium.Map(location=coordinates[0], zoom_start=ZOOM)
     folium.Marker(
         location=coordinates[0],
-        popup=folium.Popup("<b>Departure:</b> {start}<br>".format(start=starting_point),
-                           max_width=160),
+        popup=folium.Popup(route['start_popup'], max_width=160),
         icon=folium.Icon(color='blue')
     ).add_to(m)
 
-    message = ("<b>Destination:</b> {end}<br>"
-               "<b>Transportation:</b> <br>"
-               "<i>Car:</i> {car_m} m {car_s} s<br>"
-               "<i>Bicycle</i>: {bi_m} m {bi_s} s<br>"
-               "<i>Walking</i>: {w_m} m {w_s} s<br>").format(end=end_point,
-                                                             car_m=str(times['car'][0]),
-                                                             car_s=str(times['car'][1]),
-                                                             bi_m=str(times['bicycle'][0]),
-                                                             bi_s=str(times['bicycle'][1]),
-                                                             w_m=str(times['walking'][0]),
-                                                             w_s=str(times['walking'][1]))
-
     folium.Marker(
         location=coordinates[-1],
-        popup=folium.Popup(html=message, max_width=160, sticy=True),
+        popup=folium.Popup(html=route['end_popup'], max_width=160, sticky=True),
         icon=folium.Icon(color='red')
     ).add_to(m)
 
-    # Add a colored line of the shortest path between two points
-    my_polyline = folium.PolyLine(locations=coordinates, color='black', weight=5)
-    m.add_child(my_polyline)
-    output = 'UofTMap.html'
-    m.save(output)      # save the HTML file of the map
-
-    # Open a map
-    url = 'file://{path}/{mapfile}'.format(path=os.getcwd(), mapfile=output)
-    webbrowser.open(url, new=1)
+    # Add a colored line of the route of each mode between two points
+    for line in route['lines']:
+        my_polyline = folium.PolyLine(locations=line['coordinates'], color=line['colour'],
+                                      weight=5)
+        m.add_child(my_polyline)
+    return m.get_root().render()
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-io': ['get_the_right_name'],
+        'allowed-io': ['save_page'],
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'typing', 'os', 'webbrowser',
-                          'folium', 'dijkstra', 'vehicle_return_time', 'map_graph', 'difflib'],
-        'disable': ['E1136', 'W0221']
+        'extra-imports': ['python_ta.contracts', 'typing', 'os', 'webbrowser', 'hashlib', 'html',
+                          'json', 'tempfile', 'threading', 'folium', 'dijkstra',
+                          'vehicle_return_time', 'map_graph', 'multimodal', 'alternative_routes',
+                          'isochrone'],
+        'disable': ['E1136', 'W0221', 'W0603', 'C0415']
     })
     import python_ta.contracts
 